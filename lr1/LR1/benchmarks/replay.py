@@ -0,0 +1,251 @@
+"""Нагрузочное воспроизведение записанных сеансов консоли.
+
+Транскрипт — текстовый файл, в котором каждая строка — то, что пользователь ввёл
+в ответ на очередной запрос консоли (строки, начинающиеся с '#', пропускаются).
+Запуск из каталога lr1/LR1:
+
+    python -m benchmarks.replay transcripts/*.txt --sessions 200 --workers 16
+    python -m benchmarks.replay --generate 100 --workers 8 --mode process
+
+Все сеансы работают с общим каталогом storage/ (или --storage-dir). В отчёте —
+пропускная способность, задержки сеансов, ошибки чтения и потерянные обновления:
+минуты, которые сеансы успешно добавили к плану студента, но которых нет в итоговых данных.
+save_conflicts — сохранения, которые пришлось объединять с изменениями другого сеанса,
+lock_waits — сколько раз блокировка файла или записи была занята.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+if __package__ in (None, ""):  # запуск файлом, а не через python -m
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.storage_benchmark import percentile
+from console.channel import ScriptedChannel, use_channel
+from console.console import Console
+from entities.attempts import AttemptLog
+from entities.exam import Exam
+from entities.journal import journal_store
+from entities.locking import lock_manager
+from entities.material import Material
+from entities.repository import STUDENTS, get_repository
+from entities.storage import STORAGE_MODES, set_storage_mode
+from entities.store_cache import store_cache
+from entities.student import Student
+
+LOGIN_PROMPT = "Введите номер студенческого билета: "
+PLANNED_MINUTES = re.compile(r"Успешно добавлено (\d+) минут")
+# Сообщения консоли о неожиданных исключениях и повреждённых (недописанных) файлах
+READ_ERROR_MARKERS = ("Ошибка чтения файла", "Ошибка чтения коллекции")
+ERROR_MARKERS = ("Произошла ошибка", "Ошибка при обработке ввода", "Ошибка при входе в систему",
+                 "завершилась ошибкой")
+
+
+def read_transcript(path: Path) -> List[str]:
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return [line.rstrip("\r\n") for line in f if not line.startswith("#")]
+
+
+class ReplayChannel(ScriptedChannel):
+    """Сценарный канал, который по выводу консоли считает ответы, ошибки и добавленные к плану минуты."""
+
+    def __init__(self, inputs: Iterable[str]) -> None:
+        super().__init__(inputs, keep_output=False)
+        self.answered = 0
+        self.read_errors = 0
+        self.errors = 0
+        self.planned_minutes: Dict[str, int] = {}  # студент -> минуты, успешно добавленные к плану
+        self._login: Optional[str] = None
+        self._student: Optional[str] = None
+
+    def write(self, text: str) -> None:
+        if text.startswith("Добро пожаловать"):
+            self._student = self._login
+        self.read_errors += sum(text.count(marker) for marker in READ_ERROR_MARKERS)
+        self.errors += sum(text.count(marker) for marker in ERROR_MARKERS)
+        for minutes in PLANNED_MINUTES.findall(text):
+            if self._student is not None:
+                self.planned_minutes[self._student] = self.planned_minutes.get(self._student, 0) + int(minutes)
+
+    def ask(self, prompt: str = "") -> str:
+        answer = super().ask(prompt)
+        self.answered += 1
+        if prompt == LOGIN_PROMPT:
+            self._login = answer.strip()
+        return answer
+
+
+def run_session(inputs: List[str], coalesce_writes: bool = False) -> Dict[str, Any]:
+    """Проигрывает один транскрипт в отдельном сеансе Console и возвращает его итоги."""
+    channel = ReplayChannel(inputs)
+    conflicts, waits = Student.save_conflicts, lock_manager.waits
+    started = time.perf_counter()
+    with use_channel(channel):
+        Console(coalesce_writes=coalesce_writes).start()
+    return {
+        # В режиме потоков сюда попадают и счётчики параллельных сеансов, поэтому replay берёт общие
+        "save_conflicts": Student.save_conflicts - conflicts,
+        "lock_waits": lock_manager.waits - waits,
+        "seconds": time.perf_counter() - started,
+        "actions": channel.answered,
+        "read_errors": channel.read_errors,
+        "errors": channel.errors,
+        "planned_minutes": channel.planned_minutes,
+    }
+
+
+def _run_session_in_process(inputs: List[str], coalesce_writes: bool, storage: str,
+                            storage_dir: Optional[str]) -> Dict[str, Any]:
+    # В дочернем процессе настройки хранилища нужно повторить
+    configure_storage(storage, Path(storage_dir) if storage_dir else None)
+    return run_session(inputs, coalesce_writes)
+
+
+def configure_storage(storage: str, storage_dir: Optional[Path]) -> None:
+    if storage_dir is not None:
+        Student.STORAGE_FILE = storage_dir / "students.json"
+        Exam.STORAGE_FILE = storage_dir / "exams.json"
+        Material.STORAGE_FILE_EDUCATIONAL = storage_dir / "educational_materials.json"
+        Material.STORAGE_FILE_TOPICS = storage_dir / "materials.json"
+        AttemptLog.STORAGE_FILE = storage_dir / "attempts.jsonl"
+    set_storage_mode(storage)
+
+
+def generate_transcripts(count: int, seed: int = 0) -> List[List[str]]:
+    """Сеансы «вход → консультация → изучение темы → пробный экзамен → план» по данным хранилища."""
+    rng = random.Random(seed)
+    students = list(get_repository().all(STUDENTS))
+    materials = [record.get("topic") for record in Material.load_all_educational_materials().values()
+                 if record.get("topic")]
+    topics = [record.get("name") for record in Material.load_all_simple_topics().values() if record.get("name")]
+    exams = Exam.load_all()
+    if not students:
+        raise ValueError("В хранилище нет студентов для сеансов.")
+
+    transcripts = []
+    for _ in range(count):
+        inputs = ["1", rng.choice(students)]
+        if materials:
+            inputs += ["2", rng.choice(materials)]
+        if topics:
+            inputs += ["3", rng.choice(topics)]
+        if exams:
+            subject, record = rng.choice(list(exams.items()))
+            inputs += ["4", subject]
+            # Примерно половина ответов верные
+            inputs += [question[2] if rng.random() < 0.5 else "не знаю" for question in record["questions"]]
+        inputs += ["5", str(rng.randrange(5, 120, 5)), "0", "0"]
+        transcripts.append(inputs)
+    return transcripts
+
+
+def _current_planned_minutes(student_ids: Iterable[str]) -> Dict[str, int]:
+    store_cache.invalidate()
+    journal_store.invalidate()
+    records = get_repository().all(STUDENTS)
+    return {student_id: records.get(student_id, {}).get("planned_study_time_minutes", 0)
+            for student_id in student_ids}
+
+
+def replay(transcripts: List[List[str]], sessions: int, workers: int, mode: str = "thread",
+           coalesce_writes: bool = False, storage: str = "json",
+           storage_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """Проигрывает sessions сеансов (транскрипты по кругу) в пуле из workers потоков или процессов."""
+    if not transcripts:
+        raise ValueError("Нет транскриптов для воспроизведения.")
+    configure_storage(storage, storage_dir)
+    jobs = [transcripts[i % len(transcripts)] for i in range(sessions)]
+    initial = _current_planned_minutes(get_repository().all(STUDENTS))
+
+    conflicts, waits = Student.save_conflicts, lock_manager.waits
+    started = time.perf_counter()
+    executor: Executor
+    if mode == "process":
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [executor.submit(_run_session_in_process, inputs, coalesce_writes, storage,
+                                   str(storage_dir) if storage_dir else None) for inputs in jobs]
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="replay-session")
+        futures = [executor.submit(run_session, inputs, coalesce_writes) for inputs in jobs]
+    with executor:
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    journal_store.wait_for_compaction()
+
+    expected: Dict[str, int] = dict(initial)
+    for result in results:
+        for student_id, minutes in result["planned_minutes"].items():
+            expected[student_id] = expected.get(student_id, 0) + minutes
+    final = _current_planned_minutes(expected)
+    lost = {student_id: expected[student_id] - final[student_id] for student_id in expected
+            if final[student_id] < expected[student_id]}
+
+    if mode == "process":
+        # Процесс пула проигрывает сеансы по одному, так что их счётчики не пересекаются
+        conflicts = sum(result["save_conflicts"] for result in results)
+        waits = sum(result["lock_waits"] for result in results)
+    else:
+        conflicts, waits = Student.save_conflicts - conflicts, lock_manager.waits - waits
+    latencies = sorted(result["seconds"] for result in results)
+    actions = sum(result["actions"] for result in results)
+    return {
+        "mode": mode,
+        "workers": workers,
+        "storage": storage,
+        "sessions": sessions,
+        "seconds": round(elapsed, 4),
+        "sessions_per_sec": round(sessions / elapsed, 2) if elapsed > 0 else 0.0,
+        "actions": actions,
+        "actions_per_sec": round(actions / elapsed, 2) if elapsed > 0 else 0.0,
+        "session_p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "session_p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "read_errors": sum(result["read_errors"] for result in results),
+        "errors": sum(result["errors"] for result in results),
+        "lost_updates": len(lost),
+        "lost_minutes": sum(lost.values()),
+        "save_conflicts": conflicts,
+        "lock_waits": waits,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Нагрузочное воспроизведение сеансов консоли")
+    parser.add_argument("transcripts", nargs="*", type=Path, help="файлы транскриптов (строка ввода на строку)")
+    parser.add_argument("--generate", type=int, metavar="N",
+                        help="создать N сеансов по данным хранилища вместо файлов транскриптов")
+    parser.add_argument("--sessions", type=int, help="сколько сеансов проиграть (по умолчанию — по одному на транскрипт)")
+    parser.add_argument("--workers", type=int, default=8, help="размер пула")
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread", help="пул потоков или процессов")
+    parser.add_argument("--storage", choices=STORAGE_MODES, default="json", help="режим хранения, как в main.py")
+    parser.add_argument("--storage-dir", type=Path, help="каталог с JSON-файлами вместо storage/")
+    parser.add_argument("--defer-writes", action="store_true", help="как в main.py --defer-writes")
+    parser.add_argument("--seed", type=int, default=0, help="зерно для --generate")
+    parser.add_argument("--output", type=Path, help="файл для отчёта JSON (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    configure_storage(args.storage, args.storage_dir)
+    if args.generate:
+        transcripts = generate_transcripts(args.generate, args.seed)
+    elif args.transcripts:
+        transcripts = [read_transcript(path) for path in args.transcripts]
+    else:
+        parser.error("укажите файлы транскриптов или --generate N")
+    report = replay(transcripts, args.sessions or len(transcripts), args.workers, args.mode,
+                    args.defer_writes, args.storage, args.storage_dir)
+
+    text = json.dumps(report, ensure_ascii=False, indent=4)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""Замеры производительности хранилища lr1 на синтетических данных.
+
+Запуск из каталога lr1/LR1:
+
+    python -m benchmarks.storage_benchmark --scales 1k,10k --output results.json
+    python -m benchmarks.storage_benchmark --scales 100k,1m --compression --disk-mbps 20
+
+Каждый масштаб выполняется в отдельном процессе, чтобы пиковая память (peak RSS)
+относилась только к нему. Данные создаются во временном каталоге и не затрагивают storage/.
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+if __package__ in (None, ""):  # запуск файлом, а не через python -m
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from console.channel import ScriptedChannel, use_channel
+from console.console import Console
+from entities.compression import compression_policy
+from entities.exam import Exam
+from entities.journal import journal_store
+from entities.material import TOPIC_REF, Material
+from entities.repository import (EDUCATIONAL_MATERIALS, EXAMS, SIMPLE_TOPICS, STUDENTS, JsonRepository,
+                                 get_repository, set_repository)
+from entities.sqlite_repository import SQLiteRepository
+from entities.storage import STORAGE_MODES, get_storage_mode, set_storage_mode
+from entities.store_cache import store_cache
+from entities.student import Student
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_SCALES = "1k,10k"
+DEFAULT_OPERATIONS = 200
+EXAMS_PER_STUDENTS = 100  # экзаменов в банке: один на 100 студентов (не меньше MIN_EXAMS)
+MIN_EXAMS = 10
+ROSTER_MEMORY_SAMPLE = 100_000  # сколько студентов загружается для замера памяти на студента
+QUESTIONS_PER_EXAM = 5
+SUBJECTS = ("Математика", "Физика", "Химия", "История", "Программирование")
+DEFAULT_COMPRESSION = "none,zlib:1,zlib:6,zlib:9,lzma:0,lzma:6"
+DEFAULT_DISK_MBPS = 20.0  # медленный сетевой диск
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Пиковая память процесса в КБ; None, если платформа её не сообщает (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS сообщает байты
+
+
+def measure(operation: Callable[[int], Any], count: int) -> Dict[str, float]:
+    """Выполняет operation(i) count раз и считает пропускную способность и задержки."""
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for i in range(count):
+        begin = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "ops": count,
+        "seconds": round(elapsed, 6),
+        "ops_per_sec": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "max_ms": round(latencies[-1] * 1000, 4) if latencies else 0.0,
+    }
+
+
+def student_record(i: int, rng: random.Random) -> Dict[str, Any]:
+    exam_result = {subject: f"{rng.randint(0, QUESTIONS_PER_EXAM)}/{QUESTIONS_PER_EXAM}"
+                   for subject in rng.sample(SUBJECTS, rng.randint(0, 3))}
+    return {
+        "id": f"s{i:07d}",
+        "last_name": f"Фамилия{i}",
+        "first_name": f"Имя{i % 997}",
+        "exam_result": exam_result,
+        "materials": [f"{TOPIC_REF}Тема {rng.randrange(1000)}" for _ in range(rng.randint(0, 3))],
+        "readiness": rng.randint(0, 100),
+        "planned_study_time_minutes": rng.randrange(0, 600, 15),
+    }
+
+
+def exam_record(i: int) -> Dict[str, Any]:
+    subject = f"{SUBJECTS[i % len(SUBJECTS)]} {i}"
+    return {
+        "subject": subject,
+        "questions": [[f"Тема {q}", f"Вопрос {q} по предмету {subject}?", f"ответ {q}"]
+                      for q in range(QUESTIONS_PER_EXAM)],
+    }
+
+
+def material_record(i: int) -> Dict[str, Any]:
+    return {"topic": f"Тема {i}", "subject": SUBJECTS[i % len(SUBJECTS)],
+            "title": f"Учебник {i}", "author": f"Автор {i % 311}"}
+
+
+def generate(size: int, seed: int = 0) -> Dict[str, int]:
+    """Заполняет текущее хранилище синтетической группой, банком экзаменов и каталогом литературы."""
+    rng = random.Random(seed)
+    repository = get_repository()
+    exams = max(MIN_EXAMS, size // EXAMS_PER_STUDENTS)
+    repository.put_many(STUDENTS, ((f"s{i:07d}", student_record(i, rng)) for i in range(size)))
+    repository.put_many(EXAMS, ((record["subject"], record) for record in map(exam_record, range(exams))))
+    repository.put_many(EDUCATIONAL_MATERIALS, ((f"Тема {i}", material_record(i)) for i in range(size)))
+    repository.put_many(SIMPLE_TOPICS, ((f"Тема {i}", {"name": f"Тема {i}"}) for i in range(1000)))
+    return {"students": size, "exams": exams, "materials": size, "topics": 1000}
+
+
+def measure_roster_memory(limit: int = ROSTER_MEMORY_SAMPLE) -> Dict[str, Any]:
+    """Память (tracemalloc), которую занимают загруженные объекты Student, в расчёте на студента."""
+    records = list(get_repository().all(STUDENTS).values())[:limit]
+    tracemalloc.start()
+    try:
+        started = tracemalloc.get_traced_memory()[0]
+        roster = [Student.from_dict(record) for record in records]
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    count = max(1, len(roster))
+    return {"students": len(roster), "bytes_per_student": round((retained - started) / count),
+            "peak_bytes_per_student": round((peak - started) / count)}
+
+
+def run_operations(size: int, exams: int, operations: int, seed: int = 1) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(seed)
+    # Удаляются студенты из конца списка, остальные замеры берут студентов из начала
+    deleted_ids = [f"s{size - 1 - i:07d}" for i in range(min(operations, size // 2))]
+    student_ids = [f"s{rng.randrange(size - len(deleted_ids)):07d}" for _ in range(operations)]
+    topics = [f"Тема {rng.randrange(size)}" for _ in range(operations)]
+    subjects = [exam_record(rng.randrange(exams))["subject"] for _ in range(operations)]
+
+    def save_student(i: int) -> None:
+        student = Student.load(student_ids[i])
+        student.readiness = (student.readiness + 1) % 101
+        student.save()
+
+    def save_exam(i: int) -> None:
+        exam = Exam.load(subjects[i])  # общий объект: изменённый экзамен сохраняется новым объектом
+        Exam(exam.subject, exam.questions + [("Тема", f"Дополнительный вопрос {i}?", "ответ")]).save()
+
+    def console_session(i: int) -> None:
+        # Вход, самооценка, планирование времени, выход из меню студента и из программы
+        script = ["1", student_ids[i], "1", "5", "30", "0", "0"]
+        with use_channel(ScriptedChannel(script, keep_output=False)):
+            Console().start()
+
+    results = {
+        "student_load": measure(lambda i: Student.load(student_ids[i]), operations),
+        "student_save": measure(save_student, operations),
+        "student_delete": measure(lambda i: Student.delete_student(deleted_ids[i]), len(deleted_ids)),
+        "exam_load_all": measure(lambda i: Exam.load_all(), max(1, operations // 10)),
+        "exam_save": measure(save_exam, operations),
+        "material_load_educational": measure(lambda i: Material.load_educational_material(topics[i]), operations),
+        "console_session": measure(console_session, operations),
+    }
+    journal_store.wait_for_compaction()
+    return results
+
+
+def _storage_files() -> List[Path]:
+    return [Student.STORAGE_FILE, Exam.STORAGE_FILE, Material.STORAGE_FILE_EDUCATIONAL, Material.STORAGE_FILE_TOPICS]
+
+
+def _set_storage_files(files: List[Path]) -> None:
+    Student.STORAGE_FILE, Exam.STORAGE_FILE, Material.STORAGE_FILE_EDUCATIONAL, Material.STORAGE_FILE_TOPICS = files
+
+
+def _use_temporary_storage(directory: Path, storage: str) -> None:
+    Student.STORAGE_FILE = directory / "students.json"
+    Exam.STORAGE_FILE = directory / "exams.json"
+    Material.STORAGE_FILE_EDUCATIONAL = directory / "educational_materials.json"
+    Material.STORAGE_FILE_TOPICS = directory / "materials.json"
+    store_cache.invalidate()
+    journal_store.invalidate()
+    if storage == "sqlite":
+        set_repository(SQLiteRepository(directory / "lr1.db"))
+    else:
+        set_repository(JsonRepository())
+        set_storage_mode(storage)
+
+
+def run_scale(scale: str, storage: str, operations: int) -> Dict[str, Any]:
+    """Замер одного масштаба в текущем процессе."""
+    size = SCALES[scale]
+    original_files = _storage_files()
+    with tempfile.TemporaryDirectory(prefix="lr1-bench-") as directory:
+        _use_temporary_storage(Path(directory), storage)
+        store_cache.reset_stats()
+        try:
+            started = time.perf_counter()
+            counts = generate(size)
+            generate_seconds = time.perf_counter() - started
+            roster_memory = measure_roster_memory()
+            results = run_operations(size, counts["exams"], min(operations, size))
+            file_sizes = {path.name: path.stat().st_size for path in Path(directory).iterdir()}
+            cache_stats = store_cache.stats()
+        finally:
+            get_repository().close()
+            _set_storage_files(original_files)
+            store_cache.invalidate()
+            journal_store.invalidate()
+    return {
+        "records": counts,
+        "generate_seconds": round(generate_seconds, 3),
+        "peak_rss_kb": peak_rss_kb(),
+        "roster_memory": roster_memory,
+        "file_sizes": file_sizes,
+        "store_cache": cache_stats,
+        "operations": results,
+    }
+
+
+def run_compression(scale: str, choices: List[str], disk_mbps: float) -> Dict[str, Any]:
+    """Размер файла группы студентов и время его записи и чтения с каждым методом сжатия.
+
+    Файл читается из кэша ОС, поэтому write_seconds и read_seconds — почти только работа
+    процессора; estimated_*_seconds добавляют передачу файла по диску со скоростью disk_mbps МБ/с.
+    """
+    size = SCALES[scale]
+    rng = random.Random(0)
+    data = {f"s{i:07d}": student_record(i, rng) for i in range(size)}
+    previous_policy = compression_policy.default, compression_policy.per_file
+    results: Dict[str, Any] = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="lr1-bench-") as directory:
+            path = Path(directory) / "students.json"
+            for choice in choices:
+                compression_policy.configure(None, [f"students.json={choice}"])
+                store_cache.invalidate()
+                started = time.perf_counter()
+                store_cache.store(path, data)
+                write_seconds = time.perf_counter() - started
+                store_cache.invalidate()
+                started = time.perf_counter()
+                store_cache.load(path)
+                read_seconds = time.perf_counter() - started
+                file_size = path.stat().st_size
+                transfer_seconds = file_size / (disk_mbps * 1_000_000)
+                results[choice] = {
+                    "file_size": file_size,
+                    "write_seconds": round(write_seconds, 4),
+                    "read_seconds": round(read_seconds, 4),
+                    "estimated_write_seconds": round(write_seconds + transfer_seconds, 4),
+                    "estimated_read_seconds": round(read_seconds + transfer_seconds, 4),
+                }
+    finally:
+        compression_policy.default, compression_policy.per_file = previous_policy
+        store_cache.invalidate()
+    plain_size = results.get("none", {}).get("file_size")
+    if plain_size:
+        for result in results.values():
+            result["ratio"] = round(result["file_size"] / plain_size, 4)
+    return {"students": size, "methods": results}
+
+
+def _run_scale_in_subprocess(scale: str, storage: str, operations: int) -> Dict[str, Any]:
+    command = [sys.executable, "-m", "benchmarks.storage_benchmark", "--scales", scale,
+               "--storage", storage, "--operations", str(operations), "--in-process"]
+    completed = subprocess.run(command, cwd=Path(__file__).resolve().parent.parent,
+                               capture_output=True, text=True, encoding="utf-8")
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "ошибка"}
+    return json.loads(completed.stdout)["scales"][scale]
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Замеры производительности хранилища lr1")
+    parser.add_argument("--scales", default=DEFAULT_SCALES,
+                        help=f"масштабы через запятую из {', '.join(SCALES)} (по умолчанию {DEFAULT_SCALES})")
+    parser.add_argument("--storage", choices=STORAGE_MODES + ("sqlite",), default="json",
+                        help="хранилище, как в main.py --storage")
+    parser.add_argument("--operations", type=int, default=DEFAULT_OPERATIONS,
+                        help="число операций каждого вида на масштаб")
+    parser.add_argument("--output", type=Path, help="файл для результатов JSON (по умолчанию stdout)")
+    parser.add_argument("--in-process", action="store_true",
+                        help="выполнять все масштабы в текущем процессе (peak RSS тогда общий)")
+    parser.add_argument("--compression", nargs="?", const=DEFAULT_COMPRESSION, metavar="METHODS",
+                        help="вместо операций сравнить методы сжатия файла студентов "
+                             f"(по умолчанию {DEFAULT_COMPRESSION})")
+    parser.add_argument("--disk-mbps", type=float, default=DEFAULT_DISK_MBPS,
+                        help=f"скорость диска для оценки времени со сжатием, МБ/с (по умолчанию {DEFAULT_DISK_MBPS})")
+    args = parser.parse_args(argv)
+
+    scales = [scale.strip().lower() for scale in args.scales.split(",") if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"неизвестные масштабы: {', '.join(unknown)}")
+
+    report: Dict[str, Any] = {
+        "storage": args.storage,
+        "operations": args.operations,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scales": {},
+    }
+    if args.compression:
+        choices = [choice.strip() for choice in args.compression.split(",") if choice.strip()]
+        try:
+            compression_policy.configure(None, [f"students.json={choice}" for choice in choices])
+        except ValueError as e:
+            parser.error(str(e))
+        compression_policy.configure()
+        report["disk_mbps"] = args.disk_mbps
+        for scale in scales:
+            report["scales"][scale] = run_compression(scale, choices, args.disk_mbps)
+        return _write_report(report, args.output)
+
+    previous_mode = get_storage_mode()
+    previous_repository = get_repository()
+    for scale in scales:
+        if args.in_process:
+            report["scales"][scale] = run_scale(scale, args.storage, args.operations)
+        else:
+            report["scales"][scale] = _run_scale_in_subprocess(scale, args.storage, args.operations)
+    set_repository(previous_repository)
+    set_storage_mode(previous_mode)
+    return _write_report(report, args.output)
+
+
+def _write_report(report: Dict[str, Any], output: Optional[Path]) -> Dict[str, Any]:
+    text = json.dumps(report, ensure_ascii=False, indent=4)
+    if output:
+        output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Пакетный импорт и экспорт данных lr1 без диалога.
+
+    python bulk.py import students roster.csv
+    python bulk.py import exams exams.jsonl --workers 8 --skip-invalid
+    python bulk.py export students students.jsonl
+
+CSV-файлы начинаются со строки заголовка из имён полей (см. entities/bulk.py), экзамены
+в CSV — по вопросу на строку. Остальные файлы читаются как JSON lines.
+"""
+import argparse
+from pathlib import Path
+from typing import List, Optional
+
+from entities.bulk import KINDS, export_file, import_file
+from entities.compression import compression_policy
+from entities.repository import get_repository, set_repository
+from entities.sqlite_repository import SQLiteRepository
+from entities.storage import STORAGE_MODES, set_storage_mode
+
+DEFAULT_DB = Path("storage/lr1.db")
+SHOWN_ERRORS = 20  # сколько отклонённых строк выводить
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Пакетный импорт и экспорт данных системы подготовки к экзаменам")
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("kind", choices=tuple(KINDS), help="вид данных")
+    parser.add_argument("file", type=Path, help="файл CSV (.csv) или JSON lines")
+    parser.add_argument("--storage", choices=STORAGE_MODES + ("sqlite",), default="json", help="как в main.py")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB, help="путь к базе SQLite")
+    parser.add_argument("--workers", type=int, help="процессов для проверки строк (по умолчанию — по числу ядер)")
+    parser.add_argument("--skip-invalid", action="store_true",
+                        help="импортировать корректные строки, даже если в файле есть ошибки")
+    parser.add_argument("--dry-run", action="store_true", help="только проверить файл, ничего не записывая")
+    parser.add_argument("--compress", metavar="METHOD[:LEVEL]", help="сжатие файлов хранилища, как в main.py")
+    parser.add_argument("--compress-file", action="append", default=[], metavar="PATTERN=METHOD[:LEVEL]",
+                        help="сжатие отдельных файлов, как в main.py")
+    args = parser.parse_args(argv)
+    try:
+        compression_policy.configure(args.compress, args.compress_file)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.storage == "sqlite":
+        set_repository(SQLiteRepository(args.db))
+    else:
+        set_storage_mode(args.storage)
+    try:
+        if args.action == "export":
+            print(f"Выгружено строк: {export_file(args.kind, args.file)}")
+            return 0
+        try:
+            report = import_file(args.kind, args.file, args.workers, args.skip_invalid, args.dry_run)
+        except OSError as e:
+            print(f"Ошибка чтения файла: {e}")
+            return 1
+        for line_number, error in report.errors[:SHOWN_ERRORS]:
+            print(f"Строка {line_number}: {error}")
+        if len(report.errors) > SHOWN_ERRORS:
+            print(f"... и ещё ошибок: {len(report.errors) - SHOWN_ERRORS}")
+        if report.errors and not args.skip_invalid:
+            print("Импорт отменён: исправьте ошибки или запустите с --skip-invalid.")
+            return 1
+        verb = "Проверено" if args.dry_run else "Импортировано"
+        print(f"{verb} записей: {report.imported}")
+        return 0
+    finally:
+        get_repository().close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,6 @@
+# Канал ввода-вывода живёт в entities.channel, чтобы сущности и хранилище не зависели от консоли
+from entities.channel import (IOChannel, ScriptedChannel, StdIOChannel, TextChannel, ask, current_channel,
+                              say, use_channel)
+
+__all__ = ["IOChannel", "StdIOChannel", "TextChannel", "ScriptedChannel", "current_channel", "use_channel",
+           "say", "ask"]
@@ -1,18 +1,37 @@
-﻿from typing import Optional, Dict, Any
+﻿from typing import Callable, Optional, Dict, Any
 import json
 
+from console.channel import ask, say
 from console.states import AddedState, DeletedState, InitialState, State, StudentState, TeacherState
 from entities.additional_classes import AdditionalClasses
+from entities.analytics import cohort_analytics
 from entities.exam import Exam
+from entities.leaderboard import Standing, leaderboard
+from entities.listing import PAGE_SIZE, CatalogListing, Entry, educational_listing, exam_listing, topic_listing
 from entities.material import Material  # Изменено с EducationalMaterial на Material
+from entities.profiling import profiler
+from entities.recommendations import recommendation_index
+from entities.repository import EXAMS
+from entities.search import search_index
 from entities.student import Student
+from entities.unit_of_work import UnitOfWork
 
 
 class Console:
-    def __init__(self) -> None:
+    TOPIC_SUGGESTIONS = 10  # Сколько подходящих тем показывать при неоднозначном вводе
+    RECOMMENDATIONS = 3  # Сколько материалов рекомендовать перед консультацией
+    SEARCH_RESULTS = 10  # Сколько результатов поиска показывать
+    LEADERBOARD_SIZE = 10  # Сколько лучших и худших студентов показывать в рейтинге
+    PAGE_SIZE = PAGE_SIZE  # Сколько строк каталога показывать за раз
+    PAGE_HINT = "('>' — следующая страница, '/текст' — фильтр по началу или части названия, '/' — сбросить фильтр)"
+
+    def __init__(self, coalesce_writes: bool = False) -> None:
         self.student: Optional[Student] = None
         self.state: Optional[State] = None
         self.exam: Optional[Exam] = None
+        # Изменения студента записываются после операции или, при coalesce_writes, при выходе
+        self.unit_of_work = UnitOfWork(coalesce=coalesce_writes)
+        self.running = False
         # self.educational_material: Optional[Material] = None # Это поле больше не нужно, т.к. материалы загружаются по требованию
         self.set_state(InitialState(self))
 
@@ -20,176 +39,355 @@ class Console:
         self.state = state
 
     def start(self) -> None:
-        while True:
-            try:
-                self.state.show_menu()
-                choice = input("\nВыберите действие: ").strip()
-                self.state.handle_input(choice)
-            except KeyboardInterrupt:
-                print("\nПрограмма завершена.")
-                break
-            except Exception as e:
-                print(f"\nПроизошла ошибка: {e}")
+        self.running = True
+        with profiler.action("session"):
+            while self.running:
+                try:
+                    self.state.show_menu()
+                    choice = ask("\nВыберите действие: ").strip()
+                    # Действие профилируется по состоянию и пункту меню, например "StudentState:4"
+                    with profiler.action(f"{type(self.state).__name__}:{choice}"):
+                        self.state.handle_input(choice)
+                except (KeyboardInterrupt, EOFError):  # EOFError — закрыт ввод или соединение сеанса
+                    self.log_out()
+                    say("\nПрограмма завершена.")
+                    break
+                except Exception as e:
+                    say(f"\nПроизошла ошибка: {e}")
 
     def log_in(self) -> None:
         try:
-            student_id = input("Введите номер студенческого билета: ").strip()
+            student_id = ask("Введите номер студенческого билета: ").strip()
             if not student_id:
-                print("Ошибка: Номер студенческого билета не может быть пустым.")
+                say("Ошибка: Номер студенческого билета не может быть пустым.")
                 return
 
             student = Student.load(student_id)
             if student is None:
-                print("\nВаш номер не был найден в списке.")
+                say("\nВаш номер не был найден в списке.")
                 return
             self.student = student
-            print(f"Добро пожаловать, {self.student.first_name} {self.student.last_name}!")
+            self.unit_of_work.register(student)
+            say(f"Добро пожаловать, {self.student.first_name} {self.student.last_name}!")
         except Exception as e:
-            print(f"\nОшибка при входе в систему: {e}")
+            say(f"\nОшибка при входе в систему: {e}")
+
+    def stop(self) -> None:
+        """Завершает основной цикл после текущего действия."""
+        self.log_out()
+        self.running = False
+
+    def log_out(self) -> None:
+        """Записывает отложенные изменения и завершает сеанс студента."""
+        self.unit_of_work.close()
+        self.student = None
 
     def process_student_choice(self, choice: str) -> None:
         if choice == "1":
             if self.student:
                 self.student.self_assessment()
             else:
-                print("Студент не авторизован.")
+                say("Студент не авторизован.")
         elif choice == "2":  # Консультация по теме
             if self.student:
-                available_materials = Material.load_all_educational_materials()
-                if not available_materials:
-                    print("В базе данных нет доступных материалов для консультации.")
+                if not educational_listing.total():
+                    say("В базе данных нет доступных материалов для консультации.")
                     return
-                print("\nДоступные темы для консультации:")
-                for i, (key, material_data) in enumerate(available_materials.items(), 1):
-                    print(
-                        f"{i}. {material_data.get('topic')} (Название: {material_data.get('title', 'Нет')}, Автор: {material_data.get('author', 'Нет')})")
 
-                topic = input("Введите название темы для консультации (из списка выше): ").strip()
+                recommendations = recommendation_index.recommend(self.student, self.RECOMMENDATIONS)
+
+                def show_recommendations() -> None:
+                    say("\nРекомендуем по результатам пробных экзаменов:")
+                    for recommendation in recommendations:
+                        say(f"- {recommendation.material.topic} (Предмет: {recommendation.subject}, "
+                            f"ожидаемый прирост готовности: {recommendation.expected_gain:.1f}%)")
+
+                if recommendations:
+                    topic = self._browse(educational_listing, "\nДоступные темы для консультации:",
+                                         "Введите название темы для консультации (из списка выше, "
+                                         "Enter — первая рекомендованная): ",
+                                         self._material_line, show_recommendations)
+                    topic = topic or recommendations[0].material.topic
+                else:
+                    topic = self._browse(educational_listing, "\nДоступные темы для консультации:",
+                                         "Введите название темы для консультации (из списка выше): ",
+                                         self._material_line)
                 if not topic:
-                    print("Ошибка: Тема для консультации не может быть пустой.")
+                    say("Ошибка: Тема для консультации не может быть пустой.")
+                    return
+                topic = self._resolve_consultation_topic(topic)
+                if topic is None:
                     return
                 consultation = AdditionalClasses(self.student, topic)
                 consultation.conduct_consultation()
-                self.student.save()
+                self.unit_of_work.complete_operation()
             else:
-                print("Студент не авторизован.")
+                say("Студент не авторизован.")
         elif choice == "3":  # Изучение темы
             if self.student:
-                available_topics = Material.load_all_simple_topics()
-                if not available_topics:
-                    print("В базе данных нет доступных простых тем для изучения.")
+                if not topic_listing.total():
+                    say("В базе данных нет доступных простых тем для изучения.")
                     return
-                print("\nДоступные темы для изучения:")
-                for i, topic_data in enumerate(available_topics.values(),
-                                               1):  # Используем .values() т.к. простые темы хранятся по ключу-названию
-                    print(f"{i}. {topic_data.get('name')}")
-
-                self.student.study_topic()  # Метод student.study_topic() теперь сам запрашивает ввод темы
-                self.student.save()
+                topic_name = self._browse(topic_listing, "\nДоступные темы для изучения:",
+                                          "Введите название темы для изучения (из materials.json): ")
+                self.student.study_topic(topic_name)
+                self.unit_of_work.complete_operation()
             else:
-                print("Студент не авторизован.")
+                say("Студент не авторизован.")
         elif choice == "4":  # Сдача пробного экзамена
             if self.student:
-                available_exams = Exam.load_all()
-                if not available_exams:
-                    print("В базе данных нет доступных экзаменов.")
+                if not exam_listing.total():
+                    say("В базе данных нет доступных экзаменов.")
                     return
-                print("\nДоступные предметы для пробного экзамена:")
-                for i, subject_name in enumerate(available_exams.keys(), 1):
-                    print(f"{i}. {subject_name}")
-
-                self.student.take_mock_exam()  # Метод student.take_mock_exam() теперь сам запрашивает ввод предмета
-                self.student.save()
+                subject = self._browse(exam_listing, "\nДоступные предметы для пробного экзамена:",
+                                       "Введите название предмета для пробного экзамена: ")
+                self.student.take_mock_exam(subject)
+                self.unit_of_work.complete_operation()
             else:
-                print("Студент не авторизован.")
+                say("Студент не авторизован.")
         elif choice == "5":  # Запланировать время изучения
             if self.student:
                 self.student.plan_study_time()
-                self.student.save()
+                self.unit_of_work.complete_operation()
             else:
-                print("Студент не авторизован.")
+                say("Студент не авторизован.")
+        elif choice == "6":  # Поиск (правильные ответы студенту не показываются и не ищутся)
+            self.search(include_answers=False)
         else:
-            print("Неверное число!")
+            say("Неверное число!")
+
+    @staticmethod
+    def _material_line(number: int, entry: Entry) -> str:
+        material_data = entry[2]
+        return (f"{number}. {material_data.get('topic')} (Название: {material_data.get('title', 'Нет')}, "
+                f"Автор: {material_data.get('author', 'Нет')})")
+
+    def _browse(self, listing: CatalogListing, header: str, prompt: str,
+                line: Optional[Callable[[int, Entry], str]] = None,
+                footer: Optional[Callable[[], None]] = None) -> str:
+        """Постраничный вывод каталога с фильтром; возвращает ответ пользователя, не являющийся командой списка."""
+        line = line or (lambda number, entry: f"{number}. {entry[0]}")
+        query, cursor, shown = "", 0, 0
+        say(header)
+        while True:
+            entries, next_cursor = listing.page(query, cursor, self.PAGE_SIZE)
+            if not entries:
+                say(f"Ничего не найдено по запросу '{query}'.")
+            for number, entry in enumerate(entries, shown + 1):
+                say(line(number, entry))
+            shown += len(entries)
+            if next_cursor is not None or query:
+                say(("..." if next_cursor is not None else "") + self.PAGE_HINT)
+            if footer is not None:
+                footer()
+                footer = None
+            answer = ask(prompt).strip()
+            if answer == ">":
+                if next_cursor is None:
+                    say("Это последняя страница.")
+                    continue
+                cursor = next_cursor
+            elif answer.startswith("/"):
+                query, cursor, shown = answer[1:].strip(), 0, 0
+            else:
+                return answer
+
+    def _resolve_consultation_topic(self, topic: str) -> Optional[str]:
+        """Уточняет тему: точное совпадение, затем без учёта регистра, затем по началу названия."""
+        if Material.load_educational_material(topic) is not None:
+            return topic
+        matches = Material.find_educational_materials(topic)
+        if not matches:
+            matches = Material.find_educational_materials(topic, prefix=True, limit=self.TOPIC_SUGGESTIONS + 1)
+        if len(matches) == 1:
+            return matches[0].topic
+        if len(matches) > 1:
+            say("Найдено несколько подходящих тем, уточните название:")
+            for material in matches[:self.TOPIC_SUGGESTIONS]:
+                say(f"- {material.topic}")
+            if len(matches) > self.TOPIC_SUGGESTIONS:
+                say("...")
+            return None
+        return topic  # Сообщение об отсутствии материала выведет консультация
+
+    def search(self, include_answers: bool = True) -> None:
+        """Полнотекстовый поиск по вопросам экзаменов и дополнительной литературе."""
+        query = ask("Введите слова для поиска: ").strip()
+        if not query:
+            say("Ошибка: Запрос не может быть пустым.")
+            return
+        hits = search_index.search(query, self.SEARCH_RESULTS, include_answers)
+        if not hits:
+            say(f"По запросу '{query}' ничего не найдено.")
+            return
+        say(f"\nРезультаты поиска '{query}':")
+        for number, hit in enumerate(hits, 1):
+            if hit.collection == EXAMS:
+                topic, question, answer = (list(hit.question or []) + [None] * 3)[:3]
+                line = f"{number}. Экзамен '{hit.key}', вопрос {hit.position + 1} (Тема: {topic}): {question}"
+                say(line + (f" Ответ: {answer}" if include_answers else ""))
+            elif hit.record is not None:
+                say(self._material_line(number, (hit.key, hit.key, hit.record)))
+
+    def show_cohort_analytics(self) -> None:
+        try:
+            report = cohort_analytics.report()
+        except RuntimeError as e:
+            say(f"Ошибка: {e}")
+            return
+        if not report["students"]:
+            say("В базе данных нет студентов.")
+            return
+
+        readiness = report["readiness"]
+        say(f"\nСтудентов: {report['students']}")
+        say(f"Готовность: среднее {readiness['mean']:.1f}%, медиана {readiness['median']:.1f}%, "
+            f"ст. откл. {readiness['std']:.1f}, от {readiness['min']:.0f}% до {readiness['max']:.0f}%")
+        say("Распределение готовности:")
+        for bucket, amount in report["readiness_histogram"]:
+            say(f"  {bucket}%: {amount}")
+        planned = report["planned_minutes"]
+        say(f"Запланировано времени: среднее {planned['mean']:.1f} мин, медиана {planned['median']:.1f} мин")
+
+        if report["subjects"]:
+            say("\nПробные экзамены по предметам:")
+            for subject, stats in report["subjects"].items():
+                say(f"  {subject}: попыток {stats['attempts']}, средний результат {stats['mean_score'] * 100:.1f}%, "
+                    f"сдали {stats['pass_rate'] * 100:.1f}%")
+
+        labels = {
+            "readiness_planned_minutes": "готовность и запланированное время",
+            "readiness_mean_score": "готовность и результаты экзаменов",
+            "planned_minutes_mean_score": "запланированное время и результаты экзаменов",
+        }
+        say("\nКорреляции:")
+        for name, value in report["correlations"].items():
+            say(f"  {labels[name]}: {'недостаточно данных' if value is None else f'{value:.2f}'}")
+
+    @staticmethod
+    def _standing_line(standing: Standing) -> str:
+        return (f"{standing.rank}. {standing.name} (ID: {standing.student_id}) — готовность {standing.readiness}%, "
+                f"средний результат экзаменов {standing.mean_score * 100:.1f}%")
+
+    def show_leaderboard(self) -> None:
+        total = leaderboard.total()
+        if not total:
+            say("В базе данных нет студентов.")
+            return
+        say(f"\nРейтинг готовности (студентов: {total}):")
+        for standing in leaderboard.top(self.LEADERBOARD_SIZE):
+            say(self._standing_line(standing))
+        if total > self.LEADERBOARD_SIZE:
+            say("\nМенее всего готовы:")
+            for standing in leaderboard.bottom(min(self.LEADERBOARD_SIZE, total - self.LEADERBOARD_SIZE)):
+                say(self._standing_line(standing))
+        student_id = ask("Введите ID студента, чтобы узнать его место (Enter — пропустить): ").strip()
+        if not student_id:
+            return
+        standing = leaderboard.rank(student_id)
+        if standing is None:
+            say(f"Студент с ID '{student_id}' не найден.")
+        else:
+            say(f"{standing.name} на {standing.rank} месте из {total}.")
+
+    def show_profile(self) -> None:
+        """Скрытая команда преподавателя: итоги профилирования по действиям меню."""
+        if not profiler.enabled:
+            say("Профилирование выключено (запустите программу с --profile).")
+            return
+        summary = profiler.summary()
+        if not summary:
+            say("Замеров пока нет.")
+            return
+        say("\nПрофиль действий (по убыванию суммарного времени):")
+        for action, stats in summary.items():
+            say(f"  {action}: {stats['count']} раз, всего {stats['total_ms']:.1f} мс, "
+                f"в среднем {stats['mean_ms']:.2f} мс, прочитано {stats['bytes_read']} Б, "
+                f"записано {stats['bytes_written']} Б")
+            for call, call_stats in stats["calls"].items():
+                say(f"      {call}: {call_stats['count']} раз, {call_stats['ms']:.2f} мс")
+        if profiler.dump_path is not None:
+            say(f"Полный профиль будет записан при выходе в {profiler.dump_path}.")
 
     def process_added_choice(self, choice: str) -> None:
         try:
             if choice == "1":  # Add Student
-                student_id = input("ID студента: ").strip()
+                student_id = ask("ID студента: ").strip()
                 if not student_id:
-                    print("Ошибка: ID студента не может быть пустым.")
+                    say("Ошибка: ID студента не может быть пустым.")
                     return
 
                 # Проверка на существование студента с таким ID
                 if Student.load(student_id) is not None:
-                    print(f"Ошибка: Студент с ID '{student_id}' уже существует. Добавление отменено.")
+                    say(f"Ошибка: Студент с ID '{student_id}' уже существует. Добавление отменено.")
                     return
 
-                last_name = input("Фамилия: ").strip()
+                last_name = ask("Фамилия: ").strip()
                 if not last_name:
-                    print("Ошибка: Фамилия студента не может быть пустой.")
+                    say("Ошибка: Фамилия студента не может быть пустой.")
                     return
-                first_name = input("Имя: ").strip()
+                first_name = ask("Имя: ").strip()
                 if not first_name:
-                    print("Ошибка: Имя студента не может быть пустой.")
+                    say("Ошибка: Имя студента не может быть пустой.")
                     return
 
                 student = Student(student_id, last_name, first_name)
                 student.save()
-                print("Операция добавления студента прошла успешно.")
+                say("Операция добавления студента прошла успешно.")
             elif choice == "2":  # Add Exam
-                subject = input("Название предмета для экзамена: ").strip()
+                subject = ask("Название предмета для экзамена: ").strip()
                 if not subject:
-                    print("Ошибка: Название предмета для экзамена не может быть пустым.")
+                    say("Ошибка: Название предмета для экзамена не может быть пустым.")
                     return
 
                 # Проверка на существование экзамена
                 if Exam.load(subject) is not None:
-                    print(f"Ошибка: Экзамен по предмету '{subject}' уже существует. Добавление отменено.")
+                    say(f"Ошибка: Экзамен по предмету '{subject}' уже существует. Добавление отменено.")
                     return
 
                 questions_data = []
-                print("Введите вопросы для экзамена (введите '0' для темы, чтобы завершить):")
+                say("Введите вопросы для экзамена (введите '0' для темы, чтобы завершить):")
                 while True:
-                    topic = input("Тема вопроса: ").strip()
+                    topic = ask("Тема вопроса: ").strip()
                     if topic == "0":
                         if not questions_data:
-                            print("Ошибка: Экзамен должен содержать хотя бы один вопрос.")
+                            say("Ошибка: Экзамен должен содержать хотя бы один вопрос.")
                             return
                         break
                     if not topic:
-                        print("Ошибка: Тема вопроса не может быть пустой.")
+                        say("Ошибка: Тема вопроса не может быть пустой.")
                         continue
-                    question = input("Вопрос: ").strip()
+                    question = ask("Вопрос: ").strip()
                     if not question:
-                        print("Ошибка: Вопрос не может быть пустым.")
+                        say("Ошибка: Вопрос не может быть пустым.")
                         continue
-                    correct_answer = input("Правильный ответ: ").strip()
+                    correct_answer = ask("Правильный ответ (несколько допустимых — через «|»): ").strip()
                     if not correct_answer:
-                        print("Ошибка: Правильный ответ не может быть пустым.")
+                        say("Ошибка: Правильный ответ не может быть пустым.")
                         continue
                     questions_data.append([topic, question, correct_answer])
                 exam = Exam(subject, questions_data)
                 exam.save()
-                print("Операция добавления экзамена прошла успешно.")
+                say("Операция добавления экзамена прошла успешно.")
             elif choice == "3":  # Add Educational Material to educational_materials.json
-                subject = input("Предмет литературы (необязательно, Enter для пропуска): ").strip()
-                topic = input("Тема литературы: ").strip()
+                subject = ask("Предмет литературы (необязательно, Enter для пропуска): ").strip()
+                topic = ask("Тема литературы: ").strip()
                 if not topic:
-                    print("Ошибка: Тема литературы не может быть пустой.")
+                    say("Ошибка: Тема литературы не может быть пустой.")
                     return
 
                 # Проверка на существование материала
                 if Material.load_educational_material(topic) is not None:
-                    print(f"Ошибка: Дополнительная литература по теме '{topic}' уже существует. Добавление отменено.")
+                    say(f"Ошибка: Дополнительная литература по теме '{topic}' уже существует. Добавление отменено.")
                     return
 
-                title = input("Название книги/материала: ").strip()
+                title = ask("Название книги/материала: ").strip()
                 if not title:
-                    print("Ошибка: Название книги/материала не может быть пустой.")
+                    say("Ошибка: Название книги/материала не может быть пустой.")
                     return
-                author = input("Автор: ").strip()
+                author = ask("Автор: ").strip()
                 if not author:
-                    print("Ошибка: Автор не может быть пустой.")
+                    say("Ошибка: Автор не может быть пустой.")
                     return
 
                 new_material = Material(
@@ -200,65 +398,65 @@ class Console:
                     is_simple_topic=False
                 )
                 new_material.save()
-                print("Операция добавления дополнительной литературы прошла успешно.")
+                say("Операция добавления дополнительной литературы прошла успешно.")
             elif choice == "4":  # Add Topic to materials.json
-                topic_name = input("Введите название темы для добавления: ").strip()
+                topic_name = ask("Введите название темы для добавления: ").strip()
                 if not topic_name:
-                    print("Ошибка: Название темы не может быть пустой.")
+                    say("Ошибка: Название темы не может быть пустой.")
                     return
 
                 # Проверка на существование простой темы
                 if Material.load_simple_topic(topic_name) is not None:
-                    print(f"Ошибка: Простая тема '{topic_name}' уже существует. Добавление отменено.")
+                    say(f"Ошибка: Простая тема '{topic_name}' уже существует. Добавление отменено.")
                     return
 
                 new_topic = Material(topic=topic_name, is_simple_topic=True)
                 new_topic.save()
-                print("Операция добавления темы прошла успешно.")
+                say("Операция добавления темы прошла успешно.")
             else:
-                print("Неверное число!")
+                say("Неверное число!")
         except Exception as e:
-            print(f"\nОперация добавления завершилась ошибкой: {e}")
+            say(f"\nОперация добавления завершилась ошибкой: {e}")
 
     def process_deleted_choice(self, choice: str) -> None:
         try:
             if choice == "1":
-                student_id = input("ID студента для удаления: ").strip()
+                student_id = ask("ID студента для удаления: ").strip()
                 if not student_id:
-                    print("Ошибка: ID студента не может быть пустым.")
+                    say("Ошибка: ID студента не может быть пустым.")
                     return
                 if Student.delete_student(student_id):
-                    print("Операция удаления студента прошла успешно.")
+                    say("Операция удаления студента прошла успешно.")
                 else:
-                    print("Не удалось удалить студента: студент не найден или файл со студентами не существует.")
+                    say("Не удалось удалить студента: студент не найден или файл со студентами не существует.")
             elif choice == "2":
-                subject = input("Название экзамена для удаления: ").strip()
+                subject = ask("Название экзамена для удаления: ").strip()
                 if not subject:
-                    print("Ошибка: Название предмета для экзамена не может быть пустым.")
+                    say("Ошибка: Название предмета для экзамена не может быть пустым.")
                     return
                 if Exam.delete_exam(subject):
-                    print("Операция удаления экзамена прошла успешно.")
+                    say("Операция удаления экзамена прошла успешно.")
                 else:
-                    print("Не удалось удалить экзамен: экзамен не найден или файл с экзаменами не существует.")
+                    say("Не удалось удалить экзамен: экзамен не найден или файл с экзаменами не существует.")
             elif choice == "3":  # Delete Educational Material from educational_materials.json
-                topic_name = input("Название темы литературы для удаления: ").strip()
+                topic_name = ask("Название темы литературы для удаления: ").strip()
                 if not topic_name:
-                    print("Ошибка: Название темы литературы не может быть пустой.")
+                    say("Ошибка: Название темы литературы не может быть пустой.")
                     return
                 if Material.delete_educational_material(topic_name):
-                    print("Операция удаления дополнительной литературы прошла успешно.")
+                    say("Операция удаления дополнительной литературы прошла успешно.")
                 else:
-                    print("Не удалось удалить дополнительную литературу: материал не найден.")
+                    say("Не удалось удалить дополнительную литературу: материал не найден.")
             elif choice == "4":  # Delete Topic from materials.json
-                topic_name = input("Название темы для удаления: ").strip()
+                topic_name = ask("Название темы для удаления: ").strip()
                 if not topic_name:
-                    print("Ошибка: Название темы не может быть пустой.")
+                    say("Ошибка: Название темы не может быть пустой.")
                     return
                 if Material.delete_simple_topic(topic_name):
-                    print("Операция удаления темы прошла успешно.")
+                    say("Операция удаления темы прошла успешно.")
                 else:
-                    print("Не удалось удалить тему: тема не найдена.")
+                    say("Не удалось удалить тему: тема не найдена.")
             else:
-                print("Неверное число!")
+                say("Неверное число!")
         except Exception as e:
-            print(f"\nОперация удаления завершилась ошибкой: {e}")
\ No newline at end of file
+            say(f"\nОперация удаления завершилась ошибкой: {e}")
\ No newline at end of file
@@ -0,0 +1,94 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from console.channel import TextChannel, use_channel
+from console.console import Console
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_SESSIONS = 64
+
+
+class SocketChannel(TextChannel):
+    """Канал сеанса поверх asyncio-соединения.
+
+    Console работает в отдельном потоке и блокируется на ask(), а чтение и запись
+    выполняются в цикле событий сервера, поэтому сеансы не мешают друг другу.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter) -> None:
+        self.loop = loop
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+
+    def write(self, text: str) -> None:
+        if not self.closed:
+            self.loop.call_soon_threadsafe(self.writer.write, text.encode("utf-8"))
+
+    def ask(self, prompt: str = "") -> str:
+        if self.closed:
+            raise EOFError
+        self.write(prompt)
+        line = asyncio.run_coroutine_threadsafe(self.reader.readline(), self.loop).result()
+        if not line:
+            self.closed = True
+            raise EOFError
+        return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+
+class ConsoleServer:
+    """TCP- или Unix-сервер, в котором каждое подключение — отдельный сеанс Console."""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, coalesce_writes: bool = False) -> None:
+        self.max_sessions = max_sessions
+        self.coalesce_writes = coalesce_writes
+        self.active_sessions = 0
+        self.total_sessions = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_sessions, thread_name_prefix="console-session")
+        self._slots = asyncio.Semaphore(max_sessions)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def _run_console(self, channel: SocketChannel) -> None:
+        with use_channel(channel):
+            Console(coalesce_writes=self.coalesce_writes).start()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        channel = SocketChannel(loop, reader, writer)
+        async with self._slots:
+            self.active_sessions += 1
+            self.total_sessions += 1
+            try:
+                await loop.run_in_executor(self._executor, self._run_console, channel)
+            finally:
+                self.active_sessions -= 1
+                channel.closed = True
+                try:
+                    await writer.drain()
+                    writer.close()
+                    await writer.wait_closed()
+                except ConnectionError:
+                    pass
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                    unix_path: Optional[str] = None) -> asyncio.AbstractServer:
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self.handle_client, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self.handle_client, host, port)
+        return self._server
+
+    async def serve_forever(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                            unix_path: Optional[str] = None) -> None:
+        server = await self.start(host, port, unix_path)
+        async with server:
+            await server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
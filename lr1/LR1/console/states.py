@@ -1,6 +1,8 @@
 ﻿from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING
 
+from console.channel import say
+
 if TYPE_CHECKING:
     from console.console import Console # Избегает циклических импортов
 
@@ -19,10 +21,10 @@ class State(ABC):
 
 class InitialState(State):
     def show_menu(self) -> None:
-        print("\n Выберите пункт")
-        print("1. Подготовка к экзамену.")
-        print("2. Добавление данных.")
-        print("0. Выход.")
+        say("\n Выберите пункт")
+        say("1. Подготовка к экзамену.")
+        say("2. Добавление данных.")
+        say("0. Выход.")
 
     def handle_input(self, choice: str) -> None:
         try:
@@ -33,40 +35,44 @@ class InitialState(State):
             elif choice == "2":
                 self.console.set_state(TeacherState(self.console))
             elif choice == "0":
-                exit()
+                self.console.stop()
             else:
-                print("Неверный ввод!")
+                say("Неверный ввод!")
         except Exception as e:
-            print(f"\nОшибка: {e}")
+            say(f"\nОшибка: {e}")
 
 
 class StudentState(State):
     def show_menu(self) -> None:
-        print("\n     Главное меню")
-        print("1. Самооценка знаний.")
-        print("2. Консультация по теме.")
-        print("3. Изучение темы.")
-        print("4. Сдача пробного экзамена.")
-        print("5. Запланировать время изучения.") # Новый пункт
-        print("0. Выход.")
+        say("\n     Главное меню")
+        say("1. Самооценка знаний.")
+        say("2. Консультация по теме.")
+        say("3. Изучение темы.")
+        say("4. Сдача пробного экзамена.")
+        say("5. Запланировать время изучения.") # Новый пункт
+        say("6. Поиск по вопросам и литературе.")
+        say("0. Выход.")
 
     def handle_input(self, choice: str) -> None:
         try:
             if choice == "0":
-                self.console.student = None
+                self.console.log_out()
                 self.console.set_state(InitialState(self.console))
                 return
             self.console.process_student_choice(choice)
         except Exception as e:
-            print(f"\nОшибка при обработке ввода: {e}")
+            say(f"\nОшибка при обработке ввода: {e}")
 
 
 class TeacherState(State):
     def show_menu(self) -> None:
-        print("\n     Меню преподавателя")
-        print("1. Добавить данные.")
-        print("2. Удалить данные.")
-        print("0. Выход.")
+        say("\n     Меню преподавателя")
+        say("1. Добавить данные.")
+        say("2. Удалить данные.")
+        say("3. Аналитика по группе.")
+        say("4. Поиск по вопросам и литературе.")
+        say("5. Рейтинг готовности.")
+        say("0. Выход.")
 
     def handle_input(self, choice: str) -> None:
         try:
@@ -74,24 +80,32 @@ class TeacherState(State):
                 self.console.set_state(AddedState(self.console))
             elif choice == "2":
                 self.console.set_state(DeletedState(self.console))
+            elif choice == "3":
+                self.console.show_cohort_analytics()
+            elif choice == "4":
+                self.console.search()
+            elif choice == "5":
+                self.console.show_leaderboard()
+            elif choice == "prof":  # скрытая команда, в меню не показывается
+                self.console.show_profile()
             elif choice == "0":
                 self.console.student = None
                 self.console.set_state(InitialState(self.console))
                 return
             else:
-                print("Неверное число!")
+                say("Неверное число!")
         except Exception as e:
-            print(f"\nОшибка при обработке ввода: {e}")
+            say(f"\nОшибка при обработке ввода: {e}")
 
 
 class AddedState(State):
     def show_menu(self) -> None:
-        print("\n     Добавить:")
-        print("1. Студента.")
-        print("2. Экзамен.")
-        print("3. Дополнительную литературу.")
-        print("4. Тему.")
-        print("0. Выход.")
+        say("\n     Добавить:")
+        say("1. Студента.")
+        say("2. Экзамен.")
+        say("3. Дополнительную литературу.")
+        say("4. Тему.")
+        say("0. Выход.")
 
     def handle_input(self, choice: str) -> None:
         try:
@@ -101,17 +115,17 @@ class AddedState(State):
                 return
             self.console.process_added_choice(choice)
         except Exception as e:
-            print(f"\nОшибка при добавлении: {e}")
+            say(f"\nОшибка при добавлении: {e}")
 
 
 class DeletedState(State):
     def show_menu(self) -> None:
-        print("\n     Удалить:")
-        print("1. Студента.")
-        print("2. Экзамен.")
-        print("3. Дополнительную литературу.")
-        print("4. Тему.")
-        print("0. Выход.")
+        say("\n     Удалить:")
+        say("1. Студента.")
+        say("2. Экзамен.")
+        say("3. Дополнительную литературу.")
+        say("4. Тему.")
+        say("0. Выход.")
 
     def handle_input(self, choice: str) -> None:
         try:
@@ -121,4 +135,4 @@ class DeletedState(State):
                 return
             self.console.process_deleted_choice(choice)
         except Exception as e:
-            print(f"\nОшибка при удалении: {e}")
\ No newline at end of file
+            say(f"\nОшибка при удалении: {e}")
\ No newline at end of file
@@ -0,0 +1,139 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from entities.repository import STUDENTS, get_repository
+
+PASS_THRESHOLD = 0.5  # доля верных ответов, с которой пробный экзамен считается сданным
+READINESS_BINS = list(range(0, 101, 10))
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Для аналитики по группе нужен пакет numpy (pip install numpy).")
+    return numpy
+
+
+def parse_score(result: Any) -> Optional[float]:
+    """Доля верных ответов из строки вида "x/y"; None для некорректных значений."""
+    try:
+        correct, total = str(result).split("/")
+        correct, total = int(correct), int(total)
+    except ValueError:
+        return None
+    if total <= 0:
+        return None
+    return correct / total
+
+
+class CohortColumns:
+    """Данные всех студентов в виде столбцов NumPy.
+
+    scores — матрица (студенты x предметы) с долей верных ответов, NaN — экзамен не сдавался.
+    """
+
+    def __init__(self, records: Dict[str, Dict[str, Any]]) -> None:
+        np = _numpy()
+        self.ids: List[str] = list(records)
+        count = len(self.ids)
+        self.readiness = np.fromiter((record.get("readiness", 0) for record in records.values()),
+                                     dtype=np.float64, count=count)
+        self.planned_minutes = np.fromiter(
+            (record.get("planned_study_time_minutes", 0) for record in records.values()),
+            dtype=np.float64, count=count)
+
+        subject_columns: Dict[str, int] = {}
+        rows: List[int] = []
+        columns: List[int] = []
+        values: List[float] = []
+        for row, record in enumerate(records.values()):
+            for subject, result in record.get("exam_result", {}).items():
+                score = parse_score(result)
+                if score is None:
+                    continue
+                rows.append(row)
+                columns.append(subject_columns.setdefault(subject, len(subject_columns)))
+                values.append(score)
+        self.subjects: List[str] = list(subject_columns)
+        self.scores = np.full((count, len(self.subjects)), np.nan)
+        if values:
+            self.scores[np.array(rows), np.array(columns)] = np.array(values)
+
+
+def _correlation(np, first, second) -> Optional[float]:
+    mask = ~(np.isnan(first) | np.isnan(second))
+    if mask.sum() < 2 or np.std(first[mask]) == 0 or np.std(second[mask]) == 0:
+        return None
+    return float(np.corrcoef(first[mask], second[mask])[0, 1])
+
+
+def _distribution(np, values) -> Dict[str, float]:
+    return {
+        "mean": float(np.mean(values)),
+        "median": float(np.median(values)),
+        "std": float(np.std(values)),
+        "min": float(np.min(values)),
+        "max": float(np.max(values)),
+    }
+
+
+def compute_report(columns: CohortColumns) -> Dict[str, Any]:
+    np = _numpy()
+    report: Dict[str, Any] = {"students": len(columns.ids)}
+    if not columns.ids:
+        return report
+
+    report["readiness"] = _distribution(np, columns.readiness)
+    histogram, _ = np.histogram(columns.readiness, bins=READINESS_BINS)
+    report["readiness_histogram"] = [(f"{low}-{high}", int(amount)) for low, high, amount
+                                     in zip(READINESS_BINS, READINESS_BINS[1:], histogram)]
+    report["planned_minutes"] = _distribution(np, columns.planned_minutes)
+
+    attempted = ~np.isnan(columns.scores)
+    attempts = attempted.sum(axis=0)
+    passed = (np.nan_to_num(columns.scores, nan=-1.0) >= PASS_THRESHOLD).sum(axis=0)
+    # В каждом столбце есть хотя бы один результат, поэтому nanmean по предметам определён
+    mean_scores = np.nanmean(columns.scores, axis=0) if columns.subjects else []
+    report["subjects"] = {
+        subject: {
+            "attempts": int(attempts[i]),
+            "mean_score": float(mean_scores[i]),
+            "pass_rate": float(passed[i] / attempts[i]),
+        }
+        for i, subject in enumerate(columns.subjects) if attempts[i]
+    }
+
+    # Средний результат студента; NaN для тех, кто не сдавал пробных экзаменов
+    sums = np.nansum(columns.scores, axis=1)
+    counts = attempted.sum(axis=1)
+    student_mean_scores = np.divide(sums, counts, out=np.full(len(columns.ids), np.nan), where=counts > 0)
+    report["correlations"] = {
+        "readiness_planned_minutes": _correlation(np, columns.readiness, columns.planned_minutes),
+        "readiness_mean_score": _correlation(np, columns.readiness, student_mean_scores),
+        "planned_minutes_mean_score": _correlation(np, columns.planned_minutes, student_mean_scores),
+    }
+    return report
+
+
+class CohortAnalytics:
+    """Отчёт по группе, который пересчитывается только после изменения данных студентов."""
+
+    def __init__(self) -> None:
+        self._cached: Optional[Tuple[Any, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        self.recomputations = 0
+
+    def report(self) -> Dict[str, Any]:
+        repository = get_repository()
+        with self._lock:
+            version = (id(repository), repository.version(STUDENTS))
+            if self._cached is not None and version[1] is not None and self._cached[0] == version:
+                return self._cached[1]
+            report = compute_report(CohortColumns(repository.all(STUDENTS)))
+            self._cached = (version, report)
+            self.recomputations += 1
+            return report
+
+
+cohort_analytics = CohortAnalytics()
@@ -0,0 +1,181 @@
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ANSWER_SEPARATOR = "|"  # допустимые варианты правильного ответа: «Ньютон | Исаак Ньютон»
+OPERATORS = frozenset("+-*/^=<>%.")  # знаки, которые меняют смысл ответа и не отбрасываются
+FUZZY_MIN_LENGTH = 5  # более короткие ответы (числа, «2x») сравниваются только точно
+VERDICT_CACHE_SIZE = 4096  # сколько проверенных ответов помнит экзамен (в пакетной проверке ответы повторяются)
+
+_DASHES = str.maketrans({"−": "-", "–": "-", "—": "-", "‐": "-", "‑": "-"})
+_DECIMAL_COMMA = re.compile(r"(?<=\d),(?=\d)")
+_WORD_HYPHEN = re.compile(r"(?<=[^\W\d_])-(?=[^\W\d_])")  # дефис между буквами: «Нью-Йорк»
+_LOOSE_DOT = re.compile(r"(?<!\d)\.|\.(?!\d)")  # точка не внутри числа — конец фразы или сокращение
+
+
+def normalize_answer(answer: str) -> str:
+    """Ключ ответа для сравнения: без регистра, «ё» = «е», без пробелов и знаков препинания.
+
+    Знаки операций и десятичная точка сохраняются («1/2» не равно «12»), десятичная запятая
+    заменяется точкой («3,14» = «3.14»).
+    """
+    text = unicodedata.normalize("NFKC", str(answer)).casefold().replace("ё", "е").translate(_DASHES)
+    text = _LOOSE_DOT.sub(" ", _WORD_HYPHEN.sub(" ", _DECIMAL_COMMA.sub(".", text)))
+    return "".join(ch for ch in text if ch.isalnum() or ch in OPERATORS)
+
+
+def accepted_answers(correct_answer: str) -> List[str]:
+    """Варианты правильного ответа, записанные через ANSWER_SEPARATOR."""
+    variants = [variant.strip() for variant in str(correct_answer).split(ANSWER_SEPARATOR)]
+    return [variant for variant in variants if variant] or [str(correct_answer).strip()]
+
+
+def display_answer(correct_answer: str) -> str:
+    return " / ".join(accepted_answers(correct_answer))
+
+
+def max_typos(length: int) -> int:
+    """Сколько опечаток допускается в ответе такой длины."""
+    if length < FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if length < 10 else 2
+
+
+def _skeleton(key: str) -> str:
+    # Всё, кроме букв: цифры и знаки должны совпадать точно, опечатки допускаются только в словах
+    return "".join(ch for ch in key if not ch.isalpha())
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Расстояние Левенштейна, если оно не больше limit, иначе limit + 1.
+
+    Общие начало и конец строк отбрасываются, а для остатка считается только полоса шириной
+    2 * limit + 1 вокруг диагонали, с выходом, как только вся строка таблицы превысила limit.
+    """
+    over = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return over
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, char in enumerate(a, 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] if char == b[j - 1] else previous[j - 1] + 1
+            if previous[j] < value:
+                value = previous[j] + 1
+            if current[j - 1] < value:
+                value = current[j - 1] + 1
+            if value < best:
+                best = value
+            current[j] = value if value < over else over
+        if best > limit:
+            return over
+        previous = current
+    return previous[len(b)]
+
+
+class AnswerMatcher:
+    """Допустимые ответы на один вопрос, нормализованные заранее."""
+
+    def __init__(self, correct_answer: str) -> None:
+        self.correct_answer = correct_answer
+        keys = [key for key in map(normalize_answer, accepted_answers(correct_answer)) if key]
+        self._exact = frozenset(keys)
+        # (ключ, допустимые опечатки, всё кроме букв) для ответов, где опечатки допускаются
+        self._fuzzy: Tuple[Tuple[str, int, str], ...] = tuple(
+            (key, max_typos(len(key)), _skeleton(key)) for key in self._exact if max_typos(len(key)))
+
+    def matches(self, answer: str) -> bool:
+        key = normalize_answer(answer)
+        if key in self._exact:
+            return True
+        if not key or not self._fuzzy:
+            return False
+        skeleton = _skeleton(key)
+        return any(skeleton == fuzzy_skeleton and edit_distance(key, fuzzy_key, typos) <= typos
+                   for fuzzy_key, typos, fuzzy_skeleton in self._fuzzy)
+
+
+class ExamMatcher:
+    """Скомпилированные ответы экзамена в порядке вопросов."""
+
+    def __init__(self, correct_answers: Sequence[str]) -> None:
+        self.questions = [AnswerMatcher(answer) for answer in correct_answers]
+        self._verdicts: Dict[Tuple[int, str], bool] = {}
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def is_correct(self, position: int, answer: str) -> bool:
+        verdict = self._verdicts.get((position, answer))
+        if verdict is None:
+            verdict = self.questions[position].matches(answer)
+            if len(self._verdicts) >= VERDICT_CACHE_SIZE:
+                self._verdicts.clear()
+            self._verdicts[(position, answer)] = verdict
+        return verdict
+
+    def correctness(self, answers: Sequence[str]) -> List[bool]:
+        """Верность ответа на каждый вопрос; недостающие ответы считаются неверными."""
+        answers = list(answers)
+        return [position < len(answers) and self.is_correct(position, str(answers[position]))
+                for position in range(len(self.questions))]
+
+    def correctness_matrix(self, rows: Sequence[Sequence[str]]) -> List[List[bool]]:
+        """Верность ответов всей группы (строка — ответы студента) за один проход по вопросам.
+
+        Каждый различный ответ на вопрос проверяется один раз, как бы часто он ни встречался.
+        """
+        columns = []
+        for position, question in enumerate(self.questions):
+            column = [str(row[position]) if position < len(row) else None for row in rows]
+            verdicts = {answer: question.matches(answer) for answer in set(column) if answer is not None}
+            columns.append([answer is not None and verdicts[answer] for answer in column])
+        return [list(verdicts) for verdicts in zip(*columns)] if columns else [[] for _ in rows]
+
+
+class MatcherCache:
+    """Скомпилированные ответы экзаменов по предметам.
+
+    Ответы экзамена компилируются при первой проверке после загрузки или изменения
+    экзамена: кэш сравнивает правильные ответы с теми, по которым скомпилирован,
+    поэтому изменённый экзамен не проверяется по старым ответам.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._compiled: Dict[str, Tuple[Tuple[str, ...], ExamMatcher]] = {}
+        self.compilations = 0
+
+    def get(self, subject: str, correct_answers: Sequence[str]) -> ExamMatcher:
+        correct_answers = tuple(correct_answers)
+        with self._lock:
+            cached = self._compiled.get(subject)
+            if cached is not None and cached[0] == correct_answers:
+                return cached[1]
+        matcher = ExamMatcher(correct_answers)
+        with self._lock:
+            self._compiled[subject] = (correct_answers, matcher)
+            self.compilations += 1
+        return matcher
+
+    def invalidate(self, subject: Optional[str] = None) -> None:
+        with self._lock:
+            if subject is None:
+                self._compiled.clear()
+            else:
+                self._compiled.pop(subject, None)
+
+
+answer_matchers = MatcherCache()
@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from entities.locking import temporary_path
+from entities.profiling import profiler
+
+ROLLUPS_SUFFIX = ".rollups"
+MOVING_AVERAGE_WINDOW = 5  # по скольким последним попыткам считается скользящее среднее
+CHECKPOINT_EVERY = 200  # через сколько новых попыток сводки записываются на диск
+
+Rollups = Dict[str, Dict[str, Dict[str, Any]]]  # студент -> предмет -> сводка
+
+
+class _LogState:
+    def __init__(self, inode: Optional[int], offset: int, rollups: Rollups) -> None:
+        self.inode = inode
+        self.offset = offset  # до какого байта журнала учтены сводки
+        self.rollups = rollups
+        self.unsaved = 0  # попыток после последней записи сводок
+
+
+def _apply(rollups: Rollups, entry: Dict[str, Any]) -> None:
+    correct = entry["correct"]
+    score = sum(correct) / len(correct) if correct else 0.0
+    rollup = rollups.setdefault(entry["student"], {}).setdefault(
+        entry["subject"], {"attempts": 0, "best": score, "recent": []})
+    rollup["attempts"] += 1
+    rollup["best"] = max(rollup["best"], score)
+    rollup["last"] = score
+    rollup["last_result"] = f"{sum(correct)}/{len(correct)}"
+    rollup["last_at"] = entry["at"]
+    rollup["recent"] = (rollup["recent"] + [score])[-MOVING_AVERAGE_WINDOW:]
+    rollup["average"] = sum(rollup["recent"]) / len(rollup["recent"])
+
+
+class AttemptLog:
+    """Журнал попыток пробных экзаменов (только дозапись) и сводки по ним.
+
+    Каждая попытка — строка JSON в STORAGE_FILE: студент, предмет, верность ответа на
+    каждый вопрос и время. Сводки по студенту и предмету (число попыток, лучший и
+    последний результат, скользящее среднее) обновляются при каждой попытке и время от
+    времени записываются в <файл>.rollups вместе с позицией в журнале, так что при запуске
+    дочитывается только хвост журнала. Запросы прогресса читают только сводки.
+    """
+
+    STORAGE_FILE = Path("storage/attempts.jsonl")
+
+    def __init__(self, path: Optional[Path] = None, checkpoint_every: int = CHECKPOINT_EVERY) -> None:
+        self._path = path
+        self.checkpoint_every = checkpoint_every
+        self._states: Dict[str, _LogState] = {}
+        self._lock = threading.RLock()
+        self.appends = 0
+
+    @property
+    def path(self) -> str:
+        return os.path.abspath(self._path if self._path is not None else type(self).STORAGE_FILE)
+
+    @staticmethod
+    def _read_checkpoint(log_path: str, inode: Optional[int]) -> _LogState:
+        try:
+            with open(log_path + ROLLUPS_SUFFIX, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            if checkpoint["inode"] == inode:
+                return _LogState(inode, checkpoint["offset"], checkpoint["rollups"])
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            pass
+        return _LogState(inode, 0, {})
+
+    def _replay(self, state: _LogState, log_path: str) -> None:
+        """Учитывает в сводках строки журнала после state.offset; недописанная строка пропускается."""
+        with open(log_path, "rb") as f:
+            f.seek(state.offset)
+            chunk = f.read()
+        profiler.add_bytes(read=len(chunk))
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                _apply(state.rollups, json.loads(line))
+                state.unsaved += 1
+        state.offset += end
+
+    def _sync(self) -> _LogState:
+        log_path = self.path
+        try:
+            stat = os.stat(log_path)
+        except FileNotFoundError:
+            stat = None
+        inode = stat.st_ino if stat is not None else None
+        state = self._states.get(log_path)
+        if state is None or state.inode != inode or (stat is not None and stat.st_size < state.offset):
+            state = self._read_checkpoint(log_path, inode) if stat is not None else _LogState(None, 0, {})
+            self._states[log_path] = state
+        if stat is not None and stat.st_size > state.offset:
+            self._replay(state, log_path)  # в том числе попытки, записанные другими процессами
+        return state
+
+    def record_many(self, attempts: Iterable[Tuple[str, str, List[bool]]]) -> int:
+        """Дописывает попытки (студент, предмет, верность ответов) одним вызовом write()."""
+        now = time.time()
+        lines = [json.dumps({"student": student_id, "subject": subject, "correct": [int(c) for c in correct],
+                             "at": round(now, 3)}, ensure_ascii=False) + "\n"
+                 for student_id, subject, correct in attempts]
+        if not lines:
+            return 0
+        chunk = "".join(lines).encode("utf-8")
+        with self._lock:
+            log_path = self.path
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            with open(log_path, "ab") as f:
+                f.write(chunk)
+            profiler.add_bytes(written=len(chunk))
+            self.appends += len(lines)
+            state = self._sync()
+            if state.unsaved >= self.checkpoint_every:
+                self._write_checkpoint(log_path, state)
+        return len(lines)
+
+    def record(self, student_id: str, subject: str, correct: List[bool]) -> Dict[str, Any]:
+        """Дописывает одну попытку и возвращает обновлённую сводку по предмету."""
+        self.record_many([(student_id, subject, correct)])
+        return self.rollup(student_id, subject)
+
+    def progress(self, student_id: str) -> Dict[str, Dict[str, Any]]:
+        """Сводки студента по всем предметам (копия)."""
+        with self._lock:
+            return {subject: dict(rollup) for subject, rollup in self._sync().rollups.get(student_id, {}).items()}
+
+    def rollup(self, student_id: str, subject: str) -> Optional[Dict[str, Any]]:
+        return self.progress(student_id).get(subject)
+
+    def history(self, student_id: str, subject: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Все попытки студента по порядку. Читает весь журнал — для прогресса есть progress()."""
+        attempts = []
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    entry = json.loads(line)
+                    if entry["student"] == student_id and subject in (None, entry["subject"]):
+                        attempts.append(entry)
+        except FileNotFoundError:
+            pass
+        return attempts
+
+    @staticmethod
+    def _write_checkpoint(log_path: str, state: _LogState) -> None:
+        tmp_path = temporary_path(log_path + ROLLUPS_SUFFIX)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"inode": state.inode, "offset": state.offset, "rollups": state.rollups}, f, ensure_ascii=False)
+        os.replace(tmp_path, log_path + ROLLUPS_SUFFIX)
+        state.unsaved = 0
+
+    def checkpoint(self) -> None:
+        """Записывает сводки на диск, если после прошлой записи были новые попытки."""
+        with self._lock:
+            state = self._sync()
+            if state.unsaved and state.inode is not None:
+                self._write_checkpoint(self.path, state)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+
+attempt_log = AttemptLog()
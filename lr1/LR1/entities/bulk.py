@@ -0,0 +1,226 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from entities.exam import Exam
+from entities.material import Material
+from entities.repository import get_repository
+from entities.student import Student
+
+PARALLEL_MIN_ROWS = 5000  # меньшие файлы проверяются в текущем процессе: запуск пула дороже проверки
+
+# Вид данных -> (коллекция, обязательные поля строки файла)
+KINDS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "students": (Student.COLLECTION, ("id", "last_name", "first_name")),
+    "exams": (Exam.COLLECTION, ("subject", "topic", "question", "answer")),
+    "materials": (Material.COLLECTION_EDUCATIONAL, ("topic", "title", "author")),
+    "topics": (Material.COLLECTION_TOPICS, ("name",)),
+}
+OPTIONAL_FIELDS = {"students": ("readiness", "planned_study_time_minutes"), "materials": ("subject",)}
+FIELD_NAMES = {
+    "id": "ID студента", "last_name": "Фамилия", "first_name": "Имя", "subject": "Предмет",
+    "topic": "Тема", "question": "Вопрос", "answer": "Правильный ответ", "title": "Название",
+    "author": "Автор", "name": "Название темы",
+}
+
+Row = Tuple[int, Optional[Dict[str, Any]]]  # номер строки и её поля (None — строку не удалось разобрать)
+Validated = Tuple[int, Optional[Dict[str, Any]], Optional[str]]  # номер строки, запись или ошибка
+
+
+class ImportReport:
+    """Итоги пакетного импорта: сколько записей добавлено и какие строки отклонены."""
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self.imported = 0
+        self.errors: List[Tuple[int, str]] = []
+
+
+def read_rows(path: Path) -> Iterator[Row]:
+    """Читает строки CSV (с заголовком из имён полей) или JSON lines (объект в каждой строке)."""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            for line_number, row in enumerate(csv.DictReader(f), 2):
+                yield line_number, {key: value for key, value in row.items() if key is not None}
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    data = None
+                yield line_number, data if isinstance(data, dict) else None
+
+
+def _text(data: Dict[str, Any], field: str) -> str:
+    value = data.get(field)
+    return str(value).strip() if value is not None else ""
+
+
+def _validate_exam_questions(data: Dict[str, Any]) -> Tuple[Optional[List[List[str]]], Optional[str]]:
+    # Строка JSON lines может содержать весь экзамен: {"subject": ..., "questions": [[тема, вопрос, ответ], ...]}
+    if "questions" not in data:
+        return [[_text(data, "topic"), _text(data, "question"), _text(data, "answer")]], None
+    questions = data["questions"]
+    if not isinstance(questions, list) or not questions:
+        return None, "экзамен должен содержать хотя бы один вопрос"
+    result = []
+    for number, question in enumerate(questions, 1):
+        if not isinstance(question, list) or len(question) != 3 or not all(str(part).strip() for part in question):
+            return None, f"вопрос {number} должен состоять из непустых темы, вопроса и ответа"
+        result.append([str(part).strip() for part in question])
+    return result, None
+
+
+def validate_rows(kind: str, rows: List[Row]) -> List[Validated]:
+    """Проверяет строки одного вида: обязательные поля не пусты, числовые поля — неотрицательные числа."""
+    required = KINDS[kind][1]
+    validated: List[Validated] = []
+    for line_number, data in rows:
+        if data is None:
+            validated.append((line_number, None, "строку не удалось разобрать"))
+            continue
+        if kind == "exams":
+            questions, error = _validate_exam_questions(data)
+            required = ("subject",) if "questions" in data else KINDS[kind][1]
+        missing = [field for field in required if not _text(data, field)]
+        if missing:
+            validated.append((line_number, None, f"поле «{FIELD_NAMES[missing[0]]}» не может быть пустым"))
+            continue
+        if kind == "exams":
+            if error is not None:
+                validated.append((line_number, None, error))
+            else:
+                validated.append((line_number, {"subject": _text(data, "subject"), "questions": questions}, None))
+            continue
+        record = {field: _text(data, field) for field in required}
+        error = None
+        for field in OPTIONAL_FIELDS.get(kind, ()):
+            value = _text(data, field)
+            if not value:
+                continue
+            if kind == "students":
+                if not value.isdigit() or (field == "readiness" and int(value) > 100):
+                    error = f"поле «{field}» должно быть целым числом от 0" + (" до 100" if field == "readiness" else "")
+                    break
+                record[field] = int(value)
+            else:
+                record[field] = value
+        if kind == "students":
+            # Полные записи из JSON lines (например, после export) сохраняют результаты и материалы
+            for field, expected in (("exam_result", dict), ("materials", list)):
+                if isinstance(data.get(field), expected):
+                    record[field] = data[field]
+        validated.append((line_number, record, error) if error is None else (line_number, None, error))
+    return validated
+
+
+def _validate_parallel(kind: str, rows: List[Row], workers: Optional[int]) -> List[Validated]:
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(rows) < PARALLEL_MIN_ROWS:
+        return validate_rows(kind, rows)
+    size = -(-len(rows) // (workers * 4))  # по несколько частей на процесс, чтобы выровнять нагрузку
+    chunks = [rows[i:i + size] for i in range(0, len(rows), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(validate_rows, [kind] * len(chunks), chunks)
+        return [item for chunk in results for item in chunk]
+
+
+def _record_key(kind: str, record: Dict[str, Any]) -> str:
+    return record[{"students": "id", "exams": "subject", "materials": "topic", "topics": "name"}[kind]]
+
+
+def _existing_keys(kind: str) -> set:
+    collection = KINDS[kind][0]
+    if kind == "materials":
+        # Ключ литературы не обязательно совпадает с темой, а дубликатом считается та же тема
+        return {record.get("topic") for record in get_repository().all(collection).values()}
+    return set(get_repository().keys(collection))
+
+
+def _stored_record(kind: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    if kind == "students":
+        return Student(record["id"], record["last_name"], record["first_name"], record.get("exam_result"),
+                       record.get("materials"), readiness=record.get("readiness", 0),
+                       planned_study_time_minutes=record.get("planned_study_time_minutes", 0)).to_dict()
+    if kind == "exams":
+        return Exam(record["subject"], record["questions"]).to_dict()
+    if kind == "materials":
+        return Material(record["topic"], record["title"], record["author"], record.get("subject")).to_dict()
+    return Material(record["name"], is_simple_topic=True).to_dict()
+
+
+def import_file(kind: str, path: Path, workers: Optional[int] = None, skip_invalid: bool = False,
+                dry_run: bool = False) -> ImportReport:
+    """Импортирует файл одним сохранением коллекции.
+
+    Если есть ошибки, ничего не записывается, пока не задан skip_invalid (тогда
+    записываются только корректные строки). dry_run только проверяет файл.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Неизвестный вид данных '{kind}'.")
+    report = ImportReport(kind)
+    validated = _validate_parallel(kind, list(read_rows(path)), workers)
+
+    existing = _existing_keys(kind)
+    records: Dict[str, Dict[str, Any]] = {}
+    first_lines: Dict[str, int] = {}
+    for line_number, record, error in validated:
+        if error is None:
+            key = _record_key(kind, record)
+            if key in existing:
+                error = f"«{key}» уже существует"
+            elif key in records and kind == "exams":
+                records[key]["questions"].extend(record["questions"])  # вопросы одного экзамена по строкам
+                continue
+            elif key in records:
+                error = f"«{key}» повторяет строку {first_lines[key]}"
+        if error is not None:
+            report.errors.append((line_number, error))
+            continue
+        records[key] = record
+        first_lines[key] = line_number
+
+    if report.errors and not skip_invalid:
+        return report
+    if not dry_run:
+        get_repository().put_many(KINDS[kind][0], [(key, _stored_record(kind, record))
+                                                   for key, record in records.items()])
+    report.imported = len(records)
+    return report
+
+
+def _export_rows(kind: str, records: Dict[str, Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    for record in records.values():
+        if kind == "exams":
+            for topic, question, answer in record.get("questions", []):
+                yield {"subject": record.get("subject"), "topic": topic, "question": question, "answer": answer}
+        else:
+            yield record
+
+
+def export_file(kind: str, path: Path) -> int:
+    """Выгружает коллекцию в CSV (основные поля, экзамены — по вопросу на строку) или JSON lines (записи целиком)."""
+    if kind not in KINDS:
+        raise ValueError(f"Неизвестный вид данных '{kind}'.")
+    path = Path(path)
+    records = get_repository().all(KINDS[kind][0])
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            fields = KINDS[kind][1] + OPTIONAL_FIELDS.get(kind, ())
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            for row in _export_rows(kind, records):
+                writer.writerow(row)
+                count += 1
+        else:
+            for record in records.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+    return count
@@ -0,0 +1,89 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterable, Iterator, List
+
+
+class IOChannel(ABC):
+    """Канал ввода-вывода, через который консоль и сущности общаются с пользователем.
+
+    Модуль не зависит от консоли, поэтому им пользуются и сущности, и хранилище;
+    console.channel переэкспортирует его для интерфейса.
+    """
+
+    @abstractmethod
+    def say(self, *args: Any, **kwargs: Any) -> None:
+        """Вывод с той же сигнатурой, что и print()."""
+
+    @abstractmethod
+    def ask(self, prompt: str = "") -> str:
+        """Ввод строки с той же сигнатурой, что и input(); при закрытом канале — EOFError."""
+
+
+class StdIOChannel(IOChannel):
+    """Терминал: обычные print() и input()."""
+
+    def say(self, *args: Any, **kwargs: Any) -> None:
+        print(*args, **kwargs)
+
+    def ask(self, prompt: str = "") -> str:
+        return input(prompt)
+
+
+class TextChannel(IOChannel):
+    """Основа для каналов, которые передают вывод строками (сокеты, сценарии)."""
+
+    def say(self, *args: Any, sep: str = " ", end: str = "\n", **kwargs: Any) -> None:
+        self.write(sep.join(str(arg) for arg in args) + end)
+
+    @abstractmethod
+    def write(self, text: str) -> None:
+        pass
+
+
+class ScriptedChannel(TextChannel):
+    """Канал с заранее заданными ответами (сценарии, замеры производительности).
+
+    Когда ответы заканчиваются, ask() бросает EOFError, как при закрытом вводе.
+    """
+
+    def __init__(self, inputs: Iterable[str], keep_output: bool = True) -> None:
+        self._inputs = iter(inputs)
+        self.keep_output = keep_output
+        self.output: List[str] = []
+
+    def write(self, text: str) -> None:
+        if self.keep_output:
+            self.output.append(text)
+
+    def ask(self, prompt: str = "") -> str:
+        self.write(prompt)
+        try:
+            return next(self._inputs)
+        except StopIteration:
+            raise EOFError
+
+
+_current_channel: ContextVar[IOChannel] = ContextVar("io_channel", default=StdIOChannel())
+
+
+def current_channel() -> IOChannel:
+    return _current_channel.get()
+
+
+@contextmanager
+def use_channel(channel: IOChannel) -> Iterator[IOChannel]:
+    """Направляет say()/ask() текущего потока (или задачи) в channel."""
+    token = _current_channel.set(channel)
+    try:
+        yield channel
+    finally:
+        _current_channel.reset(token)
+
+
+def say(*args: Any, **kwargs: Any) -> None:
+    _current_channel.get().say(*args, **kwargs)
+
+
+def ask(prompt: str = "") -> str:
+    return _current_channel.get().ask(prompt)
@@ -0,0 +1,160 @@
+"""Необязательное сжатие файлов хранилища (zlib или lzma из стандартной библиотеки).
+
+Формат определяется по первым байтам файла, поэтому сжатые и обычные JSON-файлы
+читаются одинаково, а включение или выключение сжатия вступает в силу при следующей
+записи файла. Метод и уровень задаются для всего хранилища и отдельно для файлов по
+шаблону имени (fnmatch), например «students.json=lzma:6» или «exams/*=none».
+
+Преобразование существующего каталога:
+
+    python -m entities.compression storage --method zlib:6
+    python -m entities.compression storage --method none
+"""
+import argparse
+import fnmatch
+import lzma
+import os
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+from entities.locking import temporary_path
+
+COMPRESSION_METHODS = ("zlib", "lzma")
+DEFAULT_LEVELS = {"zlib": 6, "lzma": 6}  # для lzma — пресет 0..9
+CHUNK_SIZE = 1024 * 1024  # файлы сжимаются и распаковываются частями, без второй копии целиком
+LZMA_MAGIC = b"\xfd7zXZ\x00"
+
+Choice = Tuple[str, int]  # метод и уровень сжатия
+
+
+def parse_choice(text: str) -> Optional[Choice]:
+    """«zlib», «lzma:9» или «none» (без сжатия)."""
+    method, _, level = text.strip().lower().partition(":")
+    if method == "none":
+        return None
+    if method not in COMPRESSION_METHODS:
+        raise ValueError(f"Неизвестный метод сжатия: {method}")
+    if not level:
+        return method, DEFAULT_LEVELS[method]
+    if not level.isdigit() or int(level) > 9:
+        raise ValueError(f"Уровень сжатия должен быть числом от 0 до 9: {level}")
+    return method, int(level)
+
+
+def detect(head: bytes) -> Optional[str]:
+    """Метод сжатия по первым байтам файла; None — обычный JSON."""
+    if head.startswith(LZMA_MAGIC):
+        return "lzma"
+    # Заголовок zlib: 0x78 и контрольная сумма первых двух байтов; JSON не может начинаться с «x»
+    if len(head) >= 2 and head[0] == 0x78 and (head[0] << 8 | head[1]) % 31 == 0:
+        return "zlib"
+    return None
+
+
+def _compressor(choice: Choice):
+    method, level = choice
+    if method == "zlib":
+        return zlib.compressobj(level)
+    return lzma.LZMACompressor(preset=level)
+
+
+def _decompressor(method: str):
+    return zlib.decompressobj() if method == "zlib" else lzma.LZMADecompressor()
+
+
+def read_file(path: str) -> Tuple[bytes, int, Optional[str]]:
+    """Содержимое файла (распакованное, если файл сжат), прочитано байт с диска и метод сжатия."""
+    with open(path, "rb") as f:
+        chunk = f.read(CHUNK_SIZE)
+        method = detect(chunk)
+        if method is None:
+            rest = f.read()
+            return chunk + rest, len(chunk) + len(rest), None
+        decompressor = _decompressor(method)
+        parts: List[bytes] = []
+        disk_bytes = 0
+        while chunk:
+            disk_bytes += len(chunk)
+            parts.append(decompressor.decompress(chunk))
+            chunk = f.read(CHUNK_SIZE)
+    if method == "zlib":
+        parts.append(decompressor.flush())
+    if not decompressor.eof:
+        raise ValueError(f"Сжатый файл {path} обрывается")
+    return b"".join(parts), disk_bytes, method
+
+
+def write_file(f: BinaryIO, data: bytes, choice: Optional[Choice]) -> int:
+    """Записывает data в открытый файл (сжимая частями, если задан choice); возвращает число байт на диске."""
+    if choice is None:
+        f.write(data)
+        return len(data)
+    compressor = _compressor(choice)
+    written = 0
+    view = memoryview(data)
+    for start in range(0, len(data), CHUNK_SIZE):
+        compressed = compressor.compress(view[start:start + CHUNK_SIZE])
+        f.write(compressed)
+        written += len(compressed)
+    tail = compressor.flush()
+    f.write(tail)
+    return written + len(tail)
+
+
+class CompressionPolicy:
+    """Какой метод и уровень сжатия использовать при записи файла хранилища."""
+
+    def __init__(self) -> None:
+        self.default: Optional[Choice] = None  # по умолчанию файлы не сжимаются
+        self.per_file: Dict[str, Optional[Choice]] = {}  # шаблон имени -> выбор (None — не сжимать)
+
+    def configure(self, default: Optional[str] = None, per_file: Sequence[str] = ()) -> None:
+        """default — «метод[:уровень]», per_file — строки «шаблон=метод[:уровень]» или «шаблон=none»."""
+        self.default = parse_choice(default) if default else None
+        self.per_file = {}
+        for rule in per_file:
+            pattern, separator, choice = rule.partition("=")
+            if not separator or not pattern.strip():
+                raise ValueError(f"Ожидается «шаблон=метод[:уровень]»: {rule}")
+            self.per_file[pattern.strip()] = parse_choice(choice)
+
+    def choice_for(self, path: str) -> Optional[Choice]:
+        # Шаблон сравнивается с именем файла и с «каталог/имя» (для шардов вроде exams/*)
+        name = os.path.basename(path)
+        qualified = f"{os.path.basename(os.path.dirname(path))}/{name}"
+        for pattern, choice in self.per_file.items():
+            if fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(qualified, pattern):
+                return choice
+        return self.default
+
+
+compression_policy = CompressionPolicy()
+
+
+def convert_directory(directory: Path, choice: Optional[Choice]) -> List[Path]:
+    """Перезаписывает JSON-файлы каталога (и подкаталогов) с выбранным сжатием."""
+    converted = []
+    for path in sorted(Path(directory).rglob("*.json")):
+        data, _, method = read_file(str(path))
+        if (method, choice and choice[0]) == (None, None):
+            continue
+        tmp_path = temporary_path(path)
+        with open(tmp_path, "wb") as f:
+            write_file(f, data, choice)
+        os.replace(tmp_path, path)
+        converted.append(path)
+    return converted
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Сжатие и распаковка JSON-файлов хранилища lr1")
+    parser.add_argument("directory", type=Path, nargs="?", default=Path("storage"))
+    parser.add_argument("--method", default="zlib", help="метод[:уровень] (zlib, lzma) или none — распаковать")
+    args = parser.parse_args(argv)
+    converted = convert_directory(args.directory, parse_choice(args.method))
+    print(f"Преобразовано файлов: {len(converted)}")
+
+
+if __name__ == "__main__":
+    main()
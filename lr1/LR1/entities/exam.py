@@ -1,29 +1,53 @@
-﻿import json
-import os
-from pathlib import Path
+﻿from pathlib import Path
 
-class Exam:
+from entities.channel import say
+from entities.answers import answer_matchers
+from entities.identity_map import FrozenList, SharedEntity, entity_map, interned
+from entities.profiling import profiled
+from entities.recommendations import recommendation_index
+from entities.repository import EXAMS, get_repository, register_collection
+from entities.search import search_index
+
+
+class Exam(SharedEntity):
     STORAGE_FILE = Path("storage/exams.json")
+    COLLECTION = EXAMS
+    __slots__ = ("subject", "questions")
 
     def __init__(self, subject=None, questions=None):
         self.subject = subject
-        self.questions = questions or []
+        self.questions = [tuple(question) for question in questions or []]  # (тема, вопрос, ответ)
 
     @classmethod
+    def _from_record(cls, data):
+        exam = cls(subject=interned(data['subject']))
+        exam.questions = FrozenList(interned(tuple(q)) for q in data['questions'])
+        return exam.freeze()
+
+    @classmethod
+    @profiled("Exam.load")
     def load(cls, subject):
-        exams = cls.load_all()
-        if subject not in exams:
-            print(f"Экзамен по предмету '{subject}' не найден.")
+        """Экзамен по предмету. Объект общий (entity_map) и неизменяемый: для изменения создайте новый Exam и сохраните его."""
+        data = get_repository().get(cls.COLLECTION, subject)
+        if data is None:
+            say(f"Экзамен по предмету '{subject}' не найден.")
             return None
-        data = exams[subject]
-        return cls(subject=data['subject'], questions=[tuple(q) for q in data['questions']])
+        return entity_map.get(cls.COLLECTION, subject, data, cls._from_record)
 
     @classmethod
+    @profiled("Exam.load_all")
     def load_all(cls):
-        if not cls.STORAGE_FILE.exists():
-            return {}
-        with open(cls.STORAGE_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return get_repository().all(cls.COLLECTION)
+
+    @classmethod
+    @profiled("Exam.list_subjects")
+    def list_subjects(cls):
+        """Предметы экзаменов без загрузки вопросов."""
+        return get_repository().keys(cls.COLLECTION)
+
+    def matcher(self):
+        """Скомпилированные правильные ответы (ExamMatcher); компилируются один раз на предмет."""
+        return answer_matchers.get(self.subject, [correct_answer for _, _, correct_answer in self.questions])
 
     def to_dict(self):
         return {
@@ -31,22 +55,21 @@ class Exam:
             "questions": [list(q) for q in self.questions]
         }
 
+    @profiled("Exam.save")
     def save(self):
-        exams = self.load_all()
-        exams[self.subject] = self.to_dict()
-        os.makedirs(self.STORAGE_FILE.parent, exist_ok=True)
-        with open(self.STORAGE_FILE, "w", encoding="utf-8") as f:
-            json.dump(exams, f, ensure_ascii=False, indent=4)
+        record, version, new_version = get_repository().update_versioned(self.COLLECTION, self.subject,
+                                                                         lambda current: self.to_dict())
+        search_index.record_changed(self.COLLECTION, self.subject, record, version, new_version)
+        recommendation_index.record_changed(self.COLLECTION, self.subject, record, version, new_version)
 
     @classmethod
+    @profiled("Exam.delete_exam")
     def delete_exam(cls, subject):
-        if not cls.STORAGE_FILE.exists():
-            return False
-        with open(cls.STORAGE_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if subject in data:
-            del data[subject]
-            with open(cls.STORAGE_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
-            return True
-        return False
\ No newline at end of file
+        deleted, version, new_version = get_repository().delete_versioned(cls.COLLECTION, subject)
+        if deleted:
+            search_index.record_changed(cls.COLLECTION, subject, None, version, new_version)
+            recommendation_index.record_changed(cls.COLLECTION, subject, None, version, new_version)
+        return deleted
+
+
+register_collection(Exam.COLLECTION, lambda: Exam.STORAGE_FILE)
@@ -0,0 +1,95 @@
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from entities.attempts import attempt_log
+from entities.exam import Exam
+from entities.repository import get_repository
+from entities.student import Student
+
+READINESS_PER_CORRECT_ANSWER = 20  # как в Student.take_mock_exam
+
+
+class GradingReport:
+    """Итоги пакетной проверки: баллы по студентам и пропущенные строки."""
+
+    def __init__(self, subject: str, question_count: int) -> None:
+        self.subject = subject
+        self.question_count = question_count
+        self.scores: Dict[str, int] = {}
+        self.unknown_students: List[str] = []
+        self.invalid_rows: List[int] = []
+
+    @property
+    def graded(self) -> int:
+        return len(self.scores)
+
+    def average_score(self) -> float:
+        return sum(self.scores.values()) / len(self.scores) if self.scores else 0.0
+
+
+def read_answer_rows(path: Path) -> Iterator[Tuple[int, str, List[str]]]:
+    """Читает файл ответов: (номер строки, ID студента, ответы по порядку вопросов).
+
+    CSV: student_id,ответ1,ответ2,... (строка заголовка с student_id необязательна).
+    JSON lines: {"student_id": "...", "answers": ["...", ...]} в каждой строке.
+    Строки без ID возвращаются с пустым ID, чтобы попасть в отчёт как некорректные.
+    """
+    path = Path(path)
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            for line_number, row in enumerate(csv.reader(f), 1):
+                if not row or (line_number == 1 and row[0].strip() == "student_id"):
+                    continue
+                yield line_number, row[0].strip(), row[1:]
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                    yield line_number, str(data.get("student_id", "")).strip(), list(data.get("answers", []))
+                except (json.JSONDecodeError, AttributeError, TypeError):
+                    yield line_number, "", []
+
+
+def grade_cohort(subject: str, answers_path: Path) -> GradingReport:
+    """Проверяет ответы всей группы и сохраняет результаты одним пакетным обновлением хранилища.
+
+    Результаты применяются к текущим записям студентов под их блокировками
+    (Repository.update_many), поэтому изменения, сохранённые другими сеансами во время
+    проверки, не теряются.
+    """
+    exam = Exam.load(subject)
+    if exam is None:
+        raise ValueError(f"Экзамен по предмету '{subject}' не найден.")
+    matcher = exam.matcher()
+    report = GradingReport(subject, len(matcher))
+
+    rows: List[Tuple[str, List[str]]] = []
+    for line_number, student_id, answers in read_answer_rows(answers_path):
+        if not student_id:
+            report.invalid_rows.append(line_number)
+            continue
+        rows.append((student_id, answers))
+    matrix = matcher.correctness_matrix([answers for _, answers in rows])
+    scores: Dict[str, List[int]] = {}  # ID студента -> баллы его строк по порядку
+    for (student_id, _), correctness in zip(rows, matrix):
+        scores.setdefault(student_id, []).append(sum(correctness))
+
+    def apply(student_id: str, record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if record is None:
+            return None
+        student_scores = scores[student_id]
+        record = dict(record)
+        record["readiness"] = min(100, record.get("readiness", 0) + READINESS_PER_CORRECT_ANSWER * sum(student_scores))
+        record["exam_result"] = {**record.get("exam_result", {}), subject: f"{student_scores[-1]}/{len(matcher)}"}
+        return record
+
+    saved = get_repository().update_many(Student.COLLECTION, scores, apply)
+    report.unknown_students = [student_id for student_id in scores if student_id not in saved]
+    report.scores = {student_id: scores[student_id][-1] for student_id in scores if student_id in saved}
+    attempt_log.record_many([(student_id, subject, correctness)
+                             for (student_id, _), correctness in zip(rows, matrix) if student_id in saved])
+    return report
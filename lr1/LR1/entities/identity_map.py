@@ -0,0 +1,106 @@
+import sys
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+MAX_ENTRIES = 100_000  # при переполнении карта очищается, чтобы не держать в памяти весь каталог
+
+T = TypeVar("T")
+
+
+def interned(value: Any) -> Any:
+    """Копия данных записи (как copy.deepcopy), в которой строки интернированы.
+
+    Одинаковые предметы, темы, результаты и ссылки на материалы у разных записей
+    становятся одним объектом строки, а не отдельной копией у каждой записи.
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {interned(key): interned(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [interned(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(interned(item) for item in value)
+    return value
+
+
+class FrozenList(list):
+    """Список общего объекта: читается как обычный список, но не изменяется на месте.
+
+    Сложение и срезы возвращают обычные списки, поэтому изменённая копия собирается как
+    exam.questions + [...].
+    """
+
+    def _read_only(self, *args: Any, **kwargs: Any) -> Any:
+        raise TypeError("Список общего объекта (entity_map) нельзя изменять: создайте новый объект и сохраните его")
+
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+
+class SharedEntity:
+    """Сущность, которую entity_map раздаёт всем вызывающим: после freeze() её поля нельзя присвоить."""
+
+    __slots__ = ("_frozen",)
+
+    def freeze(self: T) -> T:
+        object.__setattr__(self, "_frozen", True)
+        return self
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"{type(self).__name__} общий для всех загрузок (entity_map): "
+                                 "создайте новый объект и сохраните его")
+        object.__setattr__(self, name, value)
+
+
+class IdentityMap:
+    """Общие объекты сущностей по ключу записи.
+
+    Повторная загрузка записи возвращает уже созданный объект, пока запись в хранилище
+    не изменилась: она сравнивается с записью, из которой объект создан (кэш JSON-файлов
+    отдаёт тот же объект, поэтому обычно хватает проверки is). Объекты общие для всех
+    вызывающих, поэтому в карту попадают только сущности, которые после загрузки не
+    изменяют (экзамены и материалы каталога): построитель замораживает их (SharedEntity.freeze,
+    списки — FrozenList), и попытка изменить общий объект на месте вызывает ошибку.
+    Для изменения создаётся и сохраняется новый объект.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, Hashable], Tuple[Any, Any]] = {}  # (коллекция, ключ) -> (запись, объект)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, collection: str, key: Hashable, record: Any, build: Callable[[Any], T]) -> T:
+        """Объект для записи record: из карты или созданный build(record)."""
+        entry = self._entries.get((collection, key))
+        if entry is not None and (entry[0] is record or entry[0] == record):
+            self.hits += 1
+            return entry[1]
+        entity = build(record)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[(collection, key)] = (record, entity)
+            self.misses += 1
+        return entity
+
+    def invalidate(self, collection: Optional[str] = None) -> None:
+        with self._lock:
+            if collection is None:
+                self._entries.clear()
+            else:
+                for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == collection]:
+                    del self._entries[entry_key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# Общая карта экзаменов и материалов для всех сеансов
+entity_map = IdentityMap()
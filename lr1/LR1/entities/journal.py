@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from entities.compression import compression_policy, write_file
+from entities.locking import lock_manager, temporary_path
+from entities.profiling import profiler
+from entities.store_cache import StoreCache, store_cache
+
+JOURNAL_SUFFIX = ".journal"
+COMPACTING_SUFFIX = ".journal.compacting"
+DEFAULT_COMPACTION_THRESHOLD = 1024 * 1024  # 1 МиБ журнала
+
+
+class _JournalState:
+    def __init__(self, snapshot_signature, compacting_signature, log_inode: Optional[int],
+                 log_offset: int, data: Dict[str, Any]) -> None:
+        self.snapshot_signature = snapshot_signature
+        self.compacting_signature = compacting_signature
+        self.log_inode = log_inode
+        self.log_offset = log_offset
+        self.data = data
+
+
+class JournalStore:
+    """Журналируемое хранилище поверх JSON-файлов.
+
+    Каждое сохранение или удаление дописывает одну строку в <файл>.journal, а чтение
+    собирает документ из снимка (самого JSON-файла) и хвоста журнала. Когда журнал
+    превышает compaction_threshold байт, фоновый поток записывает новый снимок.
+    """
+
+    def __init__(self, cache: StoreCache = store_cache,
+                 compaction_threshold: int = DEFAULT_COMPACTION_THRESHOLD) -> None:
+        self.cache = cache
+        self.compaction_threshold = compaction_threshold
+        self._states: Dict[str, _JournalState] = {}
+        self._compacting: Dict[str, threading.Thread] = {}
+        self._lock = threading.RLock()
+        self.appends = 0
+        self.compactions = 0
+
+    @staticmethod
+    def _paths(path: Path) -> Tuple[str, str, str]:
+        snapshot = os.path.abspath(path)
+        return snapshot, snapshot + COMPACTING_SUFFIX, snapshot + JOURNAL_SUFFIX
+
+    @staticmethod
+    def _stat(path: str):
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _apply(data: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        if entry["op"] == "put":
+            data[entry["key"]] = entry["value"]
+        elif entry["op"] == "del":
+            data.pop(entry["key"], None)
+
+    def _replay(self, data: Dict[str, Any], log_path: str, offset: int = 0) -> int:
+        """Применяет записи журнала начиная с offset, возвращает новое смещение.
+
+        Недописанная последняя строка (сбой во время записи) пропускается.
+        """
+        with open(log_path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+        profiler.add_bytes(read=len(chunk))
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                self._apply(data, json.loads(line))
+        return offset + end
+
+    def load(self, path: Path) -> Dict[str, Any]:
+        """Возвращает актуальный документ: снимок плюс журнал."""
+        snapshot_path, compacting_path, log_path = self._paths(path)
+        with self._lock:
+            snapshot_stat = self._stat(snapshot_path)
+            compacting_stat = self._stat(compacting_path)
+            log_stat = self._stat(log_path)
+            snapshot_signature = snapshot_stat and (snapshot_stat.st_mtime_ns, snapshot_stat.st_size)
+            compacting_signature = compacting_stat and (compacting_stat.st_mtime_ns, compacting_stat.st_size)
+            log_inode = log_stat.st_ino if log_stat else None
+
+            state = self._states.get(snapshot_path)
+            if (state is not None
+                    and state.snapshot_signature == snapshot_signature
+                    and state.compacting_signature == compacting_signature
+                    and state.log_inode == log_inode
+                    and (log_stat is None or log_stat.st_size >= state.log_offset)):
+                # Дочитываем только хвост журнала
+                if log_stat is not None and log_stat.st_size > state.log_offset:
+                    state.log_offset = self._replay(state.data, log_path, state.log_offset)
+                return state.data
+
+            data = dict(self.cache.load(Path(snapshot_path)))
+            if compacting_stat is not None:
+                self._replay(data, compacting_path)
+            offset = self._replay(data, log_path) if log_stat is not None else 0
+            self._states[snapshot_path] = _JournalState(snapshot_signature, compacting_signature,
+                                                        log_inode, offset, data)
+            return data
+
+    @contextmanager
+    def write_lock(self, path: Path) -> Iterator[None]:
+        """Блокировки, под которыми дописывается журнал документа path."""
+        snapshot_path, _, _ = self._paths(path)
+        with self._lock, lock_manager.file_lock(snapshot_path):
+            yield
+
+    def _append(self, path: Path, entries: List[Dict[str, Any]]) -> None:
+        """Дописывает записи в журнал одним вызовом write()."""
+        snapshot_path, _, log_path = self._paths(path)
+        with self.write_lock(path):
+            # Блокировка файла не даёт другому процессу переименовать журнал на сжатие между load() и записью
+            data = self.load(path)
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            chunk = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8")
+            with open(log_path, "ab") as f:
+                f.write(chunk)
+                f.flush()
+                log_stat = os.fstat(f.fileno())
+            profiler.add_bytes(written=len(chunk))
+            state = self._states[snapshot_path]
+            if state.log_inode is None:
+                state.log_inode = log_stat.st_ino
+            if state.log_offset + len(chunk) == log_stat.st_size:
+                # Журнал не дописывался из других процессов: применяем записи без перечитывания
+                for entry in entries:
+                    self._apply(data, entry)
+                state.log_offset = log_stat.st_size
+            self.appends += len(entries)
+            if log_stat.st_size >= self.compaction_threshold:
+                self._start_compaction(path)
+
+    def put(self, path: Path, key: str, value: Any) -> None:
+        self._append(path, [{"op": "put", "key": key, "value": value}])
+
+    def put_many(self, path: Path, items: Iterable[Tuple[str, Any]]) -> None:
+        entries = [{"op": "put", "key": key, "value": value} for key, value in items]
+        if entries:
+            self._append(path, entries)
+
+    def delete(self, path: Path, key: str) -> bool:
+        with self._lock:
+            if key not in self.load(path):
+                return False
+            self._append(path, [{"op": "del", "key": key}])
+            return True
+
+    def _start_compaction(self, path: Path) -> None:
+        snapshot_path, _, _ = self._paths(path)
+        thread = self._compacting.get(snapshot_path)
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=self.compact, args=(path,), daemon=True)
+        self._compacting[snapshot_path] = thread
+        thread.start()
+
+    def compact(self, path: Path) -> None:
+        """Записывает новый снимок и очищает журнал.
+
+        Журнал сначала переименовывается в .journal.compacting, поэтому новые записи
+        идут в свежий файл и не ждут окончания записи снимка.
+        """
+        snapshot_path, compacting_path, log_path = self._paths(path)
+        with self._lock, lock_manager.file_lock(snapshot_path):
+            if os.path.exists(compacting_path) or not os.path.exists(log_path):
+                return
+            data = dict(self.load(path))
+            os.replace(log_path, compacting_path)
+            self._states.pop(snapshot_path, None)
+
+        tmp_path = temporary_path(snapshot_path)
+        with open(tmp_path, "wb") as f:
+            write_file(f, json.dumps(data, ensure_ascii=False, indent=4).encode("utf-8"),
+                       compression_policy.choice_for(snapshot_path))
+        with self._lock, lock_manager.file_lock(snapshot_path):
+            os.replace(tmp_path, snapshot_path)
+            os.remove(compacting_path)
+            self.cache.invalidate(Path(snapshot_path))
+            self._states.pop(snapshot_path, None)
+            self.compactions += 1
+
+    def wait_for_compaction(self) -> None:
+        for thread in list(self._compacting.values()):
+            thread.join()
+
+    def invalidate(self, path: Optional[Path] = None) -> None:
+        with self._lock:
+            if path is None:
+                self._states.clear()
+            else:
+                self._states.pop(self._paths(path)[0], None)
+
+
+journal_store = JournalStore()
@@ -0,0 +1,88 @@
+import bisect
+import threading
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from entities.repository import EDUCATIONAL_MATERIALS, EXAMS, SIMPLE_TOPICS, get_repository
+
+PAGE_SIZE = 10
+
+# Запись списка: (подпись, ключ, запись или None, если список строится только по ключам)
+Entry = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+def _fold(text: Any) -> str:
+    return str(text).casefold() if text is not None else ""
+
+
+class CatalogListing:
+    """Отсортированный по подписи список записей коллекции для постраничного вывода меню.
+
+    Список перестраивается только при изменении версии коллекции. Страница начинается
+    с курсора — позиции, на которой закончилась предыдущая, — поэтому её вывод не зависит
+    от размера каталога. Фильтр сначала даёт подписи, начинающиеся с введённого текста
+    (двоичный поиск), затем остальные записи, содержащие его в подписи или в search_text.
+    """
+
+    def __init__(self, collection: str, label: Callable[[str, Dict[str, Any]], Any],
+                 search_text: Optional[Callable[[Dict[str, Any]], Any]] = None, keys_only: bool = False) -> None:
+        self.collection = collection
+        self.label = label
+        self.search_text = search_text
+        self.keys_only = keys_only  # подпись — сам ключ, записи не читаются (экзамены)
+        self._lock = threading.Lock()
+        self._version: Any = None
+        self._folded: List[str] = []
+        self._entries: List[Entry] = []
+        self._searchable: List[str] = []
+        self.rebuilds = 0
+
+    def _refresh(self) -> None:
+        repository = get_repository()
+        version = (id(repository), repository.version(self.collection))
+        if version == self._version and version[1] is not None:
+            return
+        if self.keys_only:
+            items = [(key, key, None) for key in repository.keys(self.collection)]
+        else:
+            items = [(str(self.label(key, record)), key, record)
+                     for key, record in repository.all(self.collection).items()]
+        items.sort(key=lambda item: (_fold(item[0]), item[0]))
+        self._entries = items
+        self._folded = [_fold(label) for label, _, _ in items]
+        self._searchable = [folded + "\n" + _fold(self.search_text(record)) if self.search_text and record else folded
+                            for folded, (_, _, record) in zip(self._folded, items)]
+        self._version = version
+        self.rebuilds += 1
+
+    def total(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._entries)
+
+    def _matches(self, query: str, cursor: int) -> Iterator[Tuple[int, Entry]]:
+        # Позиции курсора: сначала совпадения по началу подписи [low, high), затем остальные записи по порядку
+        low = bisect.bisect_left(self._folded, query)
+        high = bisect.bisect_left(self._folded, query + "\U0010ffff", low)
+        prefix_count = high - low
+        for position in range(cursor, prefix_count):
+            yield position, self._entries[low + position]
+        if not query:
+            return
+        for index in range(max(0, cursor - prefix_count), len(self._entries)):
+            if not low <= index < high and query in self._searchable[index]:
+                yield prefix_count + index, self._entries[index]
+
+    def page(self, query: str = "", cursor: int = 0, size: int = PAGE_SIZE) -> Tuple[List[Entry], Optional[int]]:
+        """Записи страницы и курсор следующей страницы (None — страница последняя)."""
+        with self._lock:
+            self._refresh()
+            found = list(islice(self._matches(_fold(query.strip()), cursor), size + 1))
+        next_cursor = found[size][0] if len(found) > size else None
+        return [entry for _, entry in found[:size]], next_cursor
+
+
+educational_listing = CatalogListing(EDUCATIONAL_MATERIALS, lambda key, record: record.get("topic") or key,
+                                     search_text=lambda record: record.get("title"))
+topic_listing = CatalogListing(SIMPLE_TOPICS, lambda key, record: record.get("name") or key)
+exam_listing = CatalogListing(EXAMS, lambda key, record: key, keys_only=True)
@@ -0,0 +1,132 @@
+import errno
+import os
+import threading
+import zlib
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировки действуют только между потоками одного процесса
+    fcntl = None
+
+LOCK_SUFFIX = ".lock"
+RECORD_STRIPES = 4096  # записи коллекции делят байты файла блокировок по хэшу ключа
+
+
+def temporary_path(path: Path) -> str:
+    """Имя временного файла для записи с последующим os.replace, своё у каждого процесса и потока."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+class _RangeLock:
+    """Один байт файла блокировок: исключает и потоки процесса (RLock), и другие процессы (fcntl.lockf)."""
+
+    def __init__(self, manager: 'LockManager', lock_path: str, offset: int) -> None:
+        self.manager = manager
+        self.lock_path = lock_path
+        self.offset = offset
+        self._thread_lock = threading.RLock()
+        self._depth = 0  # вложенные захваты тем же потоком
+
+    def acquire(self) -> None:
+        if not self._thread_lock.acquire(blocking=False):
+            self.manager.waits += 1
+            self._thread_lock.acquire()
+        self._depth += 1
+        if self._depth > 1 or fcntl is None:
+            return
+        fd = self.manager._fd(self.lock_path)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, self.offset)
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EACCES):
+                self._release_thread_lock()
+                raise
+            self.manager.waits += 1
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX, 1, self.offset)
+            except OSError:
+                self._release_thread_lock()
+                raise
+
+    def _release_thread_lock(self) -> None:
+        self._depth -= 1
+        self._thread_lock.release()
+
+    def release(self) -> None:
+        if self._depth == 1 and fcntl is not None:
+            fcntl.lockf(self.manager._fd(self.lock_path), fcntl.LOCK_UN, 1, self.offset)
+        self._release_thread_lock()
+
+
+class LockManager:
+    """Рекомендательные блокировки файлов хранилища и отдельных записей.
+
+    Для файла данных рядом создаётся <файл>.lock: байт 0 защищает перезапись файла
+    целиком, остальные байты — записи (по хэшу ключа). Записи разных студентов
+    блокируются независимо, поэтому сеансы разных процессов не ждут друг друга дольше,
+    чем длится сама запись файла. Блокировку записи берут раньше блокировки файла.
+
+    Дескрипторы файлов блокировок не закрываются: закрытие любого дескриптора файла
+    снимает все блокировки fcntl этого процесса на нём.
+    """
+
+    def __init__(self) -> None:
+        self._guard = threading.Lock()
+        self._fds: Dict[str, int] = {}
+        self._locks: Dict[Tuple[str, int], _RangeLock] = {}
+        self.waits = 0  # сколько раз блокировка была занята и пришлось ждать
+
+    def _fd(self, lock_path: str) -> int:
+        with self._guard:
+            fd = self._fds.get(lock_path)
+            if fd is None:
+                os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+                fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                self._fds[lock_path] = fd
+            return fd
+
+    def _lock(self, path: Path, offset: int) -> _RangeLock:
+        lock_path = os.path.abspath(path) + LOCK_SUFFIX
+        with self._guard:
+            lock = self._locks.get((lock_path, offset))
+            if lock is None:
+                lock = self._locks[(lock_path, offset)] = _RangeLock(self, lock_path, offset)
+            return lock
+
+    @contextmanager
+    def _held(self, lock: _RangeLock) -> Iterator[None]:
+        lock.acquire()
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def file_lock(self, path: Path):
+        """Исключительная блокировка перезаписи файла path."""
+        return self._held(self._lock(path, 0))
+
+    @staticmethod
+    def _record_offset(key: str) -> int:
+        return 1 + zlib.crc32(key.encode("utf-8")) % RECORD_STRIPES
+
+    def record_lock(self, path: Path, key: str):
+        """Исключительная блокировка записи key в файле path (записи с одним хэшем делят блокировку)."""
+        return self._held(self._lock(path, self._record_offset(key)))
+
+    @contextmanager
+    def records_lock(self, path: Path, keys: Iterable[str]) -> Iterator[None]:
+        """Блокировки нескольких записей сразу.
+
+        Байты берутся по возрастанию смещения, поэтому два пакетных обновления с
+        пересекающимися ключами не могут ждать друг друга по кругу.
+        """
+        with ExitStack() as stack:
+            for offset in sorted({self._record_offset(key) for key in keys}):
+                stack.enter_context(self._held(self._lock(path, offset)))
+            yield
+
+
+lock_manager = LockManager()
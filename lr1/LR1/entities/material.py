@@ -1,11 +1,28 @@
-﻿import json
-import os
+﻿import copy
+import json
+from collections import Counter
+from collections.abc import MutableSequence
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple, Union
 
-class Material:
+from entities.channel import say
+from entities.identity_map import SharedEntity, entity_map, interned
+from entities.profiling import profiled
+from entities.recommendations import recommendation_index
+from entities.repository import EDUCATIONAL_MATERIALS, SIMPLE_TOPICS, STUDENTS, get_repository, register_collection
+from entities.search import search_index
+
+# Ссылки на материалы в записи студента: "t:<простая тема>" и "m:<ключ записи каталога литературы>"
+TOPIC_REF = "t:"
+LITERATURE_REF = "m:"
+StoredMaterial = Union[str, Dict[str, Any]]
+
+class Material(SharedEntity):
     STORAGE_FILE_EDUCATIONAL = Path("storage/educational_materials.json")
     STORAGE_FILE_TOPICS = Path("storage/materials.json") # Для простых тем
+    COLLECTION_EDUCATIONAL = EDUCATIONAL_MATERIALS
+    COLLECTION_TOPICS = SIMPLE_TOPICS
+    __slots__ = ("topic", "title", "author", "subject", "is_simple_topic")
 
     def __init__(self, topic: str, title: Optional[str] = None, author: Optional[str] = None, subject: Optional[str] = None, is_simple_topic: bool = False):
         self.topic = topic
@@ -30,79 +47,296 @@ class Material:
             return data
 
     @classmethod
+    @profiled("Material.load_educational_material")
     def load_educational_material(cls, topic_name: str) -> Optional['Material']:
-        materials = cls._load_from_file(cls.STORAGE_FILE_EDUCATIONAL)
-        for key, data in materials.items():
-            if data.get("topic") == topic_name:
-                return cls(topic=data.get("topic"),
-                           title=data.get("title"),
-                           author=data.get("author"),
-                           subject=data.get("subject"),
-                           is_simple_topic=False)
-        return None
+        found = cls._find_educational_material(topic_name)
+        if found is None:
+            return None
+        return cls._from_educational_record(found[1], found[0])
+
+    @classmethod
+    @profiled("Material.find_educational_materials")
+    def find_educational_materials(cls, query: str, prefix: bool = False,
+                                   limit: Optional[int] = None) -> List['Material']:
+        """Поиск дополнительной литературы по теме без учёта регистра (точно или по префиксу)."""
+        try:
+            if prefix:
+                found = get_repository().find_prefix(cls.COLLECTION_EDUCATIONAL, "topic", query, limit=limit)
+            else:
+                found = get_repository().find_all_by(cls.COLLECTION_EDUCATIONAL, "topic", query,
+                                                     case_insensitive=True)[:limit]
+        except json.JSONDecodeError:
+            say(f"Ошибка чтения файла {cls.STORAGE_FILE_EDUCATIONAL}. Возможно, файл пуст или поврежден.")
+            return []
+        return [cls._from_educational_record(data, key) for key, data in found]
 
     @classmethod
+    def _from_educational_record(cls, data: Dict[str, Any], key: Optional[str] = None) -> 'Material':
+        """Материал каталога; объект общий для повторных загрузок той же записи (entity_map) и неизменяемый."""
+        return entity_map.get(cls.COLLECTION_EDUCATIONAL, key if key is not None else data.get("topic"), data,
+                              cls._build_educational)
+
+    @classmethod
+    def _build_educational(cls, data: Dict[str, Any]) -> 'Material':
+        return cls(topic=interned(data.get("topic")),
+                   title=data.get("title"),
+                   author=interned(data.get("author")),
+                   subject=interned(data.get("subject")),
+                   is_simple_topic=False).freeze()
+
+    @classmethod
+    @profiled("Material.load_simple_topic")
     def load_simple_topic(cls, topic_name: str) -> Optional['Material']:
-        topics = cls._load_from_file(cls.STORAGE_FILE_TOPICS)
-        if topic_name in topics and topics[topic_name].get("name") == topic_name:
-            return cls(topic=topic_name, is_simple_topic=True)
+        try:
+            data = get_repository().get(cls.COLLECTION_TOPICS, topic_name)
+        except json.JSONDecodeError:
+            say(f"Ошибка чтения файла {cls.STORAGE_FILE_TOPICS}. Возможно, файл пуст или поврежден.")
+            return None
+        if data is not None and data.get("name") == topic_name:
+            return entity_map.get(cls.COLLECTION_TOPICS, topic_name, data,
+                                  lambda record: cls(topic=interned(topic_name), is_simple_topic=True).freeze())
         return None
 
     @classmethod
-    def _load_from_file(cls, file_path: Path) -> Dict[str, Any]:
-        if not file_path.exists():
-            return {}
+    def _find_educational_material(cls, topic_name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        # Ключ словаря не обязательно совпадает с темой, поэтому ищем по полю "topic"
+        try:
+            return get_repository().find_by(cls.COLLECTION_EDUCATIONAL, "topic", topic_name)
+        except json.JSONDecodeError:
+            say(f"Ошибка чтения файла {cls.STORAGE_FILE_EDUCATIONAL}. Возможно, файл пуст или поврежден.")
+            return None
+
+    @classmethod
+    def _catalog_key(cls, material: Dict[str, Any]) -> Optional[str]:
+        """Ключ записи каталога, совпадающей с material (темы записей могут повторяться)."""
+        try:
+            found = get_repository().find_all_by(cls.COLLECTION_EDUCATIONAL, "topic", material.get("topic"))
+        except json.JSONDecodeError:
+            say(f"Ошибка чтения файла {cls.STORAGE_FILE_EDUCATIONAL}. Возможно, файл пуст или поврежден.")
+            return None
+        for key, data in found:
+            if cls._from_educational_record(data, key).to_dict() == material:
+                return key
+        return None
+
+    @classmethod
+    def _load_collection(cls, collection: str) -> Dict[str, Any]:
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return get_repository().all(collection)
         except json.JSONDecodeError:
-            print(f"Ошибка чтения файла {file_path}. Возможно, файл пуст или поврежден. Возвращена пустая база данных.")
+            say(f"Ошибка чтения коллекции {collection}. Возможно, файл пуст или поврежден. Возвращена пустая база данных.")
             return {}
 
 
     @classmethod
+    @profiled("Material.load_all_educational_materials")
     def load_all_educational_materials(cls) -> Dict[str, Any]:
-        return cls._load_from_file(cls.STORAGE_FILE_EDUCATIONAL)
+        return cls._load_collection(cls.COLLECTION_EDUCATIONAL)
 
     @classmethod
+    @profiled("Material.load_all_simple_topics")
     def load_all_simple_topics(cls) -> Dict[str, Any]:
-        return cls._load_from_file(cls.STORAGE_FILE_TOPICS)
+        return cls._load_collection(cls.COLLECTION_TOPICS)
 
+    @profiled("Material.save")
     def save(self) -> None:
-        if self.is_simple_topic:
-            file_path = self.STORAGE_FILE_TOPICS
-            data_to_save = self.load_all_simple_topics()
-            data_to_save[self.topic] = self.to_dict()
-        else:
-            file_path = self.STORAGE_FILE_EDUCATIONAL
-            data_to_save = self.load_all_educational_materials()
-            data_to_save[self.topic] = self.to_dict()
+        """Сохраняет материал. Изменение записи каталога не меняет уже изученное студентами:
+        их ссылки на прежнюю запись заменяются её содержимым, как при удалении."""
+        collection = self.COLLECTION_TOPICS if self.is_simple_topic else self.COLLECTION_EDUCATIONAL
+        replaced: List[Optional[Dict[str, Any]]] = []
 
-        os.makedirs(file_path.parent, exist_ok=True)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data_to_save, f, ensure_ascii=False, indent=4)
+        def change(current: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            replaced.append(current)
+            return self.to_dict()
+
+        record, version, new_version = get_repository().update_versioned(collection, self.topic, change)
+        search_index.record_changed(collection, self.topic, record, version, new_version)
+        recommendation_index.record_changed(collection, self.topic, record, version, new_version)
+        if not self.is_simple_topic and replaced[-1] is not None:
+            previous = self._build_educational(replaced[-1]).to_dict()
+            if previous != record:
+                self._inline_studied(self.topic, previous)
 
     @classmethod
+    @profiled("Material.delete_simple_topic")
     def delete_simple_topic(cls, topic_name: str) -> bool:
-        topics = cls._load_from_file(cls.STORAGE_FILE_TOPICS)
-        if topic_name in topics:
-            del topics[topic_name]
-            with open(cls.STORAGE_FILE_TOPICS, "w", encoding="utf-8") as f:
-                json.dump(topics, f, ensure_ascii=False, indent=4)
-            return True
-        return False
+        return get_repository().delete(cls.COLLECTION_TOPICS, topic_name)
 
     @classmethod
+    @profiled("Material.delete_educational_material")
     def delete_educational_material(cls, topic_name: str) -> bool:
-        materials = cls._load_from_file(cls.STORAGE_FILE_EDUCATIONAL)
-        found_key = None
-        for key, data in materials.items():
-            if data.get("topic") == topic_name:
-                found_key = key
-                break
-        if found_key:
-            del materials[found_key]
-            with open(cls.STORAGE_FILE_EDUCATIONAL, "w", encoding="utf-8") as f:
-                json.dump(materials, f, ensure_ascii=False, indent=4)
-            return True
-        return False
\ No newline at end of file
+        found = cls._find_educational_material(topic_name)
+        if found is None:
+            return False
+        deleted, version, new_version = get_repository().delete_versioned(cls.COLLECTION_EDUCATIONAL, found[0])
+        if deleted:
+            search_index.record_changed(cls.COLLECTION_EDUCATIONAL, found[0], None, version, new_version)
+            recommendation_index.record_changed(cls.COLLECTION_EDUCATIONAL, found[0], None, version, new_version)
+            cls._inline_studied(found[0], cls._build_educational(found[1]).to_dict())
+        return deleted
+
+    @classmethod
+    def _inline_studied(cls, key: str, material: Dict[str, Any]) -> None:
+        """Заменяет ссылки на прежнюю запись каталога key её содержимым material у изучивших её студентов."""
+        refs = {LITERATURE_REF + key}
+        topic = material.get("topic")
+        repository = get_repository()
+        if topic != key and repository.get(cls.COLLECTION_EDUCATIONAL, topic) is None:
+            refs.add(LITERATURE_REF + str(topic))  # ссылка прежнего формата (по теме) вела на эту запись
+
+        def studied(student: Optional[Dict[str, Any]]) -> bool:
+            return student is not None and any(isinstance(item, str) and item in refs
+                                               for item in student.get("materials", ()))
+
+        keys = [student_id for student_id, student in repository.all(STUDENTS).items() if studied(student)]
+
+        def inline(student_id: str, student: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            if not studied(student):
+                return None
+            return dict(student, materials=[copy.deepcopy(material) if isinstance(item, str) and item in refs
+                                            else item for item in student["materials"]])
+
+        if keys:
+            repository.update_many(STUDENTS, keys, inline)
+
+
+register_collection(Material.COLLECTION_EDUCATIONAL, lambda: Material.STORAGE_FILE_EDUCATIONAL)
+register_collection(Material.COLLECTION_TOPICS, lambda: Material.STORAGE_FILE_TOPICS)
+
+
+def material_ref(material: StoredMaterial) -> str:
+    """Ключ сравнения хранимого материала: ссылка или текст записи вне каталога.
+
+    Материалы с одним ключом считаются одним и тем же материалом.
+    """
+    if isinstance(material, str):
+        return material
+    if "name" in material:
+        return TOPIC_REF + material["name"]
+    return json.dumps(material, ensure_ascii=False, sort_keys=True)
+
+
+class StudiedMaterials(MutableSequence):
+    """Изученные материалы студента.
+
+    Хранятся компактные ссылки на записи общего каталога (по ключу записи), а словари
+    материалов собираются из каталога только при чтении элементов. Литература, которой нет
+    в каталоге (или которая отличается от записи каталога), хранится целиком; при изменении
+    или удалении записи каталога ссылки на неё в записях студентов заменяются её прежним
+    содержимым. Проверка «материал уже изучен» (in) не зависит от числа материалов: счётчик
+    ссылок строится при первой проверке, поэтому загруженные, но не проверяемые списки его не держат.
+    """
+
+    __slots__ = ("_items", "_refs")
+
+    def __init__(self, materials: Iterable[StoredMaterial] = ()) -> None:
+        self._items: List[StoredMaterial] = []
+        self._refs: Optional[Counter] = None
+        self.extend(materials)
+
+    def _ref_counts(self) -> Counter:
+        if self._refs is None:
+            self._refs = Counter(material_ref(material) for material in self._items)
+        return self._refs
+
+    @staticmethod
+    def _compact(material: StoredMaterial) -> StoredMaterial:
+        if isinstance(material, str) or "name" in material:
+            return interned(material_ref(material))
+        key = Material._catalog_key(material)
+        if key is not None:
+            return interned(LITERATURE_REF + key)
+        return copy.deepcopy(material)
+
+    @staticmethod
+    def _resolve(material: StoredMaterial) -> Dict[str, Any]:
+        if not isinstance(material, str):
+            return copy.deepcopy(material)
+        if material.startswith(TOPIC_REF):
+            return {"name": material[len(TOPIC_REF):]}
+        key = material[len(LITERATURE_REF):]
+        try:
+            data = get_repository().get(Material.COLLECTION_EDUCATIONAL, key)
+        except json.JSONDecodeError:
+            data = None
+        if data is not None:
+            return Material._from_educational_record(data, key).to_dict()
+        # Ссылка прежнего формата хранила тему, а не ключ записи
+        found = Material._find_educational_material(key)
+        if found is None:
+            return {"topic": key}  # литература удалена из каталога после загрузки этой записи
+        return Material._from_educational_record(found[1], found[0]).to_dict()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._resolve(material) for material in self._items[index]]
+        return self._resolve(self._items[index])
+
+    def _release(self, material: StoredMaterial) -> None:
+        if self._refs is None:
+            return
+        ref = material_ref(material)
+        self._refs[ref] -= 1
+        if self._refs[ref] <= 0:
+            del self._refs[ref]
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            values = [self._compact(material) for material in value]
+            for material in self._items[index]:
+                self._release(material)
+            self._items[index] = values
+            if self._refs is not None:
+                self._refs.update(material_ref(material) for material in values)
+        else:
+            material = self._compact(value)
+            self._release(self._items[index])
+            self._items[index] = material
+            if self._refs is not None:
+                self._refs[material_ref(material)] += 1
+
+    def __delitem__(self, index) -> None:
+        removed = self._items[index] if isinstance(index, slice) else [self._items[index]]
+        del self._items[index]
+        for material in removed:
+            self._release(material)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def insert(self, index: int, value: StoredMaterial) -> None:
+        material = self._compact(value)
+        self._items.insert(index, material)
+        if self._refs is not None:
+            self._refs[material_ref(material)] += 1
+
+    def __contains__(self, material: object) -> bool:
+        if not isinstance(material, (str, dict)):
+            return False
+        # Словарь литературы сравнивается как хранился бы: ссылкой на запись каталога или целиком
+        return self._ref_counts()[material_ref(self._compact(material))] > 0
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, StudiedMaterials):
+            return self._items == other._items
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"StudiedMaterials({self._items!r})"
+
+    def literature_topics(self) -> Set[str]:
+        """Темы изученной дополнительной литературы (ссылки разрешаются по каталогу)."""
+        topics = set()
+        for material in self._items:
+            if isinstance(material, str) and material.startswith(TOPIC_REF):
+                continue
+            topic = self._resolve(material).get("topic")
+            if topic is not None:
+                topics.add(topic)
+        return topics
+
+    def to_record(self) -> List[StoredMaterial]:
+        """Список для записи в хранилище: ссылки и материалы вне каталога."""
+        return [material if isinstance(material, str) else copy.deepcopy(material) for material in self._items]
@@ -0,0 +1,120 @@
+import json
+import os
+from json.encoder import encode_basestring  # то же, что json.dumps(str, ensure_ascii=False), но без накладных расходов
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from entities.locking import temporary_path
+
+OFFSETS_SUFFIX = ".offsets"
+
+Offsets = Dict[str, Tuple[int, int]]
+# Ключ -> (объект значения, его закодированный фрагмент); позволяет не кодировать заново
+# записи, которые не менялись с прошлой записи файла
+Fragments = Dict[str, Tuple[Any, bytes]]
+
+
+def _encode_value(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, indent=4).replace("\n", "\n    ").encode("utf-8")
+
+
+def encode_document(data: Dict[str, Any], fragments: Optional[Fragments] = None
+                    ) -> Tuple[bytes, Offsets, Fragments]:
+    """Кодирует документ так же, как json.dump(indent=4, ensure_ascii=False).
+
+    Попутно возвращает смещения (байт начала, длина) значения каждого ключа в файле.
+    Фрагменты значений, которые являются теми же объектами, что и в fragments, берутся готовыми.
+    """
+    if not data:
+        return b"{}", {}, {}
+    fragments = fragments or {}
+    parts: List[bytes] = []
+    offsets: Offsets = {}
+    new_fragments: Fragments = {}
+    position = 0
+    for i, (key, value) in enumerate(data.items()):
+        cached = fragments.get(key)
+        encoded = cached[1] if cached is not None and cached[0] is value else _encode_value(value)
+        new_fragments[key] = (value, encoded)
+        prefix = (("{\n" if i == 0 else ",\n") + "    " + encode_basestring(key) + ": ").encode("utf-8")
+        position += len(prefix)
+        offsets[key] = (position, len(encoded))
+        position += len(encoded)
+        parts.append(prefix)
+        parts.append(encoded)
+    parts.append(b"\n}")
+    return b"".join(parts), offsets, new_fragments
+
+
+def write_offset_index(path: str, signature: Tuple[int, int], offsets: Offsets) -> None:
+    """Сохраняет индекс <файл>.offsets: заголовок с версией файла и строки, отсортированные по ключу."""
+    index_path = path + OFFSETS_SUFFIX
+    tmp_path = temporary_path(index_path)
+    lines = [json.dumps({"signature": list(signature), "count": len(offsets)}) + "\n"]
+    for key in sorted(offsets):
+        offset, length = offsets[key]
+        lines.append(f"{encode_basestring(key)}\t{offset}\t{length}\n")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    os.replace(tmp_path, index_path)
+
+
+def read_index_signature(path: str) -> Optional[Tuple[int, ...]]:
+    """Версия файла данных, для которой построен индекс; None, если индекса нет."""
+    try:
+        with open(path + OFFSETS_SUFFIX, "rb") as f:
+            return tuple(json.loads(f.readline()).get("signature", ()))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _parse_line(line: bytes) -> Tuple[str, int, int]:
+    key, offset, length = line.decode("utf-8").rstrip("\n").split("\t")
+    return json.loads(key), int(offset), int(length)
+
+
+def lookup_offset(path: str, key: str, signature: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+    """Бинарный поиск ключа в индексе без чтения всего файла.
+
+    Возвращает (смещение, длина), None — если ключа нет, и бросает LookupError,
+    если индекса нет или он построен для другой версии файла данных.
+    """
+    index_path = path + OFFSETS_SUFFIX
+    try:
+        f = open(index_path, "rb")
+    except FileNotFoundError:
+        raise LookupError(index_path)
+    with f:
+        header = json.loads(f.readline())
+        if tuple(header.get("signature", ())) != tuple(signature):
+            raise LookupError(index_path)
+        low = f.tell()
+        high = os.fstat(f.fileno()).st_size
+        # low всегда указывает на начало строки; все строки до low меньше key, начиная с high — больше
+        while low < high:
+            middle = (low + high) // 2
+            if middle == low:
+                line_start = low
+            else:
+                f.seek(middle - 1)
+                f.readline()  # переходим к первой строке, начинающейся не раньше middle
+                line_start = f.tell()
+                if line_start >= high:
+                    line_start = low
+            f.seek(line_start)
+            line = f.readline()
+            line_key, offset, length = _parse_line(line)
+            if line_key == key:
+                return offset, length
+            if line_key < key:
+                low = f.tell()
+            elif line_start == low:
+                return None
+            else:
+                high = line_start
+        return None
+
+
+def read_slice(f: BinaryIO, offset: int, length: int) -> Any:
+    """Запись из открытого файла данных по смещению из индекса."""
+    f.seek(offset)
+    return json.loads(f.read(length).decode("utf-8"))
@@ -0,0 +1,163 @@
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+DEFAULT_CAPACITY = 1000  # сколько последних действий хранит кольцевой буфер
+
+
+class ActionProfile:
+    """Замер одного действия меню (или всего сеанса): время, обращения к хранилищу и объём ввода-вывода."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.started_at = time.time()
+        self.wall_seconds = 0.0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.calls: Dict[str, List[float]] = {}  # вызов -> [количество, суммарное время]
+
+    def add_call(self, name: str, seconds: float, count: int = 1) -> None:
+        totals = self.calls.setdefault(name, [0, 0.0])
+        totals[0] += count
+        totals[1] += seconds
+
+    def merge(self, other: 'ActionProfile') -> None:
+        self.bytes_read += other.bytes_read
+        self.bytes_written += other.bytes_written
+        for name, (count, seconds) in other.calls.items():
+            self.add_call(name, seconds, count)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "action": self.name,
+            "started_at": round(self.started_at, 3),
+            "wall_ms": round(self.wall_seconds * 1000, 3),
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "calls": {name: {"count": count, "ms": round(seconds * 1000, 3)}
+                      for name, (count, seconds) in self.calls.items()},
+        }
+
+
+class Profiler:
+    """Необязательное профилирование сеансов консоли.
+
+    Пока профилирование выключено, action() и profiled() почти ничего не стоят.
+    Текущее действие хранится в ContextVar, поэтому сеансы сервера не смешиваются.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        self.enabled = False
+        self.dump_path: Optional[Path] = None
+        self._actions: Deque[ActionProfile] = deque(maxlen=capacity)
+        self._current: ContextVar[Optional[ActionProfile]] = ContextVar("profile_action", default=None)
+        self._lock = threading.Lock()
+
+    def enable(self, dump_path: Optional[Path] = None) -> None:
+        self.enabled = True
+        self.dump_path = dump_path
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    @contextmanager
+    def action(self, name: str) -> Iterator[Optional[ActionProfile]]:
+        """Замеряет действие; вложенное действие добавляет свои итоги к внешнему."""
+        if not self.enabled:
+            yield None
+            return
+        profile = ActionProfile(name)
+        parent = self._current.get()
+        token = self._current.set(profile)
+        started = time.perf_counter()
+        try:
+            yield profile
+        finally:
+            profile.wall_seconds = time.perf_counter() - started
+            self._current.reset(token)
+            if parent is not None:
+                parent.merge(profile)
+            with self._lock:
+                self._actions.append(profile)
+
+    def record_call(self, name: str, seconds: float) -> None:
+        profile = self._current.get()
+        if profile is not None:
+            profile.add_call(name, seconds)
+
+    def add_bytes(self, read: int = 0, written: int = 0) -> None:
+        if not self.enabled:
+            return
+        profile = self._current.get()
+        if profile is not None:
+            profile.bytes_read += read
+            profile.bytes_written += written
+
+    def actions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [profile.to_dict() for profile in self._actions]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Итоги по видам действий из буфера: число, время, байты и самые затратные вызовы."""
+        totals: Dict[str, ActionProfile] = {}
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for profile in self._actions:
+                total = totals.setdefault(profile.name, ActionProfile(profile.name))
+                total.wall_seconds += profile.wall_seconds
+                total.merge(profile)
+                counts[profile.name] = counts.get(profile.name, 0) + 1
+        summary = {}
+        for name, total in sorted(totals.items(), key=lambda item: -item[1].wall_seconds):
+            summary[name] = {
+                "count": counts[name],
+                "total_ms": round(total.wall_seconds * 1000, 3),
+                "mean_ms": round(total.wall_seconds * 1000 / counts[name], 3),
+                "bytes_read": total.bytes_read,
+                "bytes_written": total.bytes_written,
+                "calls": {call: {"count": count, "ms": round(seconds * 1000, 3)}
+                          for call, (count, seconds) in sorted(total.calls.items(), key=lambda item: -item[1][1])},
+            }
+        return summary
+
+    def clear(self) -> None:
+        with self._lock:
+            self._actions.clear()
+
+    def dump(self, path: Optional[Path] = None) -> Optional[Path]:
+        """Записывает буфер и итоги в JSON; без пути и dump_path ничего не делает."""
+        path = Path(path) if path is not None else self.dump_path
+        if path is None:
+            return None
+        document = {"summary": self.summary(), "actions": self.actions()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False, indent=4)
+        return path
+
+
+def profiled(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Декоратор для обращений сущностей к хранилищу: время и число вызовов в текущем действии."""
+
+    def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.record_call(name, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+profiler = Profiler()
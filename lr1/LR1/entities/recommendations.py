@@ -0,0 +1,207 @@
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from entities.analytics import parse_score
+from entities.repository import EDUCATIONAL_MATERIALS, EXAMS, get_repository
+
+if TYPE_CHECKING:
+    from entities.material import Material
+
+CONSULTATION_READINESS_GAIN = 10  # как в AdditionalClasses.conduct_consultation
+SUBJECT_MATCH_SHARE = 0.1  # вес литературы по предмету экзамена, тема которой не встречается в вопросах
+
+
+def _fold(topic: Any) -> Optional[str]:
+    return topic.strip().casefold() if isinstance(topic, str) and topic.strip() else None
+
+
+class Recommendation:
+    def __init__(self, material: 'Material', subject: str, expected_gain: float) -> None:
+        self.material = material
+        self.subject = subject  # предмет, по которому рекомендация даёт наибольший вклад
+        self.expected_gain = expected_gain
+
+
+class RecommendationIndex:
+    """Рекомендации дополнительной литературы по слабым предметам студента.
+
+    Инвертированный индекс «тема вопроса экзамена -> литература» и заранее
+    отсортированные списки литературы для каждого предмета пересчитываются только
+    для изменившихся экзаменов и материалов. Сохранения и удаления через Exam и Material
+    обновляют индекс сразу (record_changed); коллекция, изменённая иначе, перечитывается. Ответ для студента зависит лишь от числа
+    его пробных экзаменов, а не от размера банка вопросов и каталога.
+
+    Ожидаемый прирост готовности от материала = прирост консультации (не выше 100 - готовность)
+    * доля неверных ответов по предмету * доля вопросов экзамена по теме материала.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._repository_id: Optional[int] = None
+        self._versions: Dict[str, Any] = {}  # коллекция -> версия, с которой индекс сверен
+        self._exams: Dict[str, Dict[str, Any]] = {}
+        self._materials: Dict[str, Dict[str, Any]] = {}
+        self._exam_topics: Dict[str, Dict[str, float]] = {}  # предмет -> тема -> доля вопросов
+        self._by_topic: Dict[str, Set[str]] = {}  # тема -> ключи литературы
+        self._by_subject: Dict[str, Set[str]] = {}  # предмет литературы -> ключи
+        self._ranked: Dict[str, List[Tuple[str, float]]] = {}  # предмет -> [(ключ, доля)] по убыванию
+        self.rebuilt_subjects = 0  # сколько раз пересчитывался список предмета
+        self.full_reads = 0  # сколько раз коллекция перечитывалась целиком
+
+    def _refresh(self) -> None:
+        repository = get_repository()
+        if id(repository) != self._repository_id:
+            self._repository_id = id(repository)
+            self._versions = {}
+        dirty: Set[str] = set()
+        # Перечитывается только коллекция, изменённая в обход record_changed (другой процесс, пакетная запись)
+        for collection, sync in ((EXAMS, self._sync_exams), (EDUCATIONAL_MATERIALS, self._sync_materials)):
+            version = repository.version(collection)
+            if version is not None and version == self._versions.get(collection):
+                continue
+            dirty |= sync(repository.all(collection))
+            self._versions[collection] = version
+            self.full_reads += 1
+        for subject in dirty:
+            self._rank(subject)
+
+    def record_changed(self, collection: str, key: str, record: Optional[Dict[str, Any]],
+                       previous_version: Any, version: Any) -> None:
+        """Обновляет индекс после сохранения (record) или удаления (None) экзамена или материала.
+
+        previous_version и version — версии коллекции непосредственно до и после этого
+        изменения (Repository.update_versioned). Если индекс был сверен не с previous_version,
+        коллекция помечается устаревшей и перечитывается при следующем запросе.
+        """
+        if collection not in (EXAMS, EDUCATIONAL_MATERIALS):
+            return
+        with self._lock:
+            repository = get_repository()
+            if (id(repository) != self._repository_id or previous_version is None or version is None
+                    or previous_version != self._versions.get(collection)):
+                self._versions.pop(collection, None)
+                return
+            if collection == EXAMS:
+                dirty = self._set_exam(key, record)
+            else:
+                dirty = self._affected_subjects(self._set_material(key, record))
+            for subject in dirty:
+                self._rank(subject)
+            self._versions[collection] = version
+
+    def _set_exam(self, subject: str, record: Optional[Dict[str, Any]]) -> Set[str]:
+        """Обновляет темы экзамена; возвращает предметы, списки которых нужно пересчитать."""
+        previous = self._exams.get(subject)
+        if record is None:
+            if previous is not None:
+                del self._exams[subject]
+                self._exam_topics.pop(subject, None)
+                self._ranked.pop(subject, None)
+            return set()
+        if previous is record or previous == record:
+            return set()
+        self._exams[subject] = record
+        questions = record.get("questions", [])
+        shares: Dict[str, float] = {}
+        for question in questions:
+            topic = _fold(question[0]) if question else None
+            if topic is not None:
+                shares[topic] = shares.get(topic, 0.0) + 1.0 / len(questions)
+        self._exam_topics[subject] = shares
+        return {subject}
+
+    def _sync_exams(self, records: Dict[str, Dict[str, Any]]) -> Set[str]:
+        dirty = set()
+        for subject in [subject for subject in self._exams if subject not in records]:
+            self._set_exam(subject, None)
+        for subject, record in records.items():
+            dirty |= self._set_exam(subject, record)
+        return dirty
+
+    def _set_material(self, key: str, record: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Обновляет материал в индексах; возвращает прежнюю и новую записи, если он изменился."""
+        previous = self._materials.get(key)
+        if previous is record or (previous is not None and previous == record):
+            return []
+        changed = []
+        if previous is not None:
+            changed.append(self._unlink_material(key))
+        if record is not None:
+            self._materials[key] = record
+            topic, subject = _fold(record.get("topic")), record.get("subject")
+            if topic is not None:
+                self._by_topic.setdefault(topic, set()).add(key)
+            if subject:
+                self._by_subject.setdefault(subject, set()).add(key)
+            changed.append(record)
+        return changed
+
+    def _affected_subjects(self, changed: List[Dict[str, Any]]) -> Set[str]:
+        if not changed:
+            return set()
+        # Пересчитываются только предметы, в вопросах которых есть изменившиеся темы, или сам предмет материала
+        topics = {_fold(record.get("topic")) for record in changed}
+        subjects = {record.get("subject") for record in changed}
+        return {subject for subject, shares in self._exam_topics.items()
+                if subject in subjects or topics.intersection(shares)}
+
+    def _sync_materials(self, records: Dict[str, Dict[str, Any]]) -> Set[str]:
+        changed: List[Dict[str, Any]] = []
+        for key in [key for key in self._materials if key not in records]:
+            changed += self._set_material(key, None)
+        for key, record in records.items():
+            changed += self._set_material(key, record)
+        return self._affected_subjects(changed)
+
+    def _unlink_material(self, key: str) -> Dict[str, Any]:
+        record = self._materials.pop(key)
+        for index, value in ((self._by_topic, _fold(record.get("topic"))), (self._by_subject, record.get("subject"))):
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+        return record
+
+    def _rank(self, subject: str) -> None:
+        shares: Dict[str, float] = {}
+        for topic, share in self._exam_topics.get(subject, {}).items():
+            for key in self._by_topic.get(topic, ()):
+                shares[key] = shares.get(key, 0.0) + share
+        for key in self._by_subject.get(subject, ()):
+            shares.setdefault(key, SUBJECT_MATCH_SHARE)
+        self._ranked[subject] = sorted(shares.items(), key=lambda item: (-item[1], item[0]))
+        self.rebuilt_subjects += 1
+
+    def recommend(self, student: Any, limit: int = 3) -> List[Recommendation]:
+        """Лучшие по ожидаемому приросту готовности материалы, которые студент ещё не изучал."""
+        from entities.material import Material  # material.py сам импортирует индекс, чтобы сообщать об изменениях
+        studied = {_fold(topic) for topic in student.materials.literature_topics()}
+        headroom = max(0, min(CONSULTATION_READINESS_GAIN, 100 - student.readiness))
+        gains: Dict[str, float] = {}
+        best_subjects: Dict[str, Tuple[float, str]] = {}
+        with self._lock:
+            self._refresh()
+            for subject, result in student.exam_result.items():
+                score = parse_score(result)
+                if score is None or score >= 1:
+                    continue
+                # Из каждого предмета достаточно limit лучших неизученных материалов
+                taken = 0
+                for key, share in self._ranked.get(subject, ()):
+                    if taken >= limit:
+                        break
+                    if _fold(self._materials[key].get("topic")) in studied:
+                        continue
+                    taken += 1
+                    gain = headroom * (1 - score) * share
+                    gains[key] = gains.get(key, 0.0) + gain
+                    if gain > best_subjects.get(key, (-1.0, ""))[0]:
+                        best_subjects[key] = (gain, subject)
+            best = sorted(gains.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            return [Recommendation(Material._from_educational_record(self._materials[key], key), best_subjects[key][1],
+                                   round(gain, 2))
+                    for key, gain in best]
+
+
+recommendation_index = RecommendationIndex()
@@ -0,0 +1,373 @@
+import json
+import threading
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from entities.locking import lock_manager
+from entities.shards import ShardedDocument
+from entities.storage import (delete_record, document_signature, put_record, put_records, read_document,
+                              read_record, write_lock)
+from entities.store_cache import store_cache
+from entities.topic_index import TopicIndex
+
+# Коллекции, которые хранят сущности lr1
+STUDENTS = "students"
+EXAMS = "exams"
+EDUCATIONAL_MATERIALS = "educational_materials"
+SIMPLE_TOPICS = "materials"
+COLLECTIONS = (STUDENTS, EXAMS, EDUCATIONAL_MATERIALS, SIMPLE_TOPICS)
+# Коллекции, одиночные записи которых читаются по индексу смещений (вход студента)
+OFFSET_INDEXED_COLLECTIONS = (STUDENTS,)
+# Коллекции, хранящиеся по файлу на запись с манифестом: коллекция -> сводка записи для манифеста
+SHARDED_COLLECTIONS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    EXAMS: lambda record: {"subject": record.get("subject"), "questions": len(record.get("questions", []))},
+}
+
+# Коллекция -> функция, возвращающая путь к JSON-файлу (регистрируют сами сущности,
+# чтобы подмена STORAGE_FILE в классе сразу учитывалась)
+_collection_files: Dict[str, Callable[[], Path]] = {}
+
+
+def register_collection(collection: str, path_getter: Callable[[], Path]) -> None:
+    _collection_files[collection] = path_getter
+
+
+def collection_file(collection: str) -> Path:
+    if collection not in _collection_files:
+        raise KeyError(f"Коллекция '{collection}' не зарегистрирована")
+    return _collection_files[collection]()
+
+
+class Repository(ABC):
+    """Хранилище записей сущностей: коллекция -> ключ -> словарь записи."""
+
+    @abstractmethod
+    def get(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def all(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def put(self, collection: str, key: str, record: Dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, collection: str, key: str) -> bool:
+        pass
+
+    def version(self, collection: str) -> Any:
+        """Значение, которое меняется при любом изменении коллекции; None — версия неизвестна."""
+        return None
+
+    def find_by(self, collection: str, field: str, value: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Первая запись, у которой record[field] == value, в виде (ключ, запись)."""
+        for key, record in self.all(collection).items():
+            if record.get(field) == value:
+                return key, record
+        return None
+
+    def find_all_by(self, collection: str, field: str, value: str,
+                    case_insensitive: bool = False) -> List[Tuple[str, Dict[str, Any]]]:
+        """Все записи, у которых record[field] равно value (с учётом регистра или без)."""
+        if case_insensitive:
+            value = value.casefold()
+        return [(key, record) for key, record in self.all(collection).items()
+                if isinstance(record.get(field), str)
+                and (record[field].casefold() if case_insensitive else record[field]) == value]
+
+    def find_prefix(self, collection: str, field: str, prefix: str, case_insensitive: bool = True,
+                    limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """Записи, у которых record[field] начинается с prefix, в порядке значений поля."""
+        if case_insensitive:
+            prefix = prefix.casefold()
+        matches = sorted(((record[field], key, record) for key, record in self.all(collection).items()
+                          if isinstance(record.get(field), str)
+                          and (record[field].casefold() if case_insensitive else record[field]).startswith(prefix)),
+                         key=lambda match: (match[0].casefold(), match[0]))
+        return [(key, record) for _, key, record in matches[:limit]]
+
+    def keys(self, collection: str) -> List[str]:
+        """Ключи коллекции без чтения самих записей, если хранилище это позволяет."""
+        return list(self.all(collection))
+
+    def update(self, collection: str, key: str,
+               change: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Читает запись, передаёт её в change и сохраняет результат (None — ничего не записывать).
+
+        Хранилища переопределяют метод так, чтобы между чтением и записью запись не
+        изменил другой поток или процесс. Возвращает сохранённую запись.
+        """
+        record = change(self.get(collection, key))
+        if record is not None:
+            self.put(collection, key, record)
+        return record
+
+    def update_versioned(self, collection: str, key: str,
+                         change: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+                         ) -> Tuple[Optional[Dict[str, Any]], Any, Any]:
+        """Как update, но возвращает и версии коллекции непосредственно до и после этой записи.
+
+        Между ними коллекцию не изменяет никто другой, поэтому кэш, сверенный с версией «до»,
+        может применить запись и принять версию «после». None — хранилище этого не гарантирует.
+        """
+        return self.update(collection, key, change), None, None
+
+    def delete_versioned(self, collection: str, key: str) -> Tuple[bool, Any, Any]:
+        """Как delete, но возвращает и версии коллекции до и после удаления (см. update_versioned)."""
+        return self.delete(collection, key), None, None
+
+    def update_many(self, collection: str, keys: Iterable[str],
+                    change: Callable[[str, Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+                    ) -> Dict[str, Dict[str, Any]]:
+        """Как update для нескольких записей: change(ключ, запись) для каждой, без потерянных изменений.
+
+        Хранилища переопределяют метод так, чтобы все записи сохранялись одной записью.
+        Возвращает сохранённые записи по ключам.
+        """
+        saved = {}
+        for key in dict.fromkeys(keys):
+            record = self.update(collection, key, lambda current, key=key: change(key, current))
+            if record is not None:
+                saved[key] = record
+        return saved
+
+    def put_many(self, collection: str, records: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        count = 0
+        for key, record in records:
+            self.put(collection, key, record)
+            count += 1
+        return count
+
+    def close(self) -> None:
+        pass
+
+
+class JsonRepository(Repository):
+    """Исходное хранилище: один JSON-файл на коллекцию (режим json или journal из storage.py).
+
+    Для темы дополнительной литературы поддерживается вторичный индекс TopicIndex,
+    который хранится рядом с файлом данных и обновляется при сохранении и удалении.
+    Коллекции из SHARDED_COLLECTIONS (экзамены) хранятся по файлу на запись (ShardedDocument).
+    """
+
+    def __init__(self) -> None:
+        self._topic_indexes: Dict[str, TopicIndex] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _file(collection: str) -> Path:
+        path = collection_file(collection)
+        if collection in OFFSET_INDEXED_COLLECTIONS:
+            store_cache.enable_offset_index(path)
+        return path
+
+    def _shards(self, collection: str) -> Optional[ShardedDocument]:
+        summary = SHARDED_COLLECTIONS.get(collection)
+        return ShardedDocument(self._file(collection), summary) if summary is not None else None
+
+    def get(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        shards = self._shards(collection)
+        if shards is not None:
+            return shards.get(key)
+        return read_record(self._file(collection), key)
+
+    def all(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        shards = self._shards(collection)
+        if shards is not None:
+            return shards.all()
+        return dict(read_document(self._file(collection)))
+
+    def keys(self, collection: str) -> List[str]:
+        return list(read_document(self._file(collection)))
+
+    def version(self, collection: str) -> Any:
+        path = self._file(collection)
+        return [str(path)] + document_signature(path)
+
+    def put(self, collection: str, key: str, record: Dict[str, Any]) -> None:
+        path = self._file(collection)
+        shards = self._shards(collection)
+        if shards is not None:
+            shards.put(key, record)
+            return
+        if collection != EDUCATIONAL_MATERIALS:
+            put_record(path, key, record)
+            return
+        with self._lock:
+            try:
+                index = self._topic_index(path)
+            except json.JSONDecodeError:
+                # Повреждённый файл будет перезаписан, индекс перестроится при следующем чтении
+                self._topic_indexes.pop(str(path), None)
+                put_record(path, key, record)
+                return
+            previous = read_document(path).get(key)
+            put_record(path, key, record)
+            previous_topic = previous.get("topic") if previous is not None else None
+            if previous_topic is not None and previous_topic != record.get("topic"):
+                index.remove(previous_topic, key)
+            if record.get("topic") is not None:
+                index.add(record["topic"], key)
+            self._store_topic_index(path, index)
+
+    def update(self, collection: str, key: str,
+               change: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        # Блокировка записи, а не файла: обновления разных студентов не ждут друг друга,
+        # пока выполняется change; сама перезапись файла защищена блокировкой файла в storage.py
+        with lock_manager.record_lock(self._file(collection), key):
+            return super().update(collection, key, change)
+
+    def _versioned_write(self, collection: str, write: Callable[[], Any]) -> Tuple[Any, Any, Any]:
+        path = self._file(collection)
+        # Запись литературы берёт self._lock раньше блокировки файла, поэтому здесь тот же порядок
+        guard = self._lock if collection == EDUCATIONAL_MATERIALS else nullcontext()
+        with guard, write_lock(path):
+            before = self.version(collection)
+            result = write()
+            return result, before, self.version(collection)
+
+    def update_versioned(self, collection: str, key: str,
+                         change: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+                         ) -> Tuple[Optional[Dict[str, Any]], Any, Any]:
+        with lock_manager.record_lock(self._file(collection), key):
+            record = change(self.get(collection, key))
+            if record is None:
+                return None, None, None
+            _, before, after = self._versioned_write(collection, lambda: self.put(collection, key, record))
+            return record, before, after
+
+    def delete_versioned(self, collection: str, key: str) -> Tuple[bool, Any, Any]:
+        return self._versioned_write(collection, lambda: self.delete(collection, key))
+
+    def update_many(self, collection: str, keys: Iterable[str],
+                    change: Callable[[str, Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+                    ) -> Dict[str, Dict[str, Any]]:
+        # Блокировки всех записей на время чтения и одной перезаписи файла: одиночные
+        # update этих записей ждут, а остальные записи коллекции не блокируются
+        keys = list(dict.fromkeys(keys))
+        with lock_manager.records_lock(self._file(collection), keys):
+            current = self.all(collection)
+            saved = {}
+            for key in keys:
+                record = change(key, current.get(key))
+                if record is not None:
+                    saved[key] = record
+            self.put_many(collection, saved.items())
+        return saved
+
+    def put_many(self, collection: str, records: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        records = list(records)
+        if not records:
+            return 0
+        path = self._file(collection)
+        shards = self._shards(collection)
+        if shards is not None:
+            return shards.put_many(records)
+        if collection != EDUCATIONAL_MATERIALS:
+            put_records(path, records)
+            return len(records)
+        with self._lock:
+            # Одна запись файла и одно перестроение индекса тем вместо обновления после каждой записи
+            put_records(path, records)
+            signature = document_signature(path)
+            index = TopicIndex.from_document(read_document(path), signature)
+            index.save(path)
+            self._topic_indexes[str(path)] = index
+        return len(records)
+
+    def delete(self, collection: str, key: str) -> bool:
+        path = self._file(collection)
+        shards = self._shards(collection)
+        if shards is not None:
+            return shards.delete(key)
+        if collection != EDUCATIONAL_MATERIALS:
+            return delete_record(path, key)
+        with self._lock:
+            index = self._topic_index(path)
+            previous = read_document(path).get(key)
+            if not delete_record(path, key):
+                return False
+            if previous is not None and previous.get("topic") is not None:
+                index.remove(previous["topic"], key)
+            self._store_topic_index(path, index)
+            return True
+
+    def _topic_index(self, path: Path) -> TopicIndex:
+        """Индекс тем, соответствующий текущей версии файла (при необходимости перестраивается)."""
+        signature = document_signature(path)
+        index = self._topic_indexes.get(str(path))
+        if index is not None and index.signature == signature:
+            return index
+        index = TopicIndex.load(path, signature)
+        if index is None:
+            index = TopicIndex.from_document(read_document(path), signature)
+            if signature[0] is not None:
+                index.save(path)
+        self._topic_indexes[str(path)] = index
+        return index
+
+    def _store_topic_index(self, path: Path, index: TopicIndex) -> None:
+        index.signature = document_signature(path)
+        index.save(path)
+
+    def _records(self, path: Path, keys: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        document = read_document(path)
+        return [(key, document[key]) for key in keys if key in document]
+
+    def find_by(self, collection: str, field: str, value: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if (collection, field) != (EDUCATIONAL_MATERIALS, "topic"):
+            return super().find_by(collection, field, value)
+        path = self._file(collection)
+        with self._lock:
+            key = self._topic_index(path).get(value)
+            if key is None:
+                return None
+            record = read_document(path).get(key)
+        return (key, record) if record is not None else None
+
+    def find_all_by(self, collection: str, field: str, value: str,
+                    case_insensitive: bool = False) -> List[Tuple[str, Dict[str, Any]]]:
+        if (collection, field) != (EDUCATIONAL_MATERIALS, "topic"):
+            return super().find_all_by(collection, field, value, case_insensitive)
+        path = self._file(collection)
+        with self._lock:
+            index = self._topic_index(path)
+            if case_insensitive:
+                keys = index.get_casefold(value)
+            else:
+                keys = index.get_all(value)
+            return self._records(path, keys)
+
+    def find_prefix(self, collection: str, field: str, prefix: str, case_insensitive: bool = True,
+                    limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        if (collection, field) != (EDUCATIONAL_MATERIALS, "topic"):
+            return super().find_prefix(collection, field, prefix, case_insensitive, limit)
+        path = self._file(collection)
+        with self._lock:
+            keys = self._topic_index(path).prefix(prefix, case_insensitive, limit)
+            return self._records(path, keys)
+
+
+_repository: Repository = JsonRepository()
+
+
+def get_repository() -> Repository:
+    return _repository
+
+
+def set_repository(repository: Repository) -> Repository:
+    """Устанавливает хранилище для всех сущностей и возвращает предыдущее."""
+    global _repository
+    previous, _repository = _repository, repository
+    return previous
+
+
+def migrate(source: Repository, target: Repository,
+            collections: Iterable[str] = COLLECTIONS) -> Dict[str, int]:
+    """Копирует все записи из source в target, возвращает число записей по коллекциям."""
+    return {collection: target.put_many(collection, source.all(collection).items())
+            for collection in collections}
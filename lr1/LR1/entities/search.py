@@ -0,0 +1,305 @@
+import bisect
+import json
+import marshal
+import math
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from entities.locking import temporary_path
+from entities.profiling import profiler
+from entities.repository import EDUCATIONAL_MATERIALS, EXAMS, collection_file, get_repository
+from entities.snapshot import FORMAT_TAG, gc_paused
+
+INDEX_FILE_NAME = "search.index"
+SEARCHED_COLLECTIONS = (EXAMS, EDUCATIONAL_MATERIALS)
+# Вес совпадения в поле документа; правильный ответ учитывается отдельно (ANSWER_WEIGHT),
+# чтобы в меню студента поиск по ответам можно было отключить
+FIELD_WEIGHTS = {"topic": 2.0, "title": 2.0, "subject": 1.5, "question": 1.0, "author": 1.0}
+ANSWER_WEIGHT = 1.0
+PREFIX_MIN_LENGTH = 3  # слова запроса короче не ищутся как начало слов («интеграл» -> «интегралы»)
+PREFIX_WEIGHT = 0.5  # совпадение по началу слова весит меньше точного
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_LIMIT = 10
+
+_WORD = re.compile(r"\w+")
+
+DocId = Tuple[str, str, int]  # коллекция, ключ записи, номер вопроса (у литературы 0)
+# Слово -> документ -> (взвешенное число вхождений без ответа, число вхождений в ответ)
+Postings = Dict[str, Dict[DocId, Tuple[float, int]]]
+
+
+def tokenize(text: Any) -> List[str]:
+    """Слова текста без учёта регистра (casefold, «ё» = «е»), в том числе кириллические."""
+    if text is None:
+        return []
+    folded = unicodedata.normalize("NFKC", str(text)).casefold().replace("ё", "е")
+    return _WORD.findall(folded)
+
+
+def _documents(collection: str, record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Поля документов записи: по документу на вопрос экзамена или один на материал литературы."""
+    if collection == EXAMS:
+        documents = []
+        for question in record.get("questions", []):
+            topic, text, answer = (list(question) + [None] * 3)[:3]
+            documents.append({"subject": record.get("subject"), "topic": topic, "question": text, "answer": answer})
+        return documents
+    return [{field: record.get(field) for field in ("topic", "title", "author", "subject")}]
+
+
+def _fingerprint(record: Dict[str, Any]) -> int:
+    return zlib.crc32(json.dumps(record, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+
+
+def _comparable(version: Any) -> Any:
+    # Версия хранится в файле индекса, поэтому кортежи сравниваются как списки
+    return json.loads(json.dumps(version)) if version is not None else None
+
+
+class SearchHit:
+    def __init__(self, collection: str, key: str, position: int, score: float,
+                 record: Optional[Dict[str, Any]]) -> None:
+        self.collection = collection
+        self.key = key
+        self.position = position  # номер вопроса экзамена (для литературы 0)
+        self.score = score
+        self.record = record
+
+    @property
+    def question(self) -> Optional[List[str]]:
+        """[тема, вопрос, ответ] для найденного вопроса экзамена."""
+        if self.collection != EXAMS or self.record is None:
+            return None
+        questions = self.record.get("questions", [])
+        return questions[self.position] if self.position < len(questions) else None
+
+
+class SearchIndex:
+    """Полнотекстовый поиск по вопросам экзаменов и дополнительной литературе.
+
+    Инвертированный индекс «слово -> документы» (документ — вопрос экзамена или материал)
+    ранжирует результаты по BM25F: вхождения слова в поля складываются с весами полей.
+    Индекс сохраняется рядом с файлами хранилища (marshal) вместе с версиями коллекций
+    и отпечатками записей: при запуске он читается без разбора текста, а заново
+    разбираются только записи, изменившиеся с прошлой записи индекса. Сохранения и
+    удаления через Exam и Material обновляют индекс сразу (record_changed).
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self._path = path
+        self._lock = threading.RLock()
+        self._loaded_from: Optional[str] = None
+        self._clear()
+        self._unsaved = 0
+        self.tokenized_records = 0  # сколько записей пришлось разобрать на слова
+
+    @property
+    def path(self) -> str:
+        if self._path is not None:
+            return os.path.abspath(self._path)
+        return os.path.join(os.path.dirname(os.path.abspath(collection_file(EXAMS))), INDEX_FILE_NAME)
+
+    def _clear(self) -> None:
+        self._versions: Dict[str, Any] = {}
+        self._sources: Dict[Tuple[str, str], Tuple[int, int]] = {}  # (коллекция, ключ) -> (отпечаток, документов)
+        self._lengths: Dict[DocId, int] = {}  # число слов документа
+        self._words: Dict[DocId, Tuple[str, ...]] = {}  # слова документа, чтобы убрать его из индекса
+        self._postings: Postings = {}
+        self._vocabulary: Optional[List[str]] = []  # отсортированные слова; None — пересортировать
+        self._total_length = 0
+
+    def _add_document(self, doc_id: DocId, fields: Dict[str, Any]) -> None:
+        frequencies: Dict[str, List[float]] = {}
+        length = 0
+        for field, text in fields.items():
+            for word in tokenize(text):
+                frequency = frequencies.setdefault(word, [0.0, 0])
+                if field == "answer":
+                    frequency[1] += 1
+                else:
+                    frequency[0] += FIELD_WEIGHTS[field]
+                length += 1
+        self._lengths[doc_id] = length
+        self._words[doc_id] = tuple(frequencies)
+        self._total_length += length
+        for word, (weighted, in_answer) in frequencies.items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                self._vocabulary = None
+            postings[doc_id] = (weighted, in_answer)
+
+    def _remove_source(self, collection: str, key: str) -> None:
+        source = self._sources.pop((collection, key), None)
+        if source is None:
+            return
+        for position in range(source[1]):
+            doc_id = (collection, key, position)
+            self._total_length -= self._lengths.pop(doc_id)
+            for word in self._words.pop(doc_id):
+                postings = self._postings[word]
+                del postings[doc_id]
+                if not postings:
+                    del self._postings[word]
+                    self._vocabulary = None
+
+    def _replace_source(self, collection: str, key: str, record: Optional[Dict[str, Any]],
+                        fingerprint: Optional[int] = None) -> None:
+        self._remove_source(collection, key)
+        if record is None:
+            return
+        documents = _documents(collection, record)
+        for position, fields in enumerate(documents):
+            self._add_document((collection, key, position), fields)
+        self._sources[(collection, key)] = (fingerprint if fingerprint is not None else _fingerprint(record),
+                                            len(documents))
+        self.tokenized_records += 1
+
+    def _load(self) -> None:
+        path = self.path
+        if self._loaded_from == path:
+            return
+        self._clear()
+        self._loaded_from = path
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            profiler.add_bytes(read=len(raw))
+            with gc_paused():
+                data = marshal.loads(raw)
+            if data[0] != FORMAT_TAG:
+                return  # другая версия Python: индекс будет построен заново
+            _, self._versions, self._sources, self._lengths, self._words, self._postings = data
+            self._total_length = sum(self._lengths.values())
+            self._vocabulary = None
+        except (FileNotFoundError, EOFError, ValueError, TypeError):
+            self._clear()
+
+    def _sync(self) -> None:
+        """Сверяет индекс с хранилищем: разбираются только новые и изменившиеся записи."""
+        self._load()
+        repository = get_repository()
+        for collection in SEARCHED_COLLECTIONS:
+            version = _comparable(repository.version(collection))
+            if version is not None and version == self._versions.get(collection):
+                continue
+            records = repository.all(collection)
+            for stale in [key for source, key in self._sources if source == collection and key not in records]:
+                self._remove_source(collection, stale)
+                self._unsaved += 1
+            for key, record in records.items():
+                fingerprint = _fingerprint(record)
+                source = self._sources.get((collection, key))
+                if source is None or source[0] != fingerprint:
+                    self._replace_source(collection, key, record, fingerprint)
+                    self._unsaved += 1
+            self._versions[collection] = version
+        if self._unsaved:
+            self.save()
+
+    def record_changed(self, collection: str, key: str, record: Optional[Dict[str, Any]],
+                       previous_version: Any, version: Any) -> None:
+        """Обновляет индекс после сохранения (record) или удаления (None) записи.
+
+        previous_version и version — версии коллекции непосредственно до и после этого
+        изменения (Repository.update_versioned). Если индекс был сверен не с previous_version,
+        коллекция сверяется с хранилищем при следующем поиске.
+        """
+        if collection not in SEARCHED_COLLECTIONS:
+            return
+        with self._lock:
+            if self._loaded_from != self.path:
+                return
+            previous_version, version = _comparable(previous_version), _comparable(version)
+            if previous_version is None or version is None or previous_version != self._versions.get(collection):
+                self._versions.pop(collection, None)
+                return
+            self._replace_source(collection, key, record)
+            self._versions[collection] = version
+            self._unsaved += 1
+
+    def _matching_words(self, word: str) -> Iterable[Tuple[str, float]]:
+        if word in self._postings:
+            yield word, 1.0
+        if len(word) < PREFIX_MIN_LENGTH:
+            return
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        position = bisect.bisect_right(self._vocabulary, word)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(word):
+            yield self._vocabulary[position], PREFIX_WEIGHT
+            position += 1
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, include_answers: bool = True) -> List[SearchHit]:
+        """Лучшие по релевантности вопросы экзаменов и материалы для запроса."""
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+        answer_weight = ANSWER_WEIGHT if include_answers else 0.0
+        with self._lock:
+            self._sync()
+            count = len(self._lengths)
+            average_length = self._total_length / count if count else 0.0
+            scores: Dict[DocId, float] = {}
+            for word in words:
+                # По каждому слову запроса документ получает лучшее из совпадений (точное или по началу слова)
+                best: Dict[DocId, float] = {}
+                for matched, match_weight in self._matching_words(word):
+                    postings = self._postings[matched]
+                    idf = match_weight * math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, (weighted, in_answer) in postings.items():
+                        frequency = weighted + answer_weight * in_answer
+                        if not frequency:
+                            continue
+                        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[doc_id] / average_length)
+                        score = idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                        if score > best.get(doc_id, 0.0):
+                            best[doc_id] = score
+                for doc_id, score in best.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        repository = get_repository()
+        records: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+        hits = []
+        for (collection, key, position), score in ranked:
+            if (collection, key) not in records:
+                records[(collection, key)] = repository.get(collection, key)
+            hits.append(SearchHit(collection, key, position, round(score, 4), records[(collection, key)]))
+        return hits
+
+    def save(self) -> None:
+        """Записывает индекс на диск (без повторного разбора при следующем запуске)."""
+        with self._lock:
+            if self._loaded_from != self.path:
+                return
+            path = self.path
+            encoded = marshal.dumps((FORMAT_TAG, self._versions, self._sources, self._lengths, self._words,
+                                     self._postings))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = temporary_path(path)
+            with open(tmp_path, "wb") as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+            profiler.add_bytes(written=len(encoded))
+            self._unsaved = 0
+
+    def checkpoint(self) -> None:
+        """Записывает индекс, если он изменился после прошлой записи."""
+        with self._lock:
+            if self._unsaved:
+                self.save()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._clear()
+            self._loaded_from = None
+            self._unsaved = 0
+
+
+search_index = SearchIndex()
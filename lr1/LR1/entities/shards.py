@@ -0,0 +1,91 @@
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from entities.storage import delete_record, put_records, read_document
+from entities.store_cache import store_cache
+
+Summary = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class ShardedDocument:
+    """Коллекция, в которой каждая запись хранится в своём файле (шарде).
+
+    Основной файл коллекции становится лёгким манифестом: ключ -> {"shard": имя файла, ...сводка}.
+    Шарды лежат в каталоге рядом с ним (storage/exams.json -> storage/exams/). Список ключей
+    читается только из манифеста, а запись — только из своего шарда.
+    Записи старого формата, хранящиеся в основном файле целиком, читаются как есть и
+    переносятся в шарды при первом изменении коллекции.
+    """
+
+    def __init__(self, path: Path, summary: Summary) -> None:
+        self.path = Path(path)
+        self.shard_dir = self.path.with_suffix("")
+        self.summary = summary
+
+    @staticmethod
+    def shard_name(key: str) -> str:
+        readable = re.sub(r"[^\w-]+", "_", key)[:40]
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:10]
+        return f"{readable}-{digest}.json"
+
+    def _entry(self, key: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        return {"shard": self.shard_name(key), **self.summary(record)}
+
+    def manifest(self) -> Dict[str, Dict[str, Any]]:
+        return read_document(self.path)
+
+    def keys(self) -> List[str]:
+        return list(self.manifest())
+
+    def _read_shard(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if "shard" not in entry:
+            return entry  # запись старого формата целиком в основном файле
+        return store_cache.load(self.shard_dir / entry["shard"]) or None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.manifest().get(key)
+        return self._read_shard(entry) if entry is not None else None
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        records = {}
+        for key, entry in self.manifest().items():
+            record = self._read_shard(entry)
+            if record is not None:
+                records[key] = record
+        return records
+
+    def _write_shards(self, records: Iterable[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        entries = []
+        for key, record in records:
+            store_cache.store(self.shard_dir / self.shard_name(key), record)
+            entries.append((key, self._entry(key, record)))
+        return entries
+
+    def _legacy_records(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return [(key, entry) for key, entry in self.manifest().items() if "shard" not in entry]
+
+    def put_many(self, records: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        # Сначала шарды, затем манифест: читатель никогда не видит ссылку на ещё не записанный шард
+        entries = self._write_shards(self._legacy_records() + list(records))
+        if entries:
+            put_records(self.path, entries)
+        return len(entries)
+
+    def put(self, key: str, record: Dict[str, Any]) -> None:
+        self.put_many([(key, record)])
+
+    def delete(self, key: str) -> bool:
+        self.put_many([])  # перенос записей старого формата, чтобы у записи был шард
+        entry = self.manifest().get(key)
+        if entry is None or not delete_record(self.path, key):
+            return False
+        shard_path = self.shard_dir / entry["shard"]
+        try:
+            os.remove(shard_path)
+        except FileNotFoundError:
+            pass
+        store_cache.invalidate(shard_path)
+        return True
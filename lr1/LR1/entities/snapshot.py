@@ -0,0 +1,212 @@
+"""Компактные двоичные снимки JSON-файлов хранилища (<файл>.snap).
+
+Снимок хранит те же записи, что и JSON-файл, в формате marshal: заголовок с версией
+формата, версией исходного JSON-файла (mtime, размер), таблицей смещений записей и
+порядком ключей по возрастанию, затем записи одна за другой. Читается через mmap:
+целиком или одна запись по ключу (двоичным поиском по упорядоченным ключам).
+Снимок используется, только если он построен для текущей версии JSON-файла и той же
+версии Python, иначе данные читаются из JSON. JSON остаётся основным форматом.
+
+Преобразование каталога в обе стороны:
+
+    python -m entities.snapshot to-snapshot storage
+    python -m entities.snapshot to-json storage
+"""
+import argparse
+import bisect
+import gc
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from entities.compression import read_file
+from entities.locking import temporary_path
+
+SNAPSHOT_SUFFIX = ".snap"
+MAGIC = b"LR1SNAP2"  # снимки прежнего формата (без порядка ключей) не используются
+_PREFIX = struct.Struct("<8sI")  # магическое число и длина заголовка
+# marshal не гарантирует совместимость между версиями Python, поэтому версия входит в формат
+FORMAT_TAG = (marshal.version, sys.version_info[0], sys.version_info[1])
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """Отключает сборщик мусора на время разбора marshal (снимки, индекс поиска)."""
+    # Разбор создаёт много объектов без циклов: сборщик мусора только замедлил бы его
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def snapshot_path(path: str) -> str:
+    return str(path) + SNAPSHOT_SUFFIX
+
+
+def write_snapshot(path: str, source_signature: Tuple[int, int], data: Dict[str, Any]) -> int:
+    """Записывает снимок документа для JSON-файла path с версией source_signature; возвращает размер."""
+    blobs = [marshal.dumps(value) for value in data.values()]
+    offsets: List[int] = []
+    position = 0
+    for blob in blobs:
+        offsets.append(position)
+        position += len(blob)
+    offsets.append(position)
+    keys = list(data)
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    header = marshal.dumps((FORMAT_TAG, list(source_signature), keys, offsets, order))
+    target = snapshot_path(path)
+    tmp_path = temporary_path(target)
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, target)
+    return _PREFIX.size + len(header) + position
+
+
+class _SortedKeys:
+    """Ключи снимка в порядке возрастания, без копирования списка (для bisect)."""
+
+    def __init__(self, keys: Sequence[str], order: Sequence[int]) -> None:
+        self.keys = keys
+        self.order = order
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __getitem__(self, position: int) -> str:
+        return self.keys[self.order[position]]
+
+
+class SnapshotReader:
+    """Открытый через mmap снимок; LookupError, если снимка нет или он не подходит."""
+
+    def __init__(self, path: str, source_signature: Optional[Tuple[int, int]]) -> None:
+        try:
+            self._file = open(snapshot_path(path), "rb")
+        except FileNotFoundError:
+            raise LookupError(snapshot_path(path))
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, header_length = _PREFIX.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError("не снимок lr1")
+            tag, signature, self.keys, self._offsets, self._order = marshal.loads(
+                self._map[_PREFIX.size:_PREFIX.size + header_length])
+        except (ValueError, EOFError, TypeError, struct.error):
+            self.close()
+            raise LookupError(snapshot_path(path))
+        if tuple(tag) != FORMAT_TAG or (source_signature is not None and tuple(signature) != tuple(source_signature)):
+            self.close()
+            raise LookupError(snapshot_path(path))
+        self.source_signature = tuple(signature)
+        self._body = _PREFIX.size + header_length
+        self.size = len(self._map)
+
+    def _record(self, index: int) -> Any:
+        start = self._body + self._offsets[index]
+        return marshal.loads(self._map[start:self._body + self._offsets[index + 1]])
+
+    def get(self, key: str) -> Optional[Any]:
+        position = bisect.bisect_left(_SortedKeys(self.keys, self._order), key)
+        if position == len(self._order) or self.keys[self._order[position]] != key:
+            return None
+        return self._record(self._order[position])
+
+    def load(self) -> Dict[str, Any]:
+        with gc_paused():
+            return {key: self._record(index) for index, key in enumerate(self.keys)}
+
+    def close(self) -> None:
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> 'SnapshotReader':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def json_to_snapshots(directory: Path) -> List[Path]:
+    """Строит снимки для всех JSON-документов каталога (включая шарды экзаменов)."""
+    converted = []
+    for path in sorted(Path(directory).rglob("*.json")):
+        try:
+            data = json.loads(read_file(str(path))[0].decode("utf-8-sig"))
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            write_snapshot(str(path), _file_signature(str(path)), data)
+            converted.append(path)
+    return converted
+
+
+def snapshots_to_json(directory: Path, force: bool = False) -> Tuple[List[Path], List[Path]]:
+    """Восстанавливает JSON-файлы из снимков каталога (формат как у json.dump(indent=4)).
+
+    JSON-файл, изменённый после построения снимка, не перезаписывается без force.
+    Возвращает восстановленные и пропущенные по этой причине файлы.
+    """
+    from entities.offset_index import encode_document
+
+    converted, skipped = [], []
+    for snapshot in sorted(Path(directory).rglob("*" + SNAPSHOT_SUFFIX)):
+        path = str(snapshot)[:-len(SNAPSHOT_SUFFIX)]
+        try:
+            with SnapshotReader(path, None) as reader:
+                if not force and os.path.exists(path) and reader.source_signature != _file_signature(path):
+                    skipped.append(Path(path))
+                    continue
+                data = reader.load()
+        except LookupError:
+            continue
+        encoded, _, _ = encode_document(data)
+        # Как и при обычной записи: читатели видят либо старый файл, либо новый целиком
+        tmp_path = temporary_path(path)
+        with open(tmp_path, "wb") as f:
+            f.write(encoded)
+        os.replace(tmp_path, path)
+        # Снимок снова соответствует JSON-файлу
+        write_snapshot(path, _file_signature(path), data)
+        converted.append(Path(path))
+    return converted, skipped
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Преобразование данных lr1 между JSON и двоичными снимками")
+    parser.add_argument("direction", choices=("to-snapshot", "to-json"))
+    parser.add_argument("directory", type=Path, nargs="?", default=Path("storage"))
+    parser.add_argument("--force", action="store_true", help="to-json: перезаписывать и изменённые JSON-файлы")
+    args = parser.parse_args(argv)
+    if args.direction == "to-snapshot":
+        converted = json_to_snapshots(args.directory)
+    else:
+        converted, skipped = snapshots_to_json(args.directory, args.force)
+        for path in skipped:
+            print(f"Пропущен {path}: файл изменён после построения снимка (используйте --force)")
+    for path in converted:
+        print(path)
+    print(f"Преобразовано файлов: {len(converted)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from entities.repository import (EDUCATIONAL_MATERIALS, EXAMS, SIMPLE_TOPICS, STUDENTS,
+                                 Repository)
+
+
+class _Table:
+    def __init__(self, name: str, key_column: str, columns: Tuple[str, ...],
+                 json_columns: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.key_column = key_column
+        self.columns = columns  # поля записи, хранящиеся отдельными столбцами
+        self.json_columns = json_columns  # вложенные структуры, хранятся как JSON-текст
+        # Если ключ не является полем записи (educational_materials), он хранится отдельно
+        self.all_columns = columns if key_column in columns else (key_column,) + columns
+
+    def to_row(self, key: str, record: Dict[str, Any]) -> Tuple[Any, ...]:
+        values = []
+        for column in self.all_columns:
+            value = key if column == self.key_column else record.get(column)
+            if column in self.json_columns:
+                value = json.dumps(value, ensure_ascii=False) if value is not None else None
+            values.append(value)
+        return tuple(values)
+
+    def from_row(self, row: sqlite3.Row) -> Tuple[str, Dict[str, Any]]:
+        record = {}
+        for column in self.columns:
+            value = row[column]
+            if column in self.json_columns and value is not None:
+                value = json.loads(value)
+            if value is not None:
+                record[column] = value
+        return row[self.key_column], record
+
+
+_TABLES = {
+    STUDENTS: _Table("students", "id",
+                     ("id", "last_name", "first_name", "exam_result", "materials", "readiness",
+                      "planned_study_time_minutes"),
+                     ("exam_result", "materials")),
+    EXAMS: _Table("exams", "subject", ("subject", "questions"), ("questions",)),
+    EDUCATIONAL_MATERIALS: _Table("educational_materials", "key", ("topic", "subject", "title", "author")),
+    SIMPLE_TOPICS: _Table("materials", "name", ("name",)),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id TEXT PRIMARY KEY,
+    last_name TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    exam_result TEXT,
+    materials TEXT,
+    readiness INTEGER,
+    planned_study_time_minutes INTEGER
+);
+CREATE TABLE IF NOT EXISTS exams (
+    subject TEXT PRIMARY KEY,
+    questions TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS educational_materials (
+    key TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    subject TEXT,
+    title TEXT,
+    author TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_educational_materials_topic ON educational_materials (topic);
+CREATE INDEX IF NOT EXISTS idx_educational_materials_topic_folded ON educational_materials (casefold(topic));
+CREATE TABLE IF NOT EXISTS materials (
+    name TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS versions (
+    collection TEXT PRIMARY KEY,
+    generation TEXT NOT NULL,
+    counter INTEGER NOT NULL
+);
+"""
+
+# Поля, по которым есть индекс и find_by может не сканировать таблицу
+_INDEXED_FIELDS = {
+    (EDUCATIONAL_MATERIALS, "topic"),
+    (EXAMS, "subject"),
+    (STUDENTS, "id"),
+    (SIMPLE_TOPICS, "name"),
+}
+
+
+def _casefold(value: Optional[str]) -> Optional[str]:
+    return value.casefold() if value is not None else None
+
+
+class SQLiteRepository(Repository):
+    """Хранилище в базе SQLite: по таблице на коллекцию, поиск по первичному ключу и индексам."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        # str.casefold корректно работает с кириллицей, в отличие от встроенных LOWER/LIKE SQLite.
+        # Индекс по casefold(topic) требует регистрации функции в каждом соединении.
+        self._connection.create_function("casefold", 1, _casefold, deterministic=True)
+        self._lock = threading.RLock()
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+            # Поколение случайно, чтобы версии новой базы на месте удалённой не совпали с прежними
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO versions (collection, generation, counter) VALUES (?, hex(randomblob(8)), 0)",
+                [(collection,) for collection in _TABLES])
+
+    @staticmethod
+    def _table(collection: str) -> _Table:
+        if collection not in _TABLES:
+            raise KeyError(f"Неизвестная коллекция: {collection}")
+        return _TABLES[collection]
+
+    def version(self, collection: str) -> Any:
+        # Счётчик хранится в базе и увеличивается в транзакции каждой записи, поэтому версия
+        # учитывает изменения из других соединений и не сбрасывается при перезапуске
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT generation, counter FROM versions WHERE collection = ?", (collection,)).fetchone()
+        return (row[0], row[1]) if row is not None else None
+
+    def _changed(self, collection: str) -> None:
+        self._connection.execute("UPDATE versions SET counter = counter + 1 WHERE collection = ?", (collection,))
+
+    def get(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        table = self._table(collection)
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT * FROM {table.name} WHERE {table.key_column} = ?", (key,)).fetchone()
+        return table.from_row(row)[1] if row is not None else None
+
+    def all(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        table = self._table(collection)
+        with self._lock:
+            rows = self._connection.execute(f"SELECT * FROM {table.name} ORDER BY rowid").fetchall()
+        return dict(table.from_row(row) for row in rows)
+
+    def keys(self, collection: str) -> List[str]:
+        table = self._table(collection)
+        with self._lock:
+            rows = self._connection.execute(f"SELECT {table.key_column} FROM {table.name} ORDER BY rowid").fetchall()
+        return [row[0] for row in rows]
+
+    def find_by(self, collection: str, field: str, value: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if (collection, field) not in _INDEXED_FIELDS:
+            return super().find_by(collection, field, value)
+        table = self._table(collection)
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT * FROM {table.name} WHERE {field} = ? LIMIT 1", (value,)).fetchone()
+        return table.from_row(row) if row is not None else None
+
+    def find_all_by(self, collection: str, field: str, value: str,
+                    case_insensitive: bool = False) -> List[Tuple[str, Dict[str, Any]]]:
+        if (collection, field) != (EDUCATIONAL_MATERIALS, "topic"):
+            return super().find_all_by(collection, field, value, case_insensitive)
+        table = self._table(collection)
+        if case_insensitive:
+            query = f"SELECT * FROM {table.name} WHERE casefold(topic) = ? ORDER BY rowid"
+            value = value.casefold()
+        else:
+            query = f"SELECT * FROM {table.name} WHERE topic = ? ORDER BY rowid"
+        with self._lock:
+            rows = self._connection.execute(query, (value,)).fetchall()
+        return [table.from_row(row) for row in rows]
+
+    def find_prefix(self, collection: str, field: str, prefix: str, case_insensitive: bool = True,
+                    limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        if (collection, field) != (EDUCATIONAL_MATERIALS, "topic"):
+            return super().find_prefix(collection, field, prefix, case_insensitive, limit)
+        table = self._table(collection)
+        folded = prefix.casefold()
+        # Диапазон по индексу casefold(topic): [prefix, prefix + максимальный символ)
+        query = (f"SELECT * FROM {table.name} WHERE casefold(topic) >= ? AND casefold(topic) < ? "
+                 f"ORDER BY casefold(topic), topic")
+        with self._lock:
+            rows = self._connection.execute(query, (folded, folded + "\U0010ffff")).fetchall()
+        matches = [table.from_row(row) for row in rows]
+        if not case_insensitive:
+            matches = [(key, record) for key, record in matches if record["topic"].startswith(prefix)]
+        return matches[:limit]
+
+    def _upsert_sql(self, table: _Table) -> str:
+        columns = ", ".join(table.all_columns)
+        placeholders = ", ".join("?" for _ in table.all_columns)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in table.all_columns
+                            if column != table.key_column)
+        # UPSERT вместо INSERT OR REPLACE сохраняет rowid, а значит и порядок записей в all()
+        conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        return (f"INSERT INTO {table.name} ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT ({table.key_column}) {conflict}")
+
+    def put(self, collection: str, key: str, record: Dict[str, Any]) -> None:
+        self.put_many(collection, [(key, record)])
+
+    def put_many(self, collection: str, records: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        table = self._table(collection)
+        rows = [table.to_row(key, record) for key, record in records]
+        with self._lock, self._connection:
+            self._connection.executemany(self._upsert_sql(table), rows)
+            self._changed(collection)
+        return len(rows)
+
+    def update(self, collection: str, key: str,
+               change: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        table = self._table(collection)
+        with self._lock, self._connection:
+            # BEGIN IMMEDIATE сразу берёт блокировку записи базы: другое соединение не изменит
+            # запись между чтением и записью, а при ошибке в change транзакция откатывается
+            self._connection.execute("BEGIN IMMEDIATE")
+            row = self._connection.execute(
+                f"SELECT * FROM {table.name} WHERE {table.key_column} = ?", (key,)).fetchone()
+            record = change(table.from_row(row)[1] if row is not None else None)
+            if record is not None:
+                self._connection.execute(self._upsert_sql(table), table.to_row(key, record))
+                self._changed(collection)
+        return record
+
+    def update_versioned(self, collection: str, key: str,
+                         change: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+                         ) -> Tuple[Optional[Dict[str, Any]], Any, Any]:
+        table = self._table(collection)
+        with self._lock, self._connection:
+            # Внутри транзакции другие соединения не пишут: версии до и после относятся только к этой записи
+            self._connection.execute("BEGIN IMMEDIATE")
+            before = self.version(collection)
+            row = self._connection.execute(
+                f"SELECT * FROM {table.name} WHERE {table.key_column} = ?", (key,)).fetchone()
+            record = change(table.from_row(row)[1] if row is not None else None)
+            if record is None:
+                return None, None, None
+            self._connection.execute(self._upsert_sql(table), table.to_row(key, record))
+            self._changed(collection)
+            return record, before, self.version(collection)
+
+    def delete_versioned(self, collection: str, key: str) -> Tuple[bool, Any, Any]:
+        table = self._table(collection)
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            before = self.version(collection)
+            cursor = self._connection.execute(
+                f"DELETE FROM {table.name} WHERE {table.key_column} = ?", (key,))
+            self._changed(collection)
+            return cursor.rowcount > 0, before, self.version(collection)
+
+    def update_many(self, collection: str, keys: Iterable[str],
+                    change: Callable[[str, Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+                    ) -> Dict[str, Dict[str, Any]]:
+        table = self._table(collection)
+        saved = {}
+        with self._lock, self._connection:
+            # Одна транзакция на все записи: чтение и запись не перемежаются с другими соединениями
+            self._connection.execute("BEGIN IMMEDIATE")
+            for key in dict.fromkeys(keys):
+                row = self._connection.execute(
+                    f"SELECT * FROM {table.name} WHERE {table.key_column} = ?", (key,)).fetchone()
+                record = change(key, table.from_row(row)[1] if row is not None else None)
+                if record is not None:
+                    saved[key] = record
+            if saved:
+                self._connection.executemany(self._upsert_sql(table),
+                                             [table.to_row(key, record) for key, record in saved.items()])
+                self._changed(collection)
+        return saved
+
+    def delete(self, collection: str, key: str) -> bool:
+        table = self._table(collection)
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                f"DELETE FROM {table.name} WHERE {table.key_column} = ?", (key,))
+            self._changed(collection)
+        return cursor.rowcount > 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
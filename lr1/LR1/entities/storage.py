@@ -0,0 +1,102 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from entities.channel import say
+from entities.journal import COMPACTING_SUFFIX, JOURNAL_SUFFIX, journal_store
+from entities.locking import lock_manager
+from entities.store_cache import store_cache
+
+STORAGE_MODES = ("json", "journal")
+
+_storage_mode = "json"
+
+
+def set_storage_mode(mode: str) -> None:
+    """json — каждое изменение перезаписывает файл целиком, journal — дописывает запись в журнал."""
+    global _storage_mode
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Неизвестный режим хранения: {mode}")
+    _storage_mode = mode
+
+
+def get_storage_mode() -> str:
+    return _storage_mode
+
+
+def write_lock(path: Path):
+    """Блокировка изменений документа path в текущем режиме; берётся в том же порядке, что и при записи."""
+    if _storage_mode == "journal":
+        return journal_store.write_lock(path)
+    return lock_manager.file_lock(path)
+
+
+def read_document(path: Path) -> Dict[str, Any]:
+    """Возвращает общий (кэшированный) документ; изменять его нельзя."""
+    if _storage_mode == "journal":
+        return journal_store.load(path)
+    return store_cache.load(path)
+
+
+def read_record(path: Path, key: str) -> Any:
+    """Одна запись документа; в режиме json может читать только её фрагмент файла."""
+    if _storage_mode == "journal":
+        return journal_store.load(path).get(key)
+    return store_cache.get_record(path, key)
+
+
+def document_signature(path: Path) -> List[Optional[List[int]]]:
+    """Версия документа: (mtime_ns, размер) файла и его журналов; None для отсутствующих файлов."""
+    signature = []
+    for file_path in (str(path), str(path) + COMPACTING_SUFFIX, str(path) + JOURNAL_SUFFIX):
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            signature.append(None)
+            continue
+        signature.append([stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def put_record(path: Path, key: str, record: Any) -> None:
+    if _storage_mode == "journal":
+        journal_store.put(path, key, record)
+        return
+    # Чтение-изменение-запись файла не должно перемешиваться между потоками и процессами
+    with lock_manager.file_lock(path):
+        try:
+            data = dict(store_cache.load(path))
+        except json.JSONDecodeError:
+            say(f"Ошибка чтения файла {path}. Файл будет перезаписан.")
+            data = {}  # Сбросить данные, если файл поврежден
+        data[key] = record
+        store_cache.store(path, data)
+
+
+def put_records(path: Path, items: Iterable[Tuple[str, Any]]) -> None:
+    """Сохраняет несколько записей одной записью файла (или одним дописыванием журнала)."""
+    if _storage_mode == "journal":
+        journal_store.put_many(path, items)
+        return
+    with lock_manager.file_lock(path):
+        try:
+            data = dict(store_cache.load(path))
+        except json.JSONDecodeError:
+            say(f"Ошибка чтения файла {path}. Файл будет перезаписан.")
+            data = {}  # Сбросить данные, если файл поврежден
+        data.update(items)
+        store_cache.store(path, data)
+
+
+def delete_record(path: Path, key: str) -> bool:
+    if _storage_mode == "journal":
+        return journal_store.delete(path, key)
+    with lock_manager.file_lock(path):
+        data = store_cache.load(path)
+        if key not in data:
+            return False
+        data = dict(data)
+        del data[key]
+        store_cache.store(path, data)
+        return True
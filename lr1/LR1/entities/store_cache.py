@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+from entities.compression import compression_policy, read_file, write_file
+from entities.locking import temporary_path
+from entities.offset_index import (Fragments, encode_document, lookup_offset, read_index_signature, read_slice,
+                                   write_offset_index)
+from entities.profiling import profiler
+from entities.snapshot import SnapshotReader, write_snapshot
+
+Signature = Tuple[int, int]
+
+
+class _Entry:
+    def __init__(self, signature: Signature, data: Dict[str, Any], fragments: Optional[Fragments] = None) -> None:
+        self.signature = signature
+        self.data = data
+        self.fragments = fragments  # закодированные записи с последней записи файла
+
+
+class StoreCache:
+    """Кэш разобранных JSON-файлов хранилища.
+
+    Документ перечитывается с диска только если у файла изменились mtime или размер.
+    Возвращаемые словари общие для всех вызывающих: изменять их можно только перед
+    последующим вызовом store(), иначе нужно работать с копией.
+
+    Для файлов, включённых через enable_offset_index(), рядом ведётся индекс смещений
+    <файл>.offsets, и get_record() читает с диска только фрагмент нужной записи.
+    Если рядом с файлом лежит актуальный двоичный снимок <файл>.snap, документ читается из него.
+    Сжатые файлы (см. entities.compression) распознаются при чтении сами; при записи
+    метод сжатия выбирает compression_policy. Для сжатых файлов индекс смещений не ведётся.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, _Entry] = {}
+        self._offset_indexed: Set[str] = set()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.slice_reads = 0
+        self.snapshot_reads = 0
+        # Записывать ли рядом с JSON двоичные снимки <файл>.snap; читаются актуальные снимки всегда
+        self.write_snapshots = False
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return os.path.abspath(path)
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Signature]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def enable_offset_index(self, path: Path) -> None:
+        self._offset_indexed.add(self._key(path))
+
+    def load(self, path: Path) -> Dict[str, Any]:
+        """Возвращает содержимое файла (пустой словарь, если файла нет).
+
+        json.JSONDecodeError пробрасывается вызывающему коду.
+        """
+        key = self._key(path)
+        with self._lock:
+            signature = self._signature(key)
+            if signature is None:
+                self._entries.pop(key, None)
+                return {}
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                self.hits += 1
+                return entry.data
+            self.misses += 1
+            data = self._load_snapshot(key, signature)
+            if data is not None:
+                self._entries[key] = _Entry(signature, data)
+                return data
+            raw, disk_bytes, method = read_file(key)
+            profiler.add_bytes(read=disk_bytes)
+            data = json.loads(raw.decode("utf-8"))
+            self._entries[key] = _Entry(signature, data)
+            if method is None and key in self._offset_indexed and read_index_signature(key) != signature:
+                self._rebuild_offset_index(key, signature, data, raw)
+            if self.write_snapshots and isinstance(data, dict):
+                write_snapshot(key, signature, data)  # следующий холодный старт прочитает снимок
+            return data
+
+    def _load_snapshot(self, key: str, signature: Signature) -> Optional[Dict[str, Any]]:
+        try:
+            with SnapshotReader(key, signature) as reader:
+                data = reader.load()
+                profiler.add_bytes(read=reader.size)
+        except LookupError:
+            return None
+        self.snapshot_reads += 1
+        return data
+
+    def _rebuild_offset_index(self, key: str, signature: Signature, data: Dict[str, Any], raw: bytes) -> None:
+        # Смещения известны только если файл записан в том же формате, что и encode_document
+        encoded, offsets, fragments = encode_document(data)
+        if encoded == raw:
+            self._entries[key].fragments = fragments
+            write_offset_index(key, signature, offsets)
+
+    def get_record(self, path: Path, record_key: str) -> Optional[Any]:
+        """Одна запись документа. Без разбора всего файла, если он не в кэше, но есть индекс смещений."""
+        key = self._key(path)
+        with self._lock:
+            signature = self._signature(key)
+            if signature is None:
+                return None
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                self.hits += 1
+                return entry.data.get(record_key)
+            if key in self._offset_indexed:
+                try:
+                    f = open(key, "rb")
+                except FileNotFoundError:
+                    return None
+                with f:
+                    # Версия файла берётся у открытого дескриптора: если файл подменят после
+                    # проверки индекса, срез всё равно читается из той версии, для которой построен индекс
+                    stat = os.fstat(f.fileno())
+                    try:
+                        location = lookup_offset(key, record_key, (stat.st_mtime_ns, stat.st_size))
+                    except LookupError:
+                        pass  # индекса нет или он устарел: он будет перестроен при полном чтении
+                    else:
+                        self.slice_reads += 1
+                        if location is None:
+                            return None
+                        profiler.add_bytes(read=location[1])
+                        return read_slice(f, *location)
+            try:
+                with SnapshotReader(key, signature) as reader:
+                    self.snapshot_reads += 1
+                    return reader.get(record_key)
+            except LookupError:
+                pass  # снимка нет или он устарел
+        return self.load(path).get(record_key)
+
+    def store(self, path: Path, data: Dict[str, Any]) -> None:
+        """Записывает документ в файл и сразу кладёт его в кэш.
+
+        Файл записывается рядом и подменяется через os.replace, поэтому читатели из других
+        процессов видят либо старую, либо новую версию целиком.
+        Записи, которые остались теми же объектами, что и при прошлой записи, не кодируются заново.
+        """
+        key = self._key(path)
+        with self._lock:
+            os.makedirs(os.path.dirname(key), exist_ok=True)
+            entry = self._entries.get(key)
+            encoded, offsets, fragments = encode_document(data, entry.fragments if entry is not None else None)
+            choice = compression_policy.choice_for(key)
+            tmp_path = temporary_path(key)
+            try:
+                with open(tmp_path, "wb") as f:
+                    written = write_file(f, encoded, choice)
+                    f.flush()
+                    stat = os.fstat(f.fileno())
+                os.replace(tmp_path, key)  # mtime и размер сохраняются при переименовании
+            except Exception:
+                self._entries.pop(key, None)
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            profiler.add_bytes(written=written)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            self._entries[key] = _Entry(signature, data, fragments)
+            if key in self._offset_indexed and choice is None:
+                write_offset_index(key, signature, offsets)
+            if self.write_snapshots:
+                write_snapshot(key, signature, data)
+
+    def invalidate(self, path: Optional[Path] = None) -> None:
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(path), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "slice_reads": self.slice_reads,
+                    "snapshot_reads": self.snapshot_reads, "entries": len(self._entries)}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.slice_reads = 0
+            self.snapshot_reads = 0
+
+
+# Общий кэш для всех сущностей lr1
+store_cache = StoreCache()
@@ -1,17 +1,57 @@
-﻿import json
-import os
+﻿import copy
+import json
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Iterable, Optional, List
 
-from entities.material import Material  # Изменено с EducationalMaterial на Material
+from entities.channel import ask, say
+from entities.attempts import attempt_log
+from entities.material import Material, StoredMaterial, StudiedMaterials  # Изменено с EducationalMaterial на Material
+from entities.answers import display_answer
 from entities.exam import Exam
+from entities.identity_map import interned
+from entities.leaderboard import leaderboard
+from entities.profiling import profiled
+from entities.repository import STUDENTS, get_repository, register_collection
+
+
+def merge_record(base: Dict[str, Any], mine: Dict[str, Any], theirs: Dict[str, Any]) -> Dict[str, Any]:
+    """Трёхстороннее объединение записи студента.
+
+    base — запись на момент загрузки, mine — изменённая в этом сеансе, theirs — текущая в
+    хранилище. Поля, которые этот сеанс не менял, берутся из theirs; к числам прибавляется
+    наше изменение, словари объединяются по ключам, в списки добавляются наши новые
+    элементы и из них убираются удалённые нами. Остальные поля берутся из mine.
+    """
+    merged = dict(theirs)
+    for field, value in mine.items():
+        old, current = base.get(field), theirs.get(field)
+        if value == old:
+            continue
+        if all(isinstance(item, int) for item in (value, old, current)):
+            merged[field] = current + value - old
+        elif all(isinstance(item, dict) for item in (value, old, current)):
+            merged[field] = {key: item for key, item in current.items() if key in value or key not in old}
+            merged[field].update((key, item) for key, item in value.items() if old.get(key) != item)
+        elif all(isinstance(item, list) for item in (value, old, current)):
+            removed = [item for item in old if item not in value]
+            merged[field] = [item for item in current if item not in removed]
+            merged[field] += [item for item in value if item not in old and item not in current]
+        else:
+            merged[field] = value
+    if isinstance(merged.get("readiness"), int):
+        merged["readiness"] = min(100, max(0, merged["readiness"]))
+    return merged
 
 
 class Student:
     STORAGE_FILE = Path("storage/students.json")
+    COLLECTION = STUDENTS
+    save_conflicts = 0  # сохранений, при которых запись успели изменить в другом сеансе
+    __slots__ = ("id", "last_name", "first_name", "exam_result", "_materials", "readiness",
+                 "planned_study_time_minutes", "_clean_state")
 
     def __init__(self, student_id: str, last_name: str, first_name: str, exam_result: Optional[Dict[str, str]] = None,
-                 materials: Optional[List[Dict[str, Any]]] = None, readiness: int = 0,
+                 materials: Optional[Iterable[StoredMaterial]] = None, readiness: int = 0,
                  planned_study_time_minutes: int = 0):
         self.id = student_id
         self.last_name = last_name
@@ -20,14 +60,29 @@ class Student:
         self.materials = materials or []
         self.readiness = readiness
         self.planned_study_time_minutes = planned_study_time_minutes
+        self._clean_state: Optional[Dict[str, Any]] = None  # состояние на момент последней загрузки/записи
 
-    def self_assessment(self) -> None:
-        print(f"[Самооценка] Текущая готовность: {self.readiness}%")
-        print(f"[Самооценка] Запланировано времени изучения: {self.planned_study_time_minutes} минут.")
+    @property
+    def materials(self) -> StudiedMaterials:
+        return self._materials
 
-    def study_topic(self) -> None:  # Метод для изучения простых тем
-        # Выводить список доступных тем будет Console
-        topic_name = input("Введите название темы для изучения (из materials.json): ").strip()
+    @materials.setter
+    def materials(self, materials: Iterable[StoredMaterial]) -> None:
+        # Словари материалов и ссылки на каталог приводятся к StudiedMaterials
+        self._materials = materials if isinstance(materials, StudiedMaterials) else StudiedMaterials(materials)
+
+    def self_assessment(self) -> None:
+        say(f"[Самооценка] Текущая готовность: {self.readiness}%")
+        say(f"[Самооценка] Запланировано времени изучения: {self.planned_study_time_minutes} минут.")
+        for subject, rollup in sorted(attempt_log.progress(self.id).items()):
+            say(f"[Самооценка] {subject}: попыток {rollup['attempts']}, лучший результат {rollup['best']:.0%}, "
+                f"последний {rollup['last_result']}, среднее за последние попытки {rollup['average']:.0%}")
+
+    def study_topic(self, topic_name: Optional[str] = None) -> None:  # Метод для изучения простых тем
+        # Выводить список доступных тем будет Console; без topic_name тема запрашивается здесь
+        if topic_name is None:
+            topic_name = ask("Введите название темы для изучения (из materials.json): ")
+        topic_name = topic_name.strip()
 
         simple_topic = Material.load_simple_topic(topic_name)
 
@@ -35,123 +90,158 @@ class Student:
             topic_data_to_store = {"name": topic_name}
             if topic_data_to_store not in self.materials:
                 self.materials.append(topic_data_to_store)
-                print(f"Тема '{topic_name}' успешно изучена (из materials.json).")
+                say(f"Тема '{topic_name}' успешно изучена (из materials.json).")
                 self.readiness = min(100, self.readiness + 10)
-                print(f"[Обновление] Готовность: {self.readiness}%")
+                say(f"[Обновление] Готовность: {self.readiness}%")
             else:
-                print(f"Тема '{topic_name}' уже была изучена ранее.")
+                say(f"Тема '{topic_name}' уже была изучена ранее.")
         else:
-            print(f"Тема '{topic_name}' не найдена в materials.json.")
+            say(f"Тема '{topic_name}' не найдена в materials.json.")
 
-    def take_mock_exam(self) -> None:
-        # Выводить список доступных экзаменов будет Console
-        subject = input("Введите название предмета для пробного экзамена: ").strip()
+    def take_mock_exam(self, subject: Optional[str] = None) -> None:
+        # Выводить список доступных экзаменов будет Console; без subject предмет запрашивается здесь
+        if subject is None:
+            subject = ask("Введите название предмета для пробного экзамена: ")
+        subject = subject.strip()
         exam = Exam.load(subject)
         if not exam:
             return
 
+        matcher = exam.matcher()
         correct_answers = 0
+        correctness: List[bool] = []
         for i, (topic, question, correct_answer) in enumerate(exam.questions, 1):
-            print(f"\nВопрос {i} по теме '{topic}':")
-            print(question)
-            student_answer = input("Ваш ответ: ").strip()
-            if student_answer.lower() == correct_answer.lower():
-                print("Верно!")
+            say(f"\nВопрос {i} по теме '{topic}':")
+            say(question)
+            student_answer = ask("Ваш ответ: ").strip()
+            correctness.append(matcher.is_correct(i - 1, student_answer))
+            if correctness[-1]:
+                say("Верно!")
                 correct_answers += 1
                 self.readiness = min(100, self.readiness + 20)
             else:
-                print(f"Неверно. Правильный ответ: {correct_answer}")
-            print(f"[Обновление] Готовность: {self.readiness}%")
+                say(f"Неверно. Правильный ответ: {display_answer(correct_answer)}")
+            say(f"[Обновление] Готовность: {self.readiness}%")
 
         self.exam_result[subject] = f"{correct_answers}/{len(exam.questions)}"
-        print(f"\nВы набрали {correct_answers} из {len(exam.questions)} по предмету '{subject}'.")
-        self.save()
+        attempt_log.record(self.id, subject, correctness)  # история попыток хранится отдельно от записи студента
+        say(f"\nВы набрали {correct_answers} из {len(exam.questions)} по предмету '{subject}'.")
 
     def plan_study_time(self) -> None:
         """Позволяет студенту запланировать время для изучения."""
         try:
-            time_str = input(
+            time_str = ask(
                 f"Введите сколько минут вы планируете изучать (текущее запланированное: {self.planned_study_time_minutes} мин): ").strip()
             if not time_str.isdigit() or int(time_str) < 0:
-                print("Ошибка: Время должно быть положительным числом.")
+                say("Ошибка: Время должно быть положительным числом.")
                 return
             new_time = int(time_str)
             self.planned_study_time_minutes += new_time
-            print(
+            say(
                 f"Успешно добавлено {new_time} минут к плану. Общее запланированное время: {self.planned_study_time_minutes} минут.")
         except Exception as e:
-            print(f"Ошибка при планировании времени: {e}")
+            say(f"Ошибка при планировании времени: {e}")
 
     def show_status(self) -> None:
-        print(f"\nСтудент: {self.first_name} {self.last_name} | Готовность: {self.readiness}%")
-        print(f"Запланировано времени изучения: {self.planned_study_time_minutes} минут.")
-        print("\nИзученные материалы:")
+        say(f"\nСтудент: {self.first_name} {self.last_name} | Готовность: {self.readiness}%")
+        say(f"Запланировано времени изучения: {self.planned_study_time_minutes} минут.")
+        say("\nИзученные материалы:")
         if not self.materials:
-            print("Нет изученных материалов.")
+            say("Нет изученных материалов.")
         for i, m_data in enumerate(self.materials, 1):
             if "name" in m_data:  # Простая тема
-                print(f"{i}. Тема: '{m_data['name']}'")
+                say(f"{i}. Тема: '{m_data['name']}'")
             else:  # Дополнительная литература
                 subject_info = f"(Предмет: {m_data.get('subject', 'Не указан')})" if m_data.get('subject') else ""
                 title_info = f"'{m_data.get('title', 'Без названия')}'"
                 author_info = f"(Автор: {m_data.get('author', 'Неизвестен')})"
-                print(
+                say(
                     f"{i}. Тема: '{m_data.get('topic', 'Без темы')}' {title_info} {author_info} {subject_info}".strip())
 
-    def save(self) -> None:
-        os.makedirs(self.STORAGE_FILE.parent, exist_ok=True)
-        data = {}
-        if self.STORAGE_FILE.exists():
-            try:
-                with open(self.STORAGE_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except json.JSONDecodeError:
-                print(f"Ошибка чтения файла {self.STORAGE_FILE}. Файл будет перезаписан.")
-                data = {}  # Сбросить данные, если файл поврежден
-
-        data[self.id] = {
+    def to_dict(self) -> Dict[str, Any]:
+        return {
             "id": self.id,
             "last_name": self.last_name,
             "first_name": self.first_name,
-            "exam_result": self.exam_result,
-            "materials": self.materials,
+            "exam_result": copy.deepcopy(self.exam_result),
+            "materials": self.materials.to_record(),
             "readiness": self.readiness,
             "planned_study_time_minutes": self.planned_study_time_minutes
         }
-        with open(self.STORAGE_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+
+    def dirty_fields(self) -> List[str]:
+        """Поля, изменённые после последней загрузки или записи (для нового студента — все)."""
+        current = self.to_dict()
+        if self._clean_state is None:
+            return list(current)
+        return [field for field, value in current.items() if self._clean_state.get(field) != value]
+
+    def mark_clean(self) -> None:
+        self._clean_state = self.to_dict()
+
+    @profiled("Student.save")
+    def save(self) -> None:
+        """Сохраняет студента, не затирая изменения из других сеансов.
+
+        Если запись в хранилище отличается от загруженной, изменения объединяются
+        (merge_record), а объект получает итоговое состояние записи.
+        """
+        mine, base = self.to_dict(), self._clean_state
+
+        def change(current: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            if current is None or base is None or current == base:
+                return mine
+            Student.save_conflicts += 1
+            return merge_record(base, mine, current)
+
+        record, version, new_version = get_repository().update_versioned(self.COLLECTION, self.id, change)
+        leaderboard.record_changed(self.id, record, version, new_version)
+        if record is not mine:
+            merged = interned(record)
+            self.last_name, self.first_name = merged["last_name"], merged["first_name"]
+            self.exam_result = merged.get("exam_result", {})
+            self.materials = merged.get("materials", [])
+            self.readiness = merged.get("readiness", 0)
+            self.planned_study_time_minutes = merged.get("planned_study_time_minutes", 0)
+        self._clean_state = record
+
+    @classmethod
+    def from_dict(cls, s_data: Dict[str, Any]) -> 'Student':
+        """Создаёт студента из сохранённой записи (запись копируется, строки интернируются)."""
+        record, s_data = s_data, interned(s_data)
+        student = cls(s_data["id"], s_data["last_name"], s_data["first_name"],
+                      s_data.get("exam_result", {}), s_data.get("materials", []),
+                      s_data.get("readiness", 0), s_data.get("planned_study_time_minutes", 0))
+        student.mark_clean()
+        if student._clean_state == record:
+            # Записи хранилища не изменяются, поэтому чистым состоянием служит сама запись, без второй копии
+            student._clean_state = record
+        return student
 
     @classmethod
+    @profiled("Student.load")
     def load(cls, student_id: str) -> Optional['Student']:
-        if not cls.STORAGE_FILE.exists():
-            return None
         try:
-            with open(cls.STORAGE_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if student_id in data:
-                    s_data = data[student_id]
-                    return cls(s_data["id"], s_data["last_name"], s_data["first_name"],
-                               s_data.get("exam_result", {}), s_data.get("materials", []),
-                               s_data.get("readiness", 0), s_data.get("planned_study_time_minutes", 0))
-                return None
+            s_data = get_repository().get(cls.COLLECTION, student_id)
+            if s_data is not None:
+                # Копия, чтобы несохранённые изменения не попадали в общий кэш
+                return cls.from_dict(s_data)
+            return None
         except json.JSONDecodeError:
-            print(f"Ошибка чтения файла {cls.STORAGE_FILE}. Файл пуст или поврежден.")
+            say(f"Ошибка чтения файла {cls.STORAGE_FILE}. Файл пуст или поврежден.")
             return None
 
     @classmethod
+    @profiled("Student.delete_student")
     def delete_student(cls, student_id: str) -> bool:
-        if not cls.STORAGE_FILE.exists():
-            return False
         try:
-            with open(cls.STORAGE_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            deleted, version, new_version = get_repository().delete_versioned(cls.COLLECTION, student_id)
+            if deleted:
+                leaderboard.record_changed(student_id, None, version, new_version)
+            return deleted
         except json.JSONDecodeError:
-            print(f"Ошибка чтения файла {cls.STORAGE_FILE}. Файл пуст или поврежден.")
+            say(f"Ошибка чтения файла {cls.STORAGE_FILE}. Файл пуст или поврежден.")
             return False
 
-        if student_id in data:
-            del data[student_id]
-            with open(cls.STORAGE_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
-            return True
-        return False
\ No newline at end of file
+
+register_collection(Student.COLLECTION, lambda: Student.STORAGE_FILE)
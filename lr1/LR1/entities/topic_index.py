@@ -0,0 +1,125 @@
+import bisect
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from entities.locking import temporary_path
+
+INDEX_SUFFIX = ".topics"
+
+
+class TopicIndex:
+    """Вторичный индекс тема -> ключи записей для дополнительной литературы.
+
+    У одной темы может быть несколько записей: индекс хранит все их ключи в порядке
+    документа, поэтому после удаления одной из них тема по-прежнему находит остальные.
+    Точный поиск и поиск без учёта регистра выполняются по словарям, поиск по префиксу —
+    бинарным поиском по отсортированному списку тем в нижнем регистре.
+    """
+
+    def __init__(self, signature: Any = None) -> None:
+        self.signature = signature
+        self._exact: Dict[str, List[str]] = {}
+        self._folded: Dict[str, List[str]] = {}
+        self._sorted_folded: List[str] = []
+
+    @classmethod
+    def build(cls, topics: Dict[str, List[str]], signature: Any = None) -> 'TopicIndex':
+        index = cls(signature)
+        for topic, keys in topics.items():
+            index._exact[topic] = list(keys)
+            index._folded.setdefault(topic.casefold(), []).append(topic)
+        index._sorted_folded = sorted(index._folded)
+        return index
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Dict[str, Any]], signature: Any = None) -> 'TopicIndex':
+        topics: Dict[str, List[str]] = {}
+        for key, record in document.items():
+            topic = record.get("topic")
+            if topic is not None:
+                topics.setdefault(topic, []).append(key)
+        return cls.build(topics, signature)
+
+    def add(self, topic: str, key: str) -> None:
+        keys = self._exact.get(topic)
+        if keys is not None:
+            if key not in keys:
+                keys.append(key)
+            return
+        self._exact[topic] = [key]
+        folded = topic.casefold()
+        if folded not in self._folded:
+            self._folded[folded] = []
+            bisect.insort(self._sorted_folded, folded)
+        self._folded[folded].append(topic)
+
+    def remove(self, topic: str, key: str) -> None:
+        """Убирает запись key из темы; тема исчезает из индекса вместе с последней записью."""
+        keys = self._exact.get(topic)
+        if keys is None or key not in keys:
+            return
+        keys.remove(key)
+        if keys:
+            return
+        del self._exact[topic]
+        folded = topic.casefold()
+        variants = self._folded[folded]
+        variants.remove(topic)
+        if not variants:
+            del self._folded[folded]
+            position = bisect.bisect_left(self._sorted_folded, folded)
+            del self._sorted_folded[position]
+
+    def get(self, topic: str) -> Optional[str]:
+        """Ключ первой записи с темой topic (как при линейном поиске)."""
+        keys = self._exact.get(topic)
+        return keys[0] if keys else None
+
+    def get_all(self, topic: str) -> List[str]:
+        return list(self._exact.get(topic, ()))
+
+    def get_casefold(self, topic: str) -> List[str]:
+        """Ключи записей, тема которых совпадает с topic без учёта регистра."""
+        return [key for variant in self._folded.get(topic.casefold(), []) for key in self._exact[variant]]
+
+    def prefix(self, prefix: str, case_insensitive: bool = True, limit: Optional[int] = None) -> List[str]:
+        """Ключи записей, тема которых начинается с prefix (в порядке тем)."""
+        folded_prefix = prefix.casefold()
+        keys = []
+        position = bisect.bisect_left(self._sorted_folded, folded_prefix)
+        while position < len(self._sorted_folded) and self._sorted_folded[position].startswith(folded_prefix):
+            for topic in sorted(self._folded[self._sorted_folded[position]]):
+                if case_insensitive or topic.startswith(prefix):
+                    keys.extend(self._exact[topic])
+                    if limit is not None and len(keys) >= limit:
+                        return keys[:limit]
+            position += 1
+        return keys
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def save(self, path: Path) -> None:
+        """Сохраняет индекс рядом с файлом данных (<файл>.topics)."""
+        index_path = str(path) + INDEX_SUFFIX
+        tmp_path = temporary_path(index_path)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": self.signature, "topics": self._exact}, f, ensure_ascii=False)
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, path: Path, signature: Any) -> Optional['TopicIndex']:
+        """Читает сохранённый индекс, если он построен для той же версии файла данных."""
+        index_path = str(path) + INDEX_SUFFIX
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        topics = data.get("topics", {})
+        # Индекс старого формата (тема -> один ключ) неполон и перестраивается
+        if data.get("signature") != signature or not all(isinstance(keys, list) for keys in topics.values()):
+            return None
+        return cls.build(topics, signature)
@@ -0,0 +1,51 @@
+from typing import Any, List
+
+
+class UnitOfWork:
+    """Отложенная запись изменённых сущностей в рамках сеанса консоли.
+
+    Сущность должна предоставлять dirty_fields() и save(). После каждой логической
+    операции консоль вызывает complete_operation(): без объединения записей изменённые
+    сущности сохраняются сразу, с объединением (coalesce=True) — только при commit()
+    (выход из меню студента или завершение программы).
+    """
+
+    def __init__(self, coalesce: bool = False) -> None:
+        self.coalesce = coalesce
+        self._entities: List[Any] = []
+        self.requested_writes = 0  # сколько записей сделала бы консоль, сохраняя всё после каждой операции
+        self.writes = 0
+
+    @property
+    def writes_avoided(self) -> int:
+        return self.requested_writes - self.writes
+
+    def register(self, entity: Any) -> None:
+        if not any(registered is entity for registered in self._entities):
+            self._entities.append(entity)
+
+    def forget(self, entity: Any) -> None:
+        self._entities = [registered for registered in self._entities if registered is not entity]
+
+    def complete_operation(self) -> None:
+        self.requested_writes += len(self._entities)
+        if not self.coalesce:
+            self.commit()
+
+    def commit(self) -> int:
+        """Сохраняет изменённые сущности, возвращает число выполненных записей."""
+        written = 0
+        for entity in self._entities:
+            if entity.dirty_fields():
+                entity.save()
+                written += 1
+        self.writes += written
+        return written
+
+    def close(self) -> None:
+        self.commit()
+        self._entities = []
+
+    def stats(self) -> dict:
+        return {"requested_writes": self.requested_writes, "writes": self.writes,
+                "writes_avoided": self.writes_avoided}
@@ -1,8 +1,117 @@
-﻿from console.console import Console
+﻿import argparse
+import asyncio
+from pathlib import Path
+
+from console.console import Console
+from console.server import DEFAULT_HOST, DEFAULT_PORT, ConsoleServer
+from entities.attempts import attempt_log
+from entities.compression import compression_policy
+from entities.grading import grade_cohort
+from entities.profiling import profiler
+from entities.repository import JsonRepository, migrate, set_repository
+from entities.search import search_index
+from entities.sqlite_repository import SQLiteRepository
+from entities.storage import STORAGE_MODES, set_storage_mode
+from entities.store_cache import store_cache
+
+DEFAULT_DB = Path("storage/lr1.db")
+DEFAULT_PROFILE = Path("profile.json")
+
 
 def main():
-    console = Console()
-    console.start()
+    parser = argparse.ArgumentParser(description="Система подготовки студентов к экзаменам")
+    parser.add_argument("--storage", choices=STORAGE_MODES + ("sqlite",), default="json",
+                        help="хранилище данных: json (перезапись файла), journal (журнал изменений) или sqlite")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB, help="путь к базе SQLite")
+    parser.add_argument("--migrate", action="store_true",
+                        help="перенести данные из JSON-файлов storage/ в базу SQLite и выйти")
+    parser.add_argument("--defer-writes", action="store_true",
+                        help="сохранять изменения студента один раз при выходе из меню, а не после каждого действия")
+    parser.add_argument("--grade", metavar="SUBJECT",
+                        help="проверить ответы группы по предмету без диалога (вместе с --answers) и выйти")
+    parser.add_argument("--answers", type=Path, help="файл ответов CSV или JSON lines для --grade")
+    parser.add_argument("--serve", action="store_true",
+                        help="запустить сервер, обслуживающий много сеансов консоли одновременно")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="адрес сервера")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="порт сервера")
+    parser.add_argument("--unix", help="путь к Unix-сокету вместо TCP")
+    parser.add_argument("--profile", type=Path, nargs="?", const=DEFAULT_PROFILE, metavar="FILE",
+                        help="замерять время и ввод-вывод действий меню и записать профиль в FILE при выходе "
+                             f"(по умолчанию {DEFAULT_PROFILE})")
+    parser.add_argument("--snapshots", action="store_true",
+                        help="вести рядом с JSON-файлами двоичные снимки .snap для быстрого запуска")
+    parser.add_argument("--compress", metavar="METHOD[:LEVEL]",
+                        help="сжимать файлы хранилища при записи: zlib или lzma с уровнем 0..9 "
+                             "(сжатые файлы читаются всегда)")
+    parser.add_argument("--compress-file", action="append", default=[], metavar="PATTERN=METHOD[:LEVEL]",
+                        help="сжатие отдельных файлов по шаблону имени, например students.json=lzma:9 или exams/*=none")
+    args = parser.parse_args()
+    if args.grade and args.answers is None:
+        parser.error("--grade требует --answers")
+
+    if args.migrate:
+        # Файлы читаются вместе с журналом изменений: записи, ещё не перенесённые в файл, тоже переносятся
+        set_storage_mode("journal")
+        target = SQLiteRepository(args.db)
+        counts = migrate(JsonRepository(), target)
+        target.close()
+        for collection, count in counts.items():
+            print(f"{collection}: перенесено записей — {count}")
+        return
+
+    if args.snapshots:
+        store_cache.write_snapshots = True
+    try:
+        compression_policy.configure(args.compress, args.compress_file)
+    except ValueError as e:
+        parser.error(str(e))
+
+    database = None
+    if args.storage == "sqlite":
+        database = SQLiteRepository(args.db)
+        set_repository(database)
+    else:
+        set_storage_mode(args.storage)
+
+    if args.grade:
+        try:
+            report = grade_cohort(args.grade, args.answers)
+        except (OSError, ValueError) as e:
+            print(f"Ошибка проверки: {e}")
+            return
+        finally:
+            if database is not None:
+                database.close()
+        print(f"Проверено студентов: {report.graded}, средний балл: "
+              f"{report.average_score():.2f} из {report.question_count}")
+        if report.unknown_students:
+            print(f"Не найдены студенты: {', '.join(report.unknown_students)}")
+        if report.invalid_rows:
+            print(f"Пропущены некорректные строки: {', '.join(map(str, report.invalid_rows))}")
+        return
+
+    if args.profile:
+        profiler.enable(args.profile)
+    try:
+        if args.serve:
+            server = ConsoleServer(coalesce_writes=args.defer_writes)
+            address = args.unix or f"{args.host}:{args.port}"
+            print(f"Сервер запущен: {address}")
+            try:
+                asyncio.run(server.serve_forever(args.host, args.port, args.unix))
+            except KeyboardInterrupt:
+                print("\nСервер остановлен.")
+            return
+
+        console = Console(coalesce_writes=args.defer_writes)
+        console.start()
+    finally:
+        attempt_log.checkpoint()
+        search_index.checkpoint()
+        if database is not None:
+            database.close()
+        if profiler.enabled:
+            print(f"Профиль записан в {profiler.dump()}")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
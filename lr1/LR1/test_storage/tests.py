@@ -1,6 +1,11 @@
+import asyncio
+import importlib.util
 import unittest
 import json
 import os
+import tempfile
+import threading
+import time
 from pathlib import Path
 from unittest.mock import patch, mock_open
 
@@ -8,6 +13,31 @@ from entities.student import Student
 from entities.exam import Exam
 from entities.material import Material
 from entities.additional_classes import AdditionalClasses
+from entities.compression import compression_policy, detect
+from entities.leaderboard import leaderboard
+from entities.search import SearchIndex, search_index
+from entities.locking import LOCK_SUFFIX
+from entities.listing import CatalogListing
+from entities.bulk import export_file, import_file
+from entities.attempts import ROLLUPS_SUFFIX, AttemptLog, attempt_log
+from entities.snapshot import SnapshotReader, json_to_snapshots, snapshot_path, snapshots_to_json
+from entities.repository import EDUCATIONAL_MATERIALS, EXAMS, get_repository
+from entities.recommendations import RecommendationIndex, recommendation_index
+from benchmarks import replay
+from entities.profiling import profiler
+from console.channel import ScriptedChannel, use_channel
+from console.console import Console
+from benchmarks import storage_benchmark
+from entities.offset_index import OFFSETS_SUFFIX, lookup_offset
+from entities.analytics import CohortAnalytics
+from entities.grading import grade_cohort
+from console.server import ConsoleServer
+from entities.unit_of_work import UnitOfWork
+from entities.repository import JsonRepository, migrate, set_repository
+from entities.sqlite_repository import SQLiteRepository
+from entities.journal import journal_store
+from entities.storage import set_storage_mode
+from entities.store_cache import store_cache
 
 
 
@@ -16,20 +46,23 @@ class TestEntities(unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
-        cls.test_storage_dir = Path("test_storage")
-        cls.test_storage_dir.mkdir(exist_ok=True)
+        # Временные файлы — в отдельном каталоге, чтобы очистка не задела файлы test_storage/
+        cls.temporary_dir = tempfile.TemporaryDirectory(prefix="lr1-tests-")
+        cls.test_storage_dir = Path(cls.temporary_dir.name)
 
         # Redirect STORAGE_FILE paths for all entities to temporary files
         cls.original_student_file = Student.STORAGE_FILE
         cls.original_exam_file = Exam.STORAGE_FILE
         cls.original_educational_material_file = Material.STORAGE_FILE_EDUCATIONAL
         cls.original_simple_topic_file = Material.STORAGE_FILE_TOPICS
+        cls.original_attempts_file = AttemptLog.STORAGE_FILE
         # cls.original_additional_classes_file = AdditionalClasses.STORAGE_FILE # If AdditionalClasses had a storage file
 
         Student.STORAGE_FILE = cls.test_storage_dir / "test_students.json"
         Exam.STORAGE_FILE = cls.test_storage_dir / "test_exams.json"
         Material.STORAGE_FILE_EDUCATIONAL = cls.test_storage_dir / "test_educational_materials.json"
         Material.STORAGE_FILE_TOPICS = cls.test_storage_dir / "test_materials.json"
+        AttemptLog.STORAGE_FILE = cls.test_storage_dir / "test_attempts.jsonl"
 
     @classmethod
     def tearDownClass(cls):
@@ -38,12 +71,10 @@ class TestEntities(unittest.TestCase):
         Exam.STORAGE_FILE = cls.original_exam_file
         Material.STORAGE_FILE_EDUCATIONAL = cls.original_educational_material_file
         Material.STORAGE_FILE_TOPICS = cls.original_simple_topic_file
+        AttemptLog.STORAGE_FILE = cls.original_attempts_file
 
         # Clean up temporary test storage directory
-        for f in cls.test_storage_dir.iterdir():
-            if f.is_file():
-                f.unlink()
-        cls.test_storage_dir.rmdir()
+        cls.temporary_dir.cleanup()
 
     def setUp(self):
         for path in [
@@ -57,6 +88,12 @@ class TestEntities(unittest.TestCase):
             # Create empty JSON files
             with open(path, 'w', encoding='utf-8') as f:
                 json.dump({}, f)
+        for path in [AttemptLog.STORAGE_FILE, Path(str(AttemptLog.STORAGE_FILE) + ROLLUPS_SUFFIX),
+                     Path(search_index.path)]:
+            if path.exists():
+                path.unlink()
+        attempt_log.invalidate()
+        search_index.invalidate()
 
     # --- Test for Student class ---
     def test_student_init(self):
@@ -219,5 +256,731 @@ class TestEntities(unittest.TestCase):
             self.assertEqual(mock_student.readiness, 0)  # Readiness should not change
             mock_print.assert_any_call("Материал не найден в educational_materials.json.")
 
+    # --- Test for store cache ---
+    def test_store_cache_reuses_parsed_document(self):
+        Student("123", "Doe", "John").save()
+        store_cache.reset_stats()
+        Student.load("123")
+        Student.load("123")
+        self.assertEqual(store_cache.hits, 2)
+        self.assertEqual(store_cache.misses, 0)
+
+        # Изменение файла в обход сущностей должно приводить к перечитыванию
+        with open(Student.STORAGE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({"456": {"id": "456", "last_name": "Roe", "first_name": "Jane"}}, f)
+        self.assertIsNone(Student.load("123"))
+        self.assertEqual(Student.load("456").first_name, "Jane")
+        self.assertEqual(store_cache.misses, 1)
+
+    def test_store_cache_isolates_unsaved_changes(self):
+        Student("123", "Doe", "John").save()
+        student = Student.load("123")
+        student.exam_result["Math"] = "1/1"
+        self.assertEqual(Student.load("123").exam_result, {})
+
+    # --- Test for journal storage mode ---
+    def test_journal_mode_appends_instead_of_rewriting(self):
+        set_storage_mode("journal")
+        try:
+            snapshot_before = Student.STORAGE_FILE.read_text(encoding='utf-8')
+            Student("123", "Doe", "John").save()
+            Student("456", "Roe", "Jane").save()
+            self.assertTrue(Student.delete_student("456"))
+
+            self.assertEqual(Student.STORAGE_FILE.read_text(encoding='utf-8'), snapshot_before)
+            journal_file = Path(str(Student.STORAGE_FILE) + ".journal")
+            self.assertEqual(len(journal_file.read_text(encoding='utf-8').splitlines()), 3)
+            self.assertEqual(Student.load("123").first_name, "John")
+            self.assertIsNone(Student.load("456"))
+            self.assertFalse(Student.delete_student("456"))
+
+            journal_store.compact(Student.STORAGE_FILE)
+            self.assertFalse(journal_file.exists())
+            with open(Student.STORAGE_FILE, 'r', encoding='utf-8') as f:
+                self.assertEqual(list(json.load(f)), ["123"])
+            self.assertEqual(Student.load("123").last_name, "Doe")
+        finally:
+            set_storage_mode("json")
+
+    # --- Test for SQLite repository ---
+    def test_sqlite_repository_round_trip_and_migration(self):
+        Student("123", "Doe", "John", {"Math": "1/2"}, [{"name": "Algebra"}], 30).save()
+        Exam("Physics", [("Light", "What is c?", "speed of light")]).save()
+        Material(topic="Calculus", title="Calculus 101", author="Author B", is_simple_topic=False).save()
+        Material(topic="Biology", is_simple_topic=True).save()
+
+        repository = SQLiteRepository(self.test_storage_dir / "test_lr1.db")
+        counts = migrate(JsonRepository(), repository)
+        self.assertEqual(counts, {"students": 1, "exams": 1, "educational_materials": 1, "materials": 1})
+
+        previous = set_repository(repository)
+        try:
+            loaded = Student.load("123")
+            self.assertEqual(loaded.exam_result, {"Math": "1/2"})
+            self.assertEqual(loaded.materials, [{"name": "Algebra"}])
+            self.assertEqual(loaded.readiness, 30)
+            self.assertEqual(Exam.load("Physics").questions, [("Light", "What is c?", "speed of light")])
+            self.assertEqual(Material.load_educational_material("Calculus").title, "Calculus 101")
+            self.assertIsNotNone(Material.load_simple_topic("Biology"))
+
+            loaded.readiness = 40
+            loaded.save()
+            self.assertEqual(Student.load("123").readiness, 40)
+            self.assertTrue(Material.delete_educational_material("Calculus"))
+            self.assertIsNone(Material.load_educational_material("Calculus"))
+            self.assertTrue(Student.delete_student("123"))
+            self.assertFalse(Student.delete_student("123"))
+        finally:
+            set_repository(previous)
+            repository.close()
+
+        # Версии в сохранённом индексе поиска действительны и после перезапуска с новым соединением
+        index_path = self.test_storage_dir / "sqlite-search.index"
+        for query, change in (("light", ("Quanta", "What is h?", "Planck constant")), ("planck", None)):
+            repository = SQLiteRepository(self.test_storage_dir / "test_lr1.db")
+            previous = set_repository(repository)
+            try:
+                self.assertEqual([hit.key for hit in SearchIndex(index_path).search(query)], ["Physics"])
+            finally:
+                set_repository(previous)
+                repository.close()
+            if change is not None:
+                other = SQLiteRepository(self.test_storage_dir / "test_lr1.db")
+                other.put(EXAMS, "Physics", {"subject": "Physics", "questions": [list(change)]})
+                other.close()
+
+    # --- Test for topic index ---
+    def test_topic_index_lookups(self):
+        Material(topic="Производные", title="Матанализ", author="Фихтенгольц", is_simple_topic=False).save()
+        Material(topic="Производственный менеджмент", title="Менеджмент", author="Автор", is_simple_topic=False).save()
+        Material(topic="Графы", title="Теория графов", author="Харари", is_simple_topic=False).save()
+
+        self.assertEqual(Material.load_educational_material("Графы").author, "Харари")
+        self.assertEqual([m.topic for m in Material.find_educational_materials("ГРАФЫ")], ["Графы"])
+        self.assertEqual([m.topic for m in Material.find_educational_materials("произв", prefix=True)],
+                         ["Производные", "Производственный менеджмент"])
+        self.assertTrue(Path(str(Material.STORAGE_FILE_EDUCATIONAL) + ".topics").exists())
+
+        self.assertTrue(Material.delete_educational_material("Производные"))
+        self.assertEqual([m.topic for m in Material.find_educational_materials("произв", prefix=True)],
+                         ["Производственный менеджмент"])
+        self.assertIsNone(Material.load_educational_material("Производные"))
+
+        # Вторая запись с той же темой находится и после удаления первой
+        repository = get_repository()
+        first_key, _ = repository.find_by(EDUCATIONAL_MATERIALS, "topic", "Графы")
+        repository.put(EDUCATIONAL_MATERIALS, "графы-2",
+                       {"topic": "Графы", "title": "Графы и сети", "author": "Оре", "subject": ""})
+        self.assertEqual(len(repository.find_all_by(EDUCATIONAL_MATERIALS, "topic", "Графы")), 2)
+        self.assertTrue(repository.delete(EDUCATIONAL_MATERIALS, first_key))
+        self.assertEqual(repository.find_by(EDUCATIONAL_MATERIALS, "topic", "Графы")[0], "графы-2")
+        self.assertEqual(Material.load_educational_material("Графы").author, "Оре")
+
+    # --- Test for unit of work ---
+    def test_unit_of_work_skips_clean_and_coalesces_writes(self):
+        Student("123", "Doe", "John").save()
+        student = Student.load("123")
+        self.assertEqual(student.dirty_fields(), [])
+
+        unit_of_work = UnitOfWork()
+        unit_of_work.register(student)
+        unit_of_work.complete_operation()
+        self.assertEqual(unit_of_work.writes, 0)
+        student.readiness = 10
+        self.assertEqual(student.dirty_fields(), ["readiness"])
+        unit_of_work.complete_operation()
+        self.assertEqual((unit_of_work.writes, unit_of_work.writes_avoided), (1, 1))
+        self.assertEqual(Student.load("123").readiness, 10)
+
+        coalescing = UnitOfWork(coalesce=True)
+        coalescing.register(student)
+        student.readiness = 20
+        coalescing.complete_operation()
+        student.materials.append({"name": "Algebra"})
+        coalescing.complete_operation()
+        self.assertEqual(Student.load("123").readiness, 10)
+        coalescing.close()
+        self.assertEqual((coalescing.writes, coalescing.writes_avoided), (1, 1))
+        self.assertEqual(Student.load("123").materials, [{"name": "Algebra"}])
+
+    # --- Test for multi-session server ---
+    def test_console_server_runs_concurrent_sessions(self):
+        Student("123", "Doe", "John").save()
+        Student("456", "Roe", "Jane").save()
+
+        async def run_session(port, student_id):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"1\n{student_id}\n5\n15\n0\n0\n".encode("utf-8"))
+            await writer.drain()
+            output = (await reader.read()).decode("utf-8")
+            writer.close()
+            return output
+
+        async def scenario():
+            server = ConsoleServer(max_sessions=4)
+            listener = await server.start("127.0.0.1", 0)
+            port = listener.sockets[0].getsockname()[1]
+            try:
+                return await asyncio.gather(run_session(port, "123"), run_session(port, "456"))
+            finally:
+                await server.close()
+
+        first, second = asyncio.run(scenario())
+        self.assertIn("Добро пожаловать, John Doe!", first)
+        self.assertIn("Добро пожаловать, Jane Roe!", second)
+        self.assertEqual(Student.load("123").planned_study_time_minutes, 15)
+        self.assertEqual(Student.load("456").planned_study_time_minutes, 15)
+
+    # --- Test for batch grading ---
+    def test_grade_cohort_updates_all_students_in_one_write(self):
+        Exam("Math", [("Equations", "2x=4", "2"), ("Derivatives", "(x^2)'", "2x")]).save()
+        Student("123", "Doe", "John").save()
+        Student("456", "Roe", "Jane", readiness=90).save()
+        answers_file = self.test_storage_dir / "test_answers.csv"
+        answers_file.write_text("student_id,q1,q2\n123, 2 ,2X\n456,3,2x\n999,2,2x\n,1,1\n", encoding="utf-8")
+
+        with patch('entities.storage.store_cache.store', wraps=store_cache.store) as mock_store:
+            report = grade_cohort("Math", answers_file)
+            self.assertEqual(mock_store.call_count, 1)
+
+        self.assertEqual(report.scores, {"123": 2, "456": 1})
+        self.assertEqual(report.unknown_students, ["999"])
+        self.assertEqual(report.invalid_rows, [5])
+        john, jane = Student.load("123"), Student.load("456")
+        self.assertEqual((john.exam_result, john.readiness), ({"Math": "2/2"}, 40))
+        self.assertEqual((jane.exam_result, jane.readiness), ({"Math": "1/2"}, 100))
+
+        # Запись, которую другой сеанс меняет во время проверки, не теряет ни одно из изменений
+        changing = threading.Event()
+
+        def other_session(record):
+            changing.set()
+            time.sleep(0.1)
+            return dict(record, planned_study_time_minutes=45)
+
+        session = threading.Thread(target=get_repository().update, args=(Student.COLLECTION, "123", other_session))
+        session.start()
+        changing.wait()
+        grade_cohort("Math", answers_file)
+        session.join()
+        john = Student.load("123")
+        self.assertEqual((john.readiness, john.planned_study_time_minutes), (80, 45))
+
+    # --- Test for cohort analytics ---
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy не установлен")
+    def test_cohort_analytics_report_is_cached_until_students_change(self):
+        Student("1", "A", "A", {"Math": "1/2", "Physics": "2/2"}, readiness=40, planned_study_time_minutes=30).save()
+        Student("2", "B", "B", {"Math": "2/2"}, readiness=80, planned_study_time_minutes=90).save()
+        analytics = CohortAnalytics()
+
+        report = analytics.report()
+        self.assertEqual(report["students"], 2)
+        self.assertAlmostEqual(report["readiness"]["mean"], 60.0)
+        self.assertEqual(report["subjects"]["Math"], {"attempts": 2, "mean_score": 0.75, "pass_rate": 1.0})
+        self.assertAlmostEqual(report["correlations"]["readiness_planned_minutes"], 1.0)
+        self.assertIs(analytics.report(), report)
+
+        Student("3", "C", "C", {"Math": "0/2"}).save()
+        self.assertEqual(analytics.report()["subjects"]["Math"]["attempts"], 3)
+        self.assertEqual(analytics.recomputations, 2)
+
+    def test_offset_index_reads_single_student_without_full_load(self):
+        Student("123", "Doe", "John").save()
+        Student("456", "Roe", "Jane").save()
+        self.assertTrue(Path(str(Student.STORAGE_FILE) + OFFSETS_SUFFIX).exists())
+        store_cache.invalidate()
+        store_cache.reset_stats()
+        self.assertEqual(Student.load("456").first_name, "Jane")
+        self.assertIsNone(Student.load("789"))
+        self.assertEqual(store_cache.slice_reads, 2)
+        self.assertEqual(store_cache.misses, 0)
+
+        # Файл, подменённый между поиском в индексе и чтением среза, не сбивает чтение записи
+        def lookup_then_replace(*args):
+            location = lookup_offset(*args)
+            replacement = self.test_storage_dir / "test_students.replacement"
+            replacement.write_text('{"000": ' + " " * 200 + '{}}', encoding="utf-8")
+            os.replace(replacement, Student.STORAGE_FILE)
+            return location
+
+        store_cache.invalidate()
+        with patch("entities.store_cache.lookup_offset", side_effect=lookup_then_replace):
+            self.assertEqual(Student.load("456").first_name, "Jane")
+
+    # --- Test for storage benchmark ---
+    def test_storage_benchmark_reports_latencies(self):
+        output = self.test_storage_dir / "test_benchmark.json"
+        report = storage_benchmark.main(["--scales", "1k", "--operations", "5", "--in-process",
+                                         "--output", str(output)])
+        self.assertEqual(json.loads(output.read_text(encoding='utf-8')), report)
+        operations = report["scales"]["1k"]["operations"]
+        self.assertEqual(set(operations), {"student_load", "student_save", "student_delete", "exam_load_all",
+                                           "exam_save", "material_load_educational", "console_session"})
+        self.assertEqual(operations["student_load"]["ops"], 5)
+        self.assertLessEqual(operations["student_load"]["p50_ms"], operations["student_load"]["p99_ms"])
+        # Замер не должен затрагивать файлы хранилища тестов
+        self.assertEqual(Student.STORAGE_FILE, self.test_storage_dir / "test_students.json")
+
+    # --- Test for profiling ---
+    def test_profiler_records_menu_actions_and_storage_calls(self):
+        Student("123", "Doe", "John").save()
+        store_cache.invalidate()
+        profiler.enable(self.test_storage_dir / "test_profile.json")
+        try:
+            with use_channel(ScriptedChannel(["1", "123", "5", "30", "0", "0"], keep_output=False)):
+                Console().start()
+            path = profiler.dump()
+        finally:
+            profiler.disable()
+            profiler.clear()
+        document = json.loads(path.read_text(encoding='utf-8'))
+        actions = {action["action"]: action for action in document["actions"]}
+        self.assertEqual(actions["InitialState:1"]["calls"]["Student.load"]["count"], 1)
+        self.assertGreater(actions["InitialState:1"]["bytes_read"], 0)
+        self.assertEqual(actions["StudentState:5"]["calls"]["Student.save"]["count"], 1)
+        self.assertGreater(actions["StudentState:5"]["bytes_written"], 0)
+        # Итоги сеанса включают вложенные действия меню
+        self.assertEqual(actions["session"]["calls"]["Student.save"]["count"], 1)
+        self.assertEqual(document["summary"]["StudentState:5"]["count"], 1)
+
+    # --- Test for transcript replay ---
+    def test_replay_runs_transcripts_concurrently_and_counts_lost_updates(self):
+        Student("123", "Doe", "John").save()
+        Student("456", "Roe", "Jane").save()
+        transcript = self.test_storage_dir / "test_transcript.txt"
+        transcript.write_text("# вход и план\n1\n123\n5\n30\n0\n0\n", encoding='utf-8')
+        transcripts = [replay.read_transcript(transcript), ["1", "456", "5", "15", "0", "0"]]
+        report = replay.replay(transcripts, sessions=4, workers=2)
+        self.assertEqual(report["sessions"], 4)
+        self.assertEqual(report["actions"], 24)
+        self.assertEqual(report["errors"], 0)
+        # Потерянные обновления — разница между добавленными и сохранёнными минутами
+        expected_total = 60 + 30
+        actual_total = Student.load("123").planned_study_time_minutes + Student.load("456").planned_study_time_minutes
+        self.assertEqual(report["lost_minutes"], expected_total - actual_total)
+
+    # --- Test for recommendations ---
+    def test_recommendations_rank_weak_subject_materials_and_rebuild_incrementally(self):
+        Exam("Math", [["Algebra", "2+2?", "4"], ["Algebra", "3+3?", "6"], ["Geometry", "Углов у квадрата?", "4"]]).save()
+        Exam("Physics", [["Optics", "Скорость света?", "c"]]).save()
+        Material(topic="Algebra", title="Algebra Book", author="A", subject="Math").save()
+        Material(topic="Geometry", title="Geometry Book", author="B").save()
+        Material(topic="Optics", title="Optics Book", author="C").save()
+        student = Student("123", "Doe", "John", exam_result={"Math": "0/3", "Physics": "1/1"}, readiness=20)
+
+        index = RecommendationIndex()
+        recommendations = index.recommend(student)
+        self.assertEqual([r.material.topic for r in recommendations], ["Algebra", "Geometry"])
+        self.assertAlmostEqual(recommendations[0].expected_gain, 6.67)
+        self.assertEqual(recommendations[0].subject, "Math")
+        self.assertEqual(index.rebuilt_subjects, 2)
+
+        # Изученный материал не рекомендуется; изменение материала пересчитывает только его предмет
+        student.materials.append(Material(topic="Algebra", title="Algebra Book", author="A").to_dict())
+        Material(topic="Optics", title="Optics Book 2", author="C").save()
+        self.assertEqual([r.material.topic for r in index.recommend(student)], ["Geometry"])
+        self.assertEqual(index.rebuilt_subjects, 3)
+
+        # Сохранения и удаления через Exam и Material обновляют общий индекс без перечитывания коллекций
+        recommendation_index.recommend(student)
+        full_reads = recommendation_index.full_reads
+        Material(topic="Geometry", title="Geometry Book 2", author="B", subject="Math").save()
+        self.assertEqual([r.material.title for r in recommendation_index.recommend(student)], ["Geometry Book 2"])
+        self.assertTrue(Exam.delete_exam("Math"))
+        self.assertEqual(recommendation_index.recommend(student), [])
+        self.assertEqual(recommendation_index.full_reads, full_reads)
+
+        # Запись другой сессии сразу после сохранения не теряется: индекс принимает версию самой записи
+        def foreign_write(*args):
+            get_repository().put(EDUCATIONAL_MATERIALS, "Trigonometry", {"topic": "Trigonometry",
+                                                                         "title": "Trig Book", "subject": "Math"})
+        Exam("Math", [["Algebra", "2+2?", "4"]]).save()
+        with patch.object(search_index, 'record_changed', side_effect=foreign_write):
+            Material(topic="Calculus", title="Calculus Book", author="D", subject="Math").save()
+        self.assertEqual({r.material.title for r in recommendation_index.recommend(student)},
+                         {"Geometry Book 2", "Calculus Book", "Trig Book"})
+
+    # --- Test for sharded exams ---
+    def test_exams_are_sharded_with_manifest(self):
+        # Запись старого формата в основном файле читается и переносится в шард при изменении
+        with open(Exam.STORAGE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({"History": {"subject": "History", "questions": [["Rome", "Founded?", "753"]]}}, f)
+        self.assertEqual(Exam.load("History").questions, [("Rome", "Founded?", "753")])
+        Exam("Math", [["Algebra", "2+2?", "4"], ["Algebra", "3+3?", "6"]]).save()
+
+        manifest = json.loads(Exam.STORAGE_FILE.read_text(encoding='utf-8'))
+        self.assertEqual(manifest["Math"]["questions"], 2)
+        self.assertIn("shard", manifest["History"])
+        self.assertEqual(Exam.list_subjects(), ["History", "Math"])
+        with patch('entities.shards.store_cache.load', wraps=store_cache.load) as mock_load:
+            self.assertEqual(len(Exam.load("Math").questions), 2)
+            loaded_files = [Path(call.args[0]).name for call in mock_load.call_args_list]
+        # Читаются только манифест и шард нужного предмета
+        self.assertEqual(loaded_files, [Exam.STORAGE_FILE.name, manifest["Math"]["shard"]])
+
+        self.assertTrue(Exam.delete_exam("Math"))
+        self.assertIsNone(get_repository().get(Exam.COLLECTION, "Math"))
+        self.assertEqual(list(Exam.load_all()), ["History"])
+
+    # --- Test for binary snapshots ---
+    def test_snapshot_replaces_json_parse_until_file_changes(self):
+        store_cache.write_snapshots = True
+        try:
+            Student("123", "Doe", "John").save()
+        finally:
+            store_cache.write_snapshots = False
+        self.assertTrue(Path(snapshot_path(Student.STORAGE_FILE)).exists())
+        store_cache.invalidate()
+        store_cache.reset_stats()
+        self.assertEqual(get_repository().all(Student.COLLECTION)["123"]["first_name"], "John")
+        self.assertEqual(store_cache.snapshot_reads, 1)
+
+        # Устаревший снимок не используется: данные читаются из JSON
+        data = json.loads(Student.STORAGE_FILE.read_text(encoding='utf-8'))
+        data["123"]["first_name"] = "Johnny"
+        Student.STORAGE_FILE.write_text(json.dumps(data, indent=4), encoding='utf-8')
+        store_cache.invalidate()
+        self.assertEqual(Student.load("123").first_name, "Johnny")
+        self.assertEqual(store_cache.snapshot_reads, 1)
+
+        # Преобразование в обе стороны: to-json не затирает изменённый после снимка JSON
+        self.assertEqual(snapshots_to_json(self.test_storage_dir), ([], [Student.STORAGE_FILE]))
+        self.assertIn(Student.STORAGE_FILE, json_to_snapshots(self.test_storage_dir))
+        Student.STORAGE_FILE.unlink()
+        self.assertIn(Student.STORAGE_FILE, snapshots_to_json(self.test_storage_dir)[0])
+        store_cache.invalidate()
+        self.assertEqual(Student.load("123").first_name, "Johnny")
+
+        # Одиночная запись снимка ищется по упорядоченным ключам
+        with SnapshotReader(str(Student.STORAGE_FILE), None) as reader:
+            self.assertEqual(reader.get("123")["first_name"], "Johnny")
+            self.assertIsNone(reader.get("124"))
+
+    # --- Test for reference-based student materials ---
+    def test_student_materials_are_stored_as_catalog_references(self):
+        Material(topic="Графы", title="Теория графов", author="Оре").save()
+        student = Student("123", "Doe", "John", materials=[{"name": "Algebra"}])
+        student.materials.append(Material.load_educational_material("Графы").to_dict())
+        student.materials.append({"topic": "Вне каталога", "title": "Конспект"})
+        student.save()
+
+        record = json.loads(Student.STORAGE_FILE.read_text(encoding='utf-8'))["123"]
+        self.assertEqual(record["materials"], ["t:Algebra", "m:Графы", {"topic": "Вне каталога", "title": "Конспект"}])
+        first_edition = {"topic": "Графы", "title": "Теория графов", "author": "Оре"}
+        self.assertIn(first_edition, Student.load("123").materials)
+
+        # Изменение записи каталога не меняет изученное: ссылка заменяется прежней записью
+        Material(topic="Графы", title="Теория графов, 2-е изд.", author="Оре").save()
+        record = json.loads(Student.STORAGE_FILE.read_text(encoding='utf-8'))["123"]
+        self.assertEqual(record["materials"][1], first_edition)
+        loaded = Student.load("123")
+        self.assertEqual(loaded.materials[1]["title"], "Теория графов")
+        self.assertIn(first_edition, loaded.materials)
+        self.assertNotIn(Material.load_educational_material("Графы").to_dict(), loaded.materials)
+        self.assertIn({"name": "Algebra"}, loaded.materials)
+        self.assertNotIn({"name": "Графы"}, loaded.materials)
+        del loaded.materials[0]
+        self.assertNotIn({"name": "Algebra"}, loaded.materials)
+        self.assertEqual(loaded.materials.literature_topics(), {"Графы", "Вне каталога"})
+
+        # Ссылка ведёт на запись по ключу, даже если тема записи в каталоге повторяется
+        get_repository().put(EDUCATIONAL_MATERIALS, "Графы (задачник)",
+                             {"topic": "Графы", "title": "Задачи по теории графов", "author": "Харари"})
+        loaded.materials.append(Material.load_educational_material("Графы").to_dict())
+        loaded.materials.append({"topic": "Графы", "title": "Задачи по теории графов", "author": "Харари"})
+        loaded.save()
+        record = json.loads(Student.STORAGE_FILE.read_text(encoding='utf-8'))["123"]
+        self.assertEqual(record["materials"][-2:], ["m:Графы", "m:Графы (задачник)"])
+        self.assertEqual([m["title"] for m in Student.load("123").materials[-2:]],
+                         ["Теория графов, 2-е изд.", "Задачи по теории графов"])
+
+        # После удаления из каталога литература остаётся в записи студента целиком
+        self.assertTrue(Material.delete_educational_material("Графы"))
+        record = json.loads(Student.STORAGE_FILE.read_text(encoding='utf-8'))["123"]
+        self.assertEqual(record["materials"][-2], {"topic": "Графы", "title": "Теория графов, 2-е изд.", "author": "Оре"})
+        self.assertEqual(record["materials"][-1], "m:Графы (задачник)")
+        self.assertEqual(Student.load("123").materials[-2]["title"], "Теория графов, 2-е изд.")
+
+    # --- Test for exam attempt history ---
+    @patch('builtins.input', side_effect=['Math', '4', '5', 'Math', '4', '6'])
+    def test_attempt_log_keeps_history_and_rollups(self, mock_input):
+        Exam("Math", [["Algebra", "2+2?", "4"], ["Algebra", "3+3?", "6"]]).save()
+        student = Student("123", "Doe", "John")
+        with patch('builtins.print'):
+            student.take_mock_exam()
+            student.take_mock_exam()
+        self.assertEqual(student.exam_result["Math"], "2/2")
+        self.assertEqual([entry["correct"] for entry in attempt_log.history("123")], [[1, 0], [1, 1]])
+        rollup = attempt_log.rollup("123", "Math")
+        self.assertEqual((rollup["attempts"], rollup["best"], rollup["last_result"]), (2, 1.0, "2/2"))
+        self.assertAlmostEqual(rollup["average"], 0.75)
+
+        # Сводки восстанавливаются из контрольной точки и хвоста журнала, без повторного чтения всего журнала
+        attempt_log.checkpoint()
+        attempt_log.record("123", "Math", [False, False])
+        restarted = AttemptLog(AttemptLog.STORAGE_FILE)
+        with patch.object(AttemptLog, '_replay', wraps=restarted._replay) as mock_replay:
+            rollup = restarted.rollup("123", "Math")
+        self.assertEqual((rollup["attempts"], rollup["best"], rollup["last"]), (3, 1.0, 0.0))
+        self.assertEqual(mock_replay.call_count, 1)
+
+    # --- Test for bulk import/export ---
+    def test_bulk_import_validates_in_pool_and_writes_once(self):
+        Student("123", "Doe", "John").save()
+        roster = self.test_storage_dir / "test_roster.csv"
+        roster.write_text("id,last_name,first_name,readiness\n"
+                          "200,Roe,Jane,40\n123,Doe,John,\n201,,Max,\n200,Roe,Jane,\n202,Poe,Ed,\n", encoding='utf-8')
+        with patch('entities.bulk.PARALLEL_MIN_ROWS', 1):
+            report = import_file("students", roster, workers=2)
+        self.assertEqual(report.errors, [(3, "«123» уже существует"), (4, "поле «Фамилия» не может быть пустым"),
+                                         (5, "«200» повторяет строку 2")])
+        self.assertEqual(report.imported, 0)
+        self.assertIsNone(Student.load("200"))
+
+        with patch.object(get_repository(), 'put_many', wraps=get_repository().put_many) as mock_put_many:
+            report = import_file("students", roster, workers=1, skip_invalid=True)
+        self.assertEqual(report.imported, 2)
+        self.assertEqual(mock_put_many.call_count, 1)
+        self.assertEqual(Student.load("200").readiness, 40)
+
+        exams = self.test_storage_dir / "test_exams.csv"
+        exams.write_text("subject,topic,question,answer\nMath,Algebra,2+2?,4\nMath,Algebra,3+3?,6\n", encoding='utf-8')
+        self.assertEqual(import_file("exams", exams).imported, 1)
+        self.assertEqual(len(Exam.load("Math").questions), 2)
+
+        exported = self.test_storage_dir / "test_students.jsonl"
+        self.assertEqual(export_file("students", exported), 3)
+        Student.delete_student("200")
+        report = import_file("students", exported, skip_invalid=True)
+        self.assertEqual(report.imported, 1)
+        self.assertEqual(Student.load("200").last_name, "Roe")
+
+    # --- Test for paged catalog listings ---
+    def test_catalog_listing_pages_with_cursor_and_filter(self):
+        get_repository().put_many(Material.COLLECTION_TOPICS,
+                                  [(f"Тема {i:02d}", {"name": f"Тема {i:02d}"}) for i in range(25)])
+        Material(topic="Тригонометрия", is_simple_topic=True).save()
+        Student("123", "Doe", "John").save()
+        listing = CatalogListing(Material.COLLECTION_TOPICS, lambda key, record: record["name"])
+        page, cursor = listing.page(size=10)
+        self.assertEqual([label for label, _, _ in page][:2], ["Тема 00", "Тема 01"])
+        self.assertEqual(listing.page(cursor=cursor, size=10)[0][0][0], "Тема 10")
+        # Сначала совпадения по началу названия, затем по части названия
+        page, cursor = listing.page("т", size=30)
+        self.assertEqual((len(page), cursor), (26, None))
+        self.assertEqual([label for label, _, _ in listing.page("ема 2")[0]], [f"Тема {i}" for i in range(20, 25)])
+        self.assertEqual(listing.rebuilds, 1)
+
+        channel = ScriptedChannel(["1", "123", "3", ">", "/триг", "Тригонометрия", "0", "0"])
+        with use_channel(channel):
+            Console().start()
+        self.assertIn("1. Тема 00\n", channel.output)
+        self.assertIn("11. Тема 10\n", channel.output)
+        self.assertNotIn("21. Тема 20\n", channel.output)
+        self.assertIn("1. Тригонометрия\n", channel.output)
+        self.assertIn({"name": "Тригонометрия"}, Student.load("123").materials)
+
+    def test_concurrent_student_saves_merge_instead_of_losing_updates(self):
+        Student("123", "Doe", "John", planned_study_time_minutes=10).save()
+        first, second = Student.load("123"), Student.load("123")
+        first.planned_study_time_minutes += 30
+        first.readiness = 40
+        second.planned_study_time_minutes += 5
+        second.exam_result["Математика"] = "2/3"
+        conflicts = Student.save_conflicts
+        first.save()
+        second.save()
+        self.assertEqual(Student.save_conflicts, conflicts + 1)
+        stored = Student.load("123")
+        self.assertEqual((stored.planned_study_time_minutes, stored.readiness), (45, 40))
+        self.assertEqual(stored.exam_result, {"Математика": "2/3"})
+        self.assertEqual(second.planned_study_time_minutes, 45)  # объект получил итоговую запись
+
+        def plan_minutes():
+            for _ in range(10):
+                student = Student.load("123")
+                student.planned_study_time_minutes += 1
+                student.save()
+
+        threads = [threading.Thread(target=plan_minutes) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(Student.load("123").planned_study_time_minutes, 125)
+        self.assertTrue(os.path.exists(os.path.abspath(Student.STORAGE_FILE) + LOCK_SUFFIX))
+
+    def test_search_ranks_questions_and_materials_and_updates_incrementally(self):
+        Exam("Математика", [("Производные", "Найдите производную функции x^2", "2x"),
+                            ("Интегралы", "Вычислите интеграл от 2x", "x^2")]).save()
+        Material("Ёмкость конденсатора", "Электростатика", "Иванов").save()
+        hits = search_index.search("ПРОИЗВОДН")
+        self.assertEqual([(hit.key, hit.position) for hit in hits], [("Математика", 0)])
+        self.assertEqual(hits[0].question, ["Производные", "Найдите производную функции x^2", "2x"])
+        self.assertEqual(search_index.search("емкость")[0].record["title"], "Электростатика")
+        # В меню студента правильные ответы не участвуют в поиске
+        self.assertEqual({hit.position for hit in search_index.search("2x")}, {0, 1})
+        self.assertEqual([hit.position for hit in search_index.search("2x", include_answers=False)], [1])
+
+        tokenized = search_index.tokenized_records
+        Exam("Физика", [("Механика", "Сформулируйте второй закон Ньютона", "F=ma")]).save()
+        self.assertEqual(search_index.search("ньютона")[0].key, "Физика")
+        self.assertEqual(search_index.tokenized_records, tokenized + 1)
+        Exam.delete_exam("Физика")
+        self.assertEqual(search_index.search("ньютона"), [])
+
+        # Запись другой сессии сразу после сохранения не теряется: индекс принимает версию самой записи
+        repository = get_repository()
+        update_versioned = repository.update_versioned
+
+        def write_then_foreign(*args):
+            result = update_versioned(*args)
+            repository.put(EXAMS, "Химия", {"subject": "Химия",
+                                            "questions": [["Реакции", "Что ускоряет катализатор?", "реакцию"]]})
+            return result
+        with patch.object(repository, 'update_versioned', side_effect=write_then_foreign):
+            Exam("Биология", [("Клетка", "Из чего состоит клетка?", "органеллы")]).save()
+        self.assertEqual(search_index.search("катализатор")[0].key, "Химия")
+
+        # Сохранённый индекс читается без повторного разбора записей
+        search_index.checkpoint()
+        reloaded = SearchIndex()
+        self.assertEqual(reloaded.search("интеграл")[0].position, 1)
+        self.assertEqual(reloaded.tokenized_records, 0)
+
+        channel = ScriptedChannel(["2", "4", "конденсатора", "0", "0"])
+        with use_channel(channel):
+            Console().start()
+        self.assertIn("1. Ёмкость конденсатора (Название: Электростатика, Автор: Иванов)\n", channel.output)
+
+    def test_leaderboard_ranks_students_and_updates_on_save(self):
+        get_repository().put_many(Student.COLLECTION, [
+            (str(i), Student(str(i), f"Фамилия{i}", "Имя", {"Математика": f"{i % 3}/2"}, readiness=i * 10).to_dict())
+            for i in range(1, 8)])
+        self.assertEqual([standing.student_id for standing in leaderboard.top(3)], ["7", "6", "5"])
+        self.assertEqual([standing.student_id for standing in leaderboard.bottom(2)], ["1", "2"])
+        self.assertEqual(leaderboard.rank("4").rank, 4)
+        rebuilds = leaderboard.rebuilds
+
+        student = Student.load("2")
+        student.readiness = 60  # та же готовность, что у «6», но результат экзаменов лучше (2/2 против 0/2)
+        student.save()
+        self.assertEqual((leaderboard.rank("2").rank, leaderboard.rank("6").rank), (2, 3))
+        self.assertTrue(Student.delete_student("7"))
+        self.assertEqual([standing.student_id for standing in leaderboard.top(2)], ["2", "6"])
+        self.assertIsNone(leaderboard.rank("7"))
+        self.assertEqual(leaderboard.rebuilds, rebuilds)  # без перечитывания всех студентов
+
+        # Изменение, опоздавшее относительно рейтинга, не пропадает: рейтинг перестраивается
+        leaderboard.record_changed("5", None, "устаревшая версия", "новая версия")
+        self.assertEqual(leaderboard.rank("5").rank, 3)
+        self.assertEqual(leaderboard.rebuilds, rebuilds + 1)
+
+        channel = ScriptedChannel(["2", "5", "5", "0", "0"])
+        with use_channel(channel):
+            Console().start()
+        self.assertIn("1. Фамилия2 Имя (ID: 2) — готовность 60%, средний результат экзаменов 100.0%\n", channel.output)
+        self.assertIn("Фамилия5 Имя на 3 месте из 6.\n", channel.output)
+
+        # Одновременные сохранения из разных потоков попадают в рейтинг все
+        def raise_readiness(student_id):
+            student = Student.load(student_id)
+            student.readiness = 95
+            student.save()
+
+        threads = [threading.Thread(target=raise_readiness, args=(student_id,)) for student_id in ("1", "3", "4")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({standing.student_id for standing in leaderboard.top(3)}, {"1", "3", "4"})
+
+    # --- Test for compressed storage ---
+    def test_compressed_storage_is_detected_on_read(self):
+        compression_policy.configure("lzma:1", ["*students.json=zlib:9"])
+        try:
+            Student("123", "Doe", "John", readiness=40).save()
+            Material("Электростатика", "Основы", "Иванов", "Физика").save()
+        finally:
+            compression_policy.configure()
+        self.assertEqual(detect(Student.STORAGE_FILE.read_bytes()), "zlib")
+        self.assertEqual(detect(Material.STORAGE_FILE_EDUCATIONAL.read_bytes()), "lzma")
+        store_cache.invalidate()
+        store_cache.reset_stats()
+        self.assertEqual(Student.load("123").readiness, 40)
+        self.assertEqual(store_cache.slice_reads, 0)  # индекс смещений для сжатого файла не ведётся
+        self.assertEqual(Material.load_educational_material("Электростатика").author, "Иванов")
+
+        Student("456", "Roe", "Jane").save()  # без сжатия файл снова записывается обычным JSON
+        self.assertIsNone(detect(Student.STORAGE_FILE.read_bytes()))
+        self.assertEqual(json.loads(Student.STORAGE_FILE.read_text(encoding='utf-8'))["123"]["readiness"], 40)
+        with self.assertRaises(ValueError):
+            compression_policy.configure("gzip")
+
+    # --- Test for answer matching ---
+    def test_answer_matching_folds_spelling_and_tolerates_typos(self):
+        Exam("История", [["Города", "Крупнейший город США?", "Нью-Йорк | New York"],
+                         ["Даты", "Год окончания войны?", "1945"],
+                         ["Физика", "Кто открыл закон тяготения?", "Исаак Ньютон"],
+                         ["Математика", "Число пи до сотых?", "3,14"]]).save()
+        matcher = Exam.load("История").matcher()
+        self.assertIs(Exam.load("История").matcher(), matcher)  # скомпилировано один раз на предмет
+        self.assertEqual(matcher.correctness(["нью йорк", "1946", "исаак ньютан", "3.14"]), [True, False, True, True])
+        self.assertEqual(matcher.correctness(["NEW YORK.", " 1945 ", "ньютон"]), [True, True, False, False])
+        self.assertEqual(matcher.correctness(["Нью-Йорг", "945", "Исак Нютон", "314"]), [True, False, True, False])
+
+        channel = ScriptedChannel(["История", "НьюЙорк", "1944", "исаак ньютон", "3,14"])
+        student = Student("123", "Doe", "John")
+        with use_channel(channel):
+            student.take_mock_exam()
+        self.assertEqual(student.exam_result["История"], "3/4")
+        self.assertIn("Неверно. Правильный ответ: 1945\n", channel.output)
+
+        Exam("История", [["Даты", "Год окончания войны?", "1945 | 1945 год"]]).save()
+        self.assertEqual(Exam.load("История").matcher().correctness(["1945 год"]), [True])
+
+    # --- Test for shared catalog entities and compact students ---
+    def test_catalog_entities_are_shared_and_students_are_compact(self):
+        Exam("Math", [["Algebra", "2+2?", "4"]]).save()
+        Material("Графы", "Теория графов", "Оре", "Математика").save()
+        exam = Exam.load("Math")
+        self.assertIs(Exam.load("Math"), exam)
+        self.assertIs(Material.load_educational_material("Графы"), Material.load_educational_material("Графы"))
+        Exam("Math", exam.questions + [("Algebra", "3+3?", "6")]).save()
+        self.assertEqual(len(Exam.load("Math").questions), 2)  # изменённая запись — новый объект
+        self.assertEqual(len(exam.questions), 1)
+
+        # Общие объекты нельзя изменить на месте: изменение не попадёт к другим вызывающим
+        shared_exam, shared_material = Exam.load("Math"), Material.load_educational_material("Графы")
+        with self.assertRaises(TypeError):
+            shared_exam.questions.append(("Algebra", "4+4?", "8"))
+        with self.assertRaises(TypeError):
+            shared_exam.questions[0] = ("Algebra", "5+5?", "10")
+        with self.assertRaises(AttributeError):
+            shared_exam.subject = "Physics"
+        with self.assertRaises(AttributeError):
+            shared_material.title = "Другое название"
+        self.assertEqual((len(Exam.load("Math").questions), Exam.load("Math").subject), (2, "Math"))
+        self.assertEqual(Material.load_educational_material("Графы").title, "Теория графов")
+        new_exam = Exam("Math", shared_exam.questions)
+        new_exam.questions.append(("Algebra", "4+4?", "8"))  # новый объект изменяется как обычно
+        self.assertEqual(len(new_exam.questions), 3)
+
+        # Строки собираются заново для каждой записи, как после разбора JSON
+        get_repository().put_many(Student.COLLECTION, [
+            (student_id, Student(student_id, "Doe", "John", {"".join(["Мате", "матика"]): "".join(["1/", "2"])},
+                                 ["".join(["t:", "Графы"])]).to_dict())
+            for student_id in ("1", "2")])
+        first, second = Student.load("1"), Student.load("2")
+        self.assertIsNot(Student.load("1"), first)  # студенты изменяются в сеансе и не разделяются
+        self.assertFalse(hasattr(first, "__dict__"))
+        self.assertIs(first.exam_result["Математика"], second.exam_result["Математика"])
+        self.assertIs(first.materials.to_record()[0], second.materials.to_record()[0])
+        self.assertEqual(first.dirty_fields(), [])
+        first.exam_result["Математика"] = "2/2"
+        self.assertEqual(first.dirty_fields(), ["exam_result"])
+        self.assertEqual(Student.load("1").exam_result, {"Математика": "1/2"})
+
+
 if __name__ == '__main__':
     unittest.main(argv=['first-arg-is-ignored'], exit=False)
\ No newline at end of file